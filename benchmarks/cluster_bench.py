@@ -0,0 +1,398 @@
+"""
+Local-cluster benchmark suite.
+
+Starts a NameNode and N DataNodes as local processes on free ports with storage in a
+scratch directory, then runs the standard workloads for every combination of block
+size, replication factor and client concurrency:
+
+    dfsio        TestDFSIO-style: each client writes, then reads back, one large file (MB/s)
+    nnthroughput NNThroughputBenchmark-style: allocate / lookup / delete calls straight
+                 against the NameNode (ops/s)
+    smallfiles   create, read and delete many small files (files/s)
+    mixed        concurrent read/write/lookup/delete mix for a fixed duration
+                 (ops/s and latency percentiles per operation)
+
+Results are written as JSON so runs can be compared over time:
+
+    python3 benchmarks/cluster_bench.py --datanodes 3 --block-sizes 1048576,4194304 \\
+        --replication 1,2 --concurrency 1,4 --output results.json
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import requests
+from client.client import HDFSClient
+from core.config import Config
+
+WORKLOADS = ("dfsio", "nnthroughput", "smallfiles", "mixed")
+
+
+def free_port(rpc=False):
+    """Returns a port that is free now (and, with rpc, whose RPC listener port is free too)."""
+    while True:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        if not rpc:
+            return port
+        try:
+            with socket.socket() as sock:
+                sock.bind(("127.0.0.1", port + Config.RPC_PORT_OFFSET))
+            return port
+        except (OSError, OverflowError):
+            continue
+
+
+def wait_for(url, timeout=20):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+class LocalCluster:
+    """A NameNode and `datanodes` DataNodes running as child processes under workdir."""
+
+    def __init__(self, workdir, datanodes=3, rpc=False):
+        self.workdir = workdir
+        self.num_datanodes = datanodes
+        self.rpc = rpc
+        self.processes = []
+        self.namenode_url = None
+        self.datanode_urls = []
+
+    def _spawn(self, script, *args):
+        log_file = open(os.path.join(self.workdir, "cluster.log"), "a")
+        command = [sys.executable, os.path.join(ROOT, script), *args] + (["--rpc"] if self.rpc else [])
+        self.processes.append(subprocess.Popen(command, cwd=self.workdir, env=dict(os.environ, PYTHONPATH=ROOT),
+                                               stdout=log_file, stderr=log_file))
+
+    def start(self):
+        port = free_port(self.rpc)
+        self.namenode_url = f"http://127.0.0.1:{port}"
+        self._spawn("run_namenode.py", "--port", str(port))
+        wait_for(f"{self.namenode_url}/files")
+
+        for index in range(1, self.num_datanodes + 1):
+            port = free_port(self.rpc)
+            self._spawn("run_datanode.py", "--id", f"bench-dn{index}", "--port", str(port),
+                        "--storage", os.path.join(self.workdir, f"dn{index}"), "--namenode", self.namenode_url)
+            self.datanode_urls.append(f"http://127.0.0.1:{port}")
+
+        deadline = time.time() + 20
+        while len(requests.get(f"{self.namenode_url}/datanodes").json()) < self.num_datanodes:
+            if time.time() > deadline:
+                raise RuntimeError("DataNodes did not register with the NameNode")
+            time.sleep(0.2)
+        return self
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.wait()
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def at(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {"count": len(ordered), "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+            "p50_ms": at(0.5), "p95_ms": at(0.95), "p99_ms": at(0.99), "max_ms": round(ordered[-1] * 1000, 3)}
+
+
+def run_parallel(concurrency, tasks):
+    """Runs every task on `concurrency` threads; returns (wall seconds, per-task seconds)."""
+    def timed_task(task):
+        started = time.perf_counter()
+        task()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(timed_task, tasks))
+    return time.perf_counter() - started, latencies
+
+
+class Bench:
+    def __init__(self, cluster, workdir, args):
+        self.cluster = cluster
+        self.workdir = workdir
+        self.args = args
+        self.local = threading.local()
+        self.run_id = 0
+
+    def client(self):
+        """One HDFSClient per thread."""
+        if getattr(self.local, "client", None) is None:
+            self.local.client = HDFSClient(self.cluster.namenode_url, Config.BLOCK_SIZE,
+                                           transport=self.args.transport)
+        return self.local.client
+
+    def make_file(self, name, size):
+        path = os.path.join(self.workdir, "src", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        return path
+
+    def upload(self, path, block_size, replication):
+        if not self.client().upload_file(path, codec="none", dedup=False, chunking="fixed",
+                                         block_size=block_size, replication=replication):
+            raise RuntimeError(f"Upload of '{os.path.basename(path)}' failed")
+
+    def download(self, name, expected_size):
+        output = os.path.join(self.workdir, "out", f"{threading.get_ident()}-{name}")
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        self.client().download_file(name, output)
+        size = os.path.getsize(output) if os.path.exists(output) else -1
+        if size != expected_size:
+            raise RuntimeError(f"Read back {size} bytes of '{name}', expected {expected_size}")
+        os.remove(output)
+
+    def prefix(self):
+        self.run_id += 1
+        return f"r{self.run_id}"
+
+    # --- workloads ---
+
+    def dfsio(self, block_size, replication, concurrency):
+        size = self.args.file_size_mb * 1024 * 1024
+        prefix = self.prefix()
+        paths = [self.make_file(f"{prefix}-dfsio-{i}", size) for i in range(concurrency)]
+        names = [os.path.basename(path) for path in paths]
+        total_mb = size * concurrency / (1024 * 1024)
+
+        write_seconds, write_latencies = run_parallel(
+            concurrency, [lambda path=path: self.upload(path, block_size, replication) for path in paths])
+        read_seconds, read_latencies = run_parallel(
+            concurrency, [lambda name=name: self.download(name, size) for name in names])
+
+        self.client().delete_files(names)
+        for path in paths:
+            os.remove(path)
+        return {
+            "files": concurrency,
+            "file_size_mb": self.args.file_size_mb,
+            "write": {"throughput_mb_s": round(total_mb / write_seconds, 2),
+                      "per_client_mb_s": round(size / (1024 * 1024) / (sum(write_latencies) / concurrency), 2)},
+            "read": {"throughput_mb_s": round(total_mb / read_seconds, 2),
+                     "per_client_mb_s": round(size / (1024 * 1024) / (sum(read_latencies) / concurrency), 2)},
+        }
+
+    def nnthroughput(self, block_size, replication, concurrency):
+        url = self.cluster.namenode_url
+        prefix = self.prefix()
+        names = [f"{prefix}-nn-{i}" for i in range(self.args.nn_ops)]
+        session = threading.local()
+
+        def post(path, body):
+            if getattr(session, "http", None) is None:
+                session.http = requests.Session()
+            response = session.http.post(f"{url}/{path}", json=body)
+            if response.status_code != 200:
+                raise RuntimeError(f"/{path} failed: {response.status_code} {response.text}")
+
+        def lookup(name):
+            if getattr(session, "http", None) is None:
+                session.http = requests.Session()
+            session.http.get(f"{url}/get_file_blocks", params={"file_name": name}).raise_for_status()
+
+        operations = {
+            "allocate": lambda name: post("assign_blocks", {"file_name": name, "num_blocks": self.args.nn_blocks,
+                                                            "replication": replication, "block_size": block_size}),
+            "lookup": lookup,
+            "delete": lambda name: post("delete_file", {"file_name": name}),
+        }
+        results = {}
+        for op, call in operations.items():
+            seconds, latencies = run_parallel(concurrency, [lambda name=name: call(name) for name in names])
+            results[op] = {"ops_per_s": round(len(names) / seconds, 1), "latency": percentiles(latencies)}
+        return {"ops": len(names), "blocks_per_file": self.args.nn_blocks, **results}
+
+    def smallfiles(self, block_size, replication, concurrency):
+        prefix = self.prefix()
+        size = self.args.small_file_kb * 1024
+        paths = [self.make_file(f"{prefix}-small-{i}", size) for i in range(self.args.small_files)]
+        names = [os.path.basename(path) for path in paths]
+
+        create_seconds, create_latencies = run_parallel(
+            concurrency, [lambda path=path: self.upload(path, block_size, replication) for path in paths])
+        read_seconds, read_latencies = run_parallel(
+            concurrency, [lambda name=name: self.download(name, size) for name in names])
+        delete_seconds, delete_latencies = run_parallel(
+            concurrency, [lambda name=name: self.client().delete_file(name) for name in names])
+
+        for path in paths:
+            os.remove(path)
+        count = len(names)
+        return {
+            "files": count,
+            "file_size_kb": self.args.small_file_kb,
+            "create": {"files_per_s": round(count / create_seconds, 1), "latency": percentiles(create_latencies)},
+            "read": {"files_per_s": round(count / read_seconds, 1), "latency": percentiles(read_latencies)},
+            "delete": {"files_per_s": round(count / delete_seconds, 1), "latency": percentiles(delete_latencies)},
+        }
+
+    def mixed(self, block_size, replication, concurrency):
+        prefix = self.prefix()
+        size = self.args.mixed_file_kb * 1024
+        seed_paths = [self.make_file(f"{prefix}-mixed-seed-{i}", size) for i in range(max(4, concurrency))]
+        for path in seed_paths:
+            self.upload(path, block_size, replication)
+        readable = [os.path.basename(path) for path in seed_paths]
+        lock = threading.Lock()
+        latencies = {"read": [], "write": [], "lookup": [], "delete": []}
+        errors = []
+        deadline = time.time() + self.args.mixed_seconds
+        weights = {"read": 0.6, "write": 0.2, "lookup": 0.15, "delete": 0.05}
+
+        def worker(worker_id):
+            rng = random.Random(worker_id)
+            written = []
+            count = 0
+            while time.time() < deadline:
+                op = rng.choices(list(weights), list(weights.values()))[0]
+                if op == "delete" and not written:
+                    op = "write"
+                started = time.perf_counter()
+                try:
+                    if op == "read":
+                        with lock:
+                            name = rng.choice(readable)
+                        self.download(name, size)
+                    elif op == "lookup":
+                        with lock:
+                            name = rng.choice(readable)
+                        self.client()._get_file_info(name)
+                    elif op == "write":
+                        path = self.make_file(f"{prefix}-mixed-{worker_id}-{count}", size)
+                        self.upload(path, block_size, replication)
+                        os.remove(path)
+                        written.append(os.path.basename(path))
+                        count += 1
+                    else:
+                        self.client().delete_file(written.pop(rng.randrange(len(written))))
+                except Exception as e:
+                    errors.append(f"{op}: {e}")
+                    continue
+                with lock:
+                    latencies[op].append(time.perf_counter() - started)
+            return written
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            leftovers = list(pool.map(worker, range(concurrency)))
+        seconds = time.perf_counter() - started
+
+        self.client().delete_files(readable + [name for names in leftovers for name in names])
+        for path in seed_paths:
+            os.remove(path)
+        total = sum(len(samples) for samples in latencies.values())
+        return {
+            "seconds": round(seconds, 2),
+            "file_size_kb": self.args.mixed_file_kb,
+            "ops_per_s": round(total / seconds, 1),
+            "errors": len(errors),
+            "operations": {op: percentiles(samples) for op, samples in latencies.items()},
+        }
+
+
+def parse_list(text):
+    return [int(value) for value in text.split(",") if value]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local-cluster I/O and metadata benchmarks")
+    parser.add_argument("--datanodes", type=int, default=3)
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help=f"Comma-separated subset of {WORKLOADS}")
+    parser.add_argument("--block-sizes", type=parse_list, default=[Config.BLOCK_SIZE], help="Bytes, comma-separated")
+    parser.add_argument("--replication", type=parse_list, default=[Config.REPLICATION_FACTOR],
+                        help="Replication factors, comma-separated")
+    parser.add_argument("--concurrency", type=parse_list, default=[1, 4], help="Client threads, comma-separated")
+    parser.add_argument("--transport", choices=["http", "rpc"], default="http")
+    parser.add_argument("--file-size-mb", type=int, default=16, help="dfsio: size of each client's file")
+    parser.add_argument("--nn-ops", type=int, default=500, help="nnthroughput: calls per operation")
+    parser.add_argument("--nn-blocks", type=int, default=4, help="nnthroughput: blocks allocated per file")
+    parser.add_argument("--small-files", type=int, default=200, help="smallfiles: number of files")
+    parser.add_argument("--small-file-kb", type=int, default=4, help="smallfiles: size of each file")
+    parser.add_argument("--mixed-seconds", type=float, default=10, help="mixed: duration of the run")
+    parser.add_argument("--mixed-file-kb", type=int, default=256, help="mixed: size of each file")
+    parser.add_argument("--output", help="Write JSON results here (default: stdout)")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory (logs, storage)")
+    args = parser.parse_args()
+
+    workloads = [name for name in args.workloads.split(",") if name]
+    unknown = set(workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+    # Client-side logging would dominate the small-file numbers.
+    Config.LOG_LEVEL = "warning"
+
+    workdir = tempfile.mkdtemp(prefix="hdfs-bench-")
+    report = {
+        "started": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "keep")},
+        "results": [],
+    }
+    cluster = LocalCluster(workdir, args.datanodes, rpc=args.transport == "rpc").start()
+    try:
+        bench = Bench(cluster, workdir, args)
+        for block_size, replication, concurrency in itertools.product(args.block_sizes, args.replication,
+                                                                      args.concurrency):
+            for workload in workloads:
+                print(f"▶ {workload} block_size={block_size} replication={replication} "
+                      f"concurrency={concurrency}", file=sys.stderr)
+                started = time.perf_counter()
+                result = getattr(bench, workload)(block_size, replication, concurrency)
+                report["results"].append({"workload": workload, "block_size": block_size,
+                                          "replication": replication, "concurrency": concurrency,
+                                          "elapsed_s": round(time.perf_counter() - started, 2), **result})
+    finally:
+        cluster.stop()
+        if args.keep:
+            print(f"Scratch directory kept at {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
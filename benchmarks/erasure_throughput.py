@@ -0,0 +1,51 @@
+"""
+Measures Reed-Solomon encode and decode throughput of core.erasure.
+
+    python3 benchmarks/erasure_throughput.py --data-units 4 --parity-units 2 --cell-size 1048576
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.erasure import ReedSolomon
+
+
+def measure(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reed-Solomon encode/decode throughput")
+    parser.add_argument("--data-units", type=int, default=4)
+    parser.add_argument("--parity-units", type=int, default=2)
+    parser.add_argument("--cell-size", type=int, default=1024 * 1024, help="Bytes per cell")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    k, m = args.data_units, args.parity_units
+    rs = ReedSolomon(k, m)
+    data = [os.urandom(args.cell_size) for _ in range(k)]
+    stripe_mb = k * args.cell_size / (1024 * 1024)
+
+    seconds = measure(lambda: rs.encode(data), args.repeat)
+    print(f"RS({k},{m}) cell={args.cell_size}B  overhead={(k + m) / k:.2f}x")
+    print(f"encode: {stripe_mb / seconds:8.1f} MB/s")
+
+    cells = data + rs.encode(data)
+    for erasures in range(1, m + 1):
+        lost = random.sample(range(k), min(erasures, k))
+        damaged = [None if i in lost else cell for i, cell in enumerate(cells)]
+        assert rs.decode(damaged) == data
+        seconds = measure(lambda: rs.decode(damaged), args.repeat)
+        print(f"decode ({erasures} lost data cell{'s' if erasures > 1 else ''}): {stripe_mb / seconds:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Compares operations per second of the HTTP API and the binary RPC transport.
+
+Starts a NameNode and one DataNode (both with --rpc) in a scratch directory and times
+the same calls over each transport: heartbeat, block lookup, block allocation, and
+storing / reading a block. Needs the default ports (8000/9000, DataNode 5001/6001) free.
+
+    python3 benchmarks/rpc_transport.py --ops 500 --block-size 65536
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import requests
+from core.config import Config
+from core.rpc import RPCClient, rpc_address
+
+NAMENODE_URL = f"http://127.0.0.1:{Config.NAMENODE_PORT}"
+DATANODE_URL = "http://127.0.0.1:5001"
+
+
+def wait_for(url, timeout=15):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def start_cluster(workdir):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    log = open(os.path.join(workdir, "cluster.log"), "w")
+    processes = [subprocess.Popen([sys.executable, os.path.join(ROOT, "run_namenode.py"), "--rpc"],
+                                  cwd=workdir, env=env, stdout=log, stderr=log)]
+    wait_for(f"{NAMENODE_URL}/files")
+    processes.append(subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "run_datanode.py"), "--id", "bench-dn", "--port", "5001",
+         "--storage", os.path.join(workdir, "dn"), "--rpc"],
+        cwd=workdir, env=env, stdout=log, stderr=log))
+    wait_for(f"{DATANODE_URL}/io_stats")
+    return processes
+
+
+def measure(name, transport, ops, operation):
+    operation(0)  # warm up connections
+    started = time.perf_counter()
+    for i in range(1, ops + 1):
+        operation(i)
+    seconds = time.perf_counter() - started
+    print(f"{name:<16} {transport:<5} {ops / seconds:10.0f} ops/s  {seconds / ops * 1e6:8.0f} us/op")
+
+
+def http_operations(block, block_id, file_name):
+    def post(path, body):
+        response = requests.post(f"{NAMENODE_URL}/{path}", json=body)
+        assert response.status_code == 200, response.text
+
+    def read_block(_):
+        response = requests.get(f"{DATANODE_URL}/read_block", params={"block_id": block_id})
+        assert response.status_code == 200 and len(response.content) == len(block)
+
+    def store_block(i):
+        response = requests.post(f"{DATANODE_URL}/store_block", files={"data": block},
+                                 data={"block_id": f"http-{i}", "checksum": str(zlib.crc32(block))})
+        assert response.status_code == 200, response.text
+
+    return {
+        "heartbeat": lambda _: post("heartbeat", {"node_id": "bench-dn"}),
+        "get_file_blocks": lambda _: requests.get(f"{NAMENODE_URL}/get_file_blocks",
+                                                  params={"file_name": file_name}).raise_for_status(),
+        # Re-allocating one file keeps the metadata (saved on every call) the same size.
+        "assign_blocks": lambda _: post("assign_blocks", {"file_name": "http-assign",
+                                                          "num_blocks": 4, "replication": 1}),
+        "store_block": store_block,
+        "read_block": read_block,
+    }
+
+
+def rpc_operations(block, block_id, file_name):
+    namenode = RPCClient(*rpc_address(NAMENODE_URL))
+    datanode = RPCClient(*rpc_address(DATANODE_URL))
+
+    def read_block(_):
+        _, data = datanode.call("read_block", {"block_id": block_id})
+        assert len(data) == len(block)
+
+    return {
+        "heartbeat": lambda _: namenode.call("heartbeat", {"node_id": "bench-dn"}),
+        "get_file_blocks": lambda _: namenode.call("get_file_blocks", {"file_name": file_name}),
+        "assign_blocks": lambda _: namenode.call("assign_blocks", {"file_name": "rpc-assign",
+                                                                   "num_blocks": 4, "replication": 1}),
+        "store_block": lambda i: datanode.call("store_block", {"block_id": f"rpc-{i}",
+                                                               "checksum": zlib.crc32(block)}, block),
+        "read_block": read_block,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP vs binary RPC operations per second")
+    parser.add_argument("--ops", type=int, default=300, help="Calls per operation and transport")
+    parser.add_argument("--block-size", type=int, default=64 * 1024, help="Bytes per stored/read block")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        processes = start_cluster(workdir)
+        try:
+            block = os.urandom(args.block_size)
+            requests.post(f"{DATANODE_URL}/store_block", files={"data": block}, data={"block_id": "bench-read"})
+            file_name = "bench-lookup"
+            requests.post(f"{NAMENODE_URL}/assign_blocks",
+                          json={"file_name": file_name, "num_blocks": 16, "replication": 1})
+
+            suites = {
+                "http": http_operations(block, "bench-read", file_name),
+                "rpc": rpc_operations(block, "bench-read", file_name),
+            }
+            print(f"{args.ops} calls each, block size {args.block_size} bytes")
+            for name in suites["http"]:
+                for transport, operations in suites.items():
+                    measure(name, transport, args.ops, operations[name])
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.wait()
+
+
+if __name__ == "__main__":
+    main()
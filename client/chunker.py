@@ -0,0 +1,97 @@
+import hashlib
+import numpy as np
+
+# Gear table: one pseudo-random 64-bit value per byte value. Derived from SHA-256 so
+# every client computes identical cut points (and therefore identical block IDs).
+GEAR = np.array(
+    [int.from_bytes(hashlib.sha256(bytes([value])).digest()[:8], "big") for value in range(256)],
+    dtype=np.uint64
+)
+
+# The gear hash at a position only depends on the last 64 bytes.
+GEAR_WINDOW = 64
+
+
+def _top_bits_mask(bits):
+    return np.uint64(((1 << bits) - 1) << (64 - bits))
+
+
+class ContentDefinedChunker:
+    """
+    FastCDC-style content-defined chunking with a gear rolling hash.
+
+    A chunk ends where the hash of the preceding 64 bytes has its top bits clear, so
+    boundaries move with the content: inserting a byte only changes the chunks around
+    it. Below avg_size a stricter mask is used and above it a looser one (normalized
+    chunking), which keeps chunk sizes close to avg_size. Chunks are never shorter than
+    min_size (except the last) or longer than max_size.
+    """
+
+    def __init__(self, min_size, avg_size, max_size, read_size=4 * 1024 * 1024):
+        if not GEAR_WINDOW <= min_size <= avg_size <= max_size:
+            raise ValueError("Need 64 <= min_size <= avg_size <= max_size")
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+        self.read_size = max(read_size, 2 * max_size)
+        bits = max(int(avg_size).bit_length() - 1, 3)
+        self.mask_small = _top_bits_mask(bits + 2)
+        self.mask_large = _top_bits_mask(bits - 2)
+
+    @staticmethod
+    def _gear_hashes(data):
+        """Gear hash ending at every byte of data, computed for all positions at once."""
+        hashes = GEAR[np.frombuffer(data, dtype=np.uint8)]
+        # Doubling: the hash over a 2w window is hash_w[i] + (hash_w[i - w] << w).
+        width = 1
+        while width < GEAR_WINDOW:
+            hashes[width:] += hashes[:-width] << np.uint64(width)
+            width *= 2
+        return hashes
+
+    def _cut_points(self, data, final):
+        """Returns the end offsets of every chunk in data whose boundary is already decided."""
+        hashes = self._gear_hashes(data)
+        small = np.flatnonzero((hashes & self.mask_small) == 0) + 1
+        large = np.flatnonzero((hashes & self.mask_large) == 0) + 1
+
+        cuts = []
+        start = 0
+        while start < len(data):
+            cut = None
+            limit = min(start + self.avg_size, len(data))
+            i = np.searchsorted(small, start + self.min_size)
+            if i < len(small) and small[i] < limit:
+                cut = int(small[i])
+            elif start + self.avg_size <= len(data):
+                limit = min(start + self.max_size, len(data))
+                i = np.searchsorted(large, start + self.avg_size)
+                if i < len(large) and large[i] < limit:
+                    cut = int(large[i])
+                elif start + self.max_size <= len(data):
+                    cut = start + self.max_size
+
+            if cut is None:
+                # Not enough data to know where this chunk ends yet.
+                if final:
+                    cuts.append(len(data))
+                break
+            cuts.append(cut)
+            start = cut
+        return cuts
+
+    def chunks(self, stream):
+        """Yields the chunks of a binary stream in order."""
+        pending = b""
+        while True:
+            data = stream.read(self.read_size)
+            buffer = pending + data
+            if not buffer:
+                return
+            start = 0
+            for end in self._cut_points(buffer, final=not data):
+                yield buffer[start:end]
+                start = end
+            pending = buffer[start:]
+            if not data:
+                return
@@ -1,128 +1,1061 @@
+import contextlib
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
+from urllib.parse import urlparse
 import requests
-from core.logger import log
+from core.checksum import ChecksumError, chunk_aligned_range, verify_checksums
+from core.compression import compress_block, decompress_block, validate_codec
+from core.compute import resolve_function
+from core.config import Config
+from core.erasure import ReedSolomon
+from core.logger import flush as flush_logs, log
+from core.metrics import REGISTRY, histogram, timed
+from core.rpc import RPCClient, RPCError, rpc_address
+from core.tracing import TracedSession, span, start_trace
 from client.file_splitter import FileSplitter
 
 
+OPERATION_SECONDS = histogram("hdfs_client_operation_seconds", "Duration of client file operations", ("op",))
+NAMENODE_SECONDS = histogram("hdfs_client_namenode_call_seconds", "NameNode call latency seen by the client",
+                             ("method", "transport"))
+BLOCK_SECONDS = histogram("hdfs_client_block_seconds", "Block send/fetch latency seen by the client",
+                          ("op", "transport"))
+
+
 class HDFSClient:
-    def __init__(self, namenode_url, block_size):
+    def __init__(self, namenode_url, block_size, short_circuit=None, transport=None, read_url=None):
+        """
+        transport is "http" or "rpc" (defaults to Config.RPC_TRANSPORT). "rpc" sends block
+        lookups, allocations, deletes and block data over the binary RPC transport; the
+        remaining calls always use HTTP.
+        read_url (defaults to Config.NAMENODE_READ_URL) is a standby NameNode that serves
+        file lookups and listings; writes always go to namenode_url.
+        """
         self.namenode_url = namenode_url
+        self.read_url = read_url or Config.NAMENODE_READ_URL
         self.block_size = block_size
         self.splitter = FileSplitter(block_size)
+        self.short_circuit = Config.SHORT_CIRCUIT_READS if short_circuit is None else short_circuit
+        self.transport = transport or ("rpc" if Config.RPC_TRANSPORT else "http")
+        self._local_addresses = None
+        self._short_circuit_sockets = {}
+        self._rpc_clients = {}
+        # Keep-alive connections; inside trace() every request carries the trace ID.
+        self.http = TracedSession()
+
+    @contextlib.contextmanager
+    def trace(self, name):
+        """
+        Traces everything the client does inside the block. The yielded Trace collects
+        the client's phases and the spans every NameNode and DataNode returned, e.g.
+        `with client.trace("upload") as t: client.upload_file(path)`, then t.format().
+        """
+        with start_trace(component="client") as trace:
+            with span(name):
+                yield trace
+
+    def _rpc(self, url, method, args=None, payload=b""):
+        """Calls method on the RPC listener of the node at url over a persistent connection."""
+        if url not in self._rpc_clients:
+            self._rpc_clients[url] = RPCClient(*rpc_address(url))
+        with span(f"rpc {method}", peer=url):
+            return self._rpc_clients[url].call(method, args, payload)
+
+    def _call_namenode(self, method, body, http_method="post", read=False):
+        """
+        Calls a NameNode endpoint over the client's transport. Returns (status, body),
+        where body is {"error": ...} if the call failed. read=True tries the standby
+        NameNode first, if one is configured.
+        """
+        if read and self.read_url:
+            with NAMENODE_SECONDS.labels(method, "standby").time():
+                status, result = self._call_standby(method, body, http_method)
+            if status not in (404, 503):
+                return status, result
+
+        with NAMENODE_SECONDS.labels(method, self.transport).time():
+            if self.transport == "rpc":
+                try:
+                    return 200, self._rpc(self.namenode_url, method, body)[0]
+                except RPCError as e:
+                    return e.status, {"error": str(e)}
+
+            if http_method == "get":
+                response = self.http.get(f"{self.namenode_url}/{method}", params=body)
+            else:
+                response = self.http.post(f"{self.namenode_url}/{method}", json=body)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, {"error": response.text}
+
+    def _call_standby(self, method, body, http_method="post"):
+        """
+        Sends a read to the standby NameNode. A 503 (standby unreachable or too stale)
+        or 404 (file may be newer than the standby) means: ask the active NameNode.
+        """
+        try:
+            if http_method == "get":
+                response = self.http.get(f"{self.read_url}/{method}", params=body, timeout=Config.REQUEST_TIMEOUT)
+            else:
+                response = self.http.post(f"{self.read_url}/{method}", json=body, timeout=Config.REQUEST_TIMEOUT)
+            return response.status_code, response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            log(f"⚠️ Standby NameNode unavailable ({e}); reading from the active NameNode.", level="warning")
+            return 503, {"error": str(e)}
+
+    @timed(OPERATION_SECONDS, op="upload")
+    def upload_file(self, file_path, codec=None, level=None, workers=None, erasure_coding=False,
+                    chunking=None, dedup=None, block_size=None, replication=None):
+        """
+        Uploads a file, optionally compressing each block independently with `codec`
+        ("none", "zlib", "lzma" or "bz2"). workers > 1 compresses in a process pool.
+        erasure_coding=True stores Reed-Solomon stripes (Config.EC_DATA_UNITS data +
+        Config.EC_PARITY_UNITS parity cells) instead of replicating every block.
+        chunking="cdc" splits at content-defined boundaries; dedup=True names blocks by
+        their SHA-256 and skips sending blocks the cluster already stores.
+        block_size and replication override the client's block size and the cluster's
+        replication factor for this file. Returns True if every replica was stored.
+        """
+        with span("client.prepare"):
+            upload = self._prepare_upload(file_path, codec, level, workers, erasure_coding,
+                                          chunking, dedup, block_size, replication)
+        if upload is None:
+            return False
+
+        try:
+            log("📨 Requesting block assignment from NameNode...", level="info")
+            status, body = self._call_namenode("assign_blocks", upload["request"])
 
-    def upload_file(self, file_path):
+            if status != 200:
+                log(f"❌ Failed to assign blocks. Status Code: {status}, Response: {body}", level="error")
+                return False
+
+            with span("client.send_blocks", blocks=len(body.get("blocks", []))):
+                return self._send_assigned_blocks(upload, body)
+        except Exception as e:
+            log(f"❌ Upload failed: {e}", level="error")
+            return False
+
+    @timed(OPERATION_SECONDS, op="upload_many")
+    def upload_files(self, file_paths, codec=None, level=None, workers=None, erasure_coding=False,
+                     chunking=None, dedup=None, block_size=None, replication=None):
+        """
+        Uploads many files with a single block-assignment round trip to the NameNode.
+        Options apply to every file, as in upload_file. Returns {file_name: True/False}.
+        """
+        uploads = []
+        results = {}
+        for file_path in file_paths:
+            upload = self._prepare_upload(file_path, codec, level, workers, erasure_coding,
+                                          chunking, dedup, block_size, replication)
+            if upload is None:
+                results[Path(file_path).name] = False
+            else:
+                uploads.append(upload)
+        if not uploads:
+            return results
+
+        try:
+            log(f"📨 Requesting block assignment for {len(uploads)} files...", level="info")
+            status, body = self._call_namenode("batch/assign_blocks",
+                                               {"files": [upload["request"] for upload in uploads]})
+            if status != 200:
+                log(f"❌ Batch block assignment failed: {body}", level="error")
+                results.update({upload["request"]["file_name"]: False for upload in uploads})
+                return results
+            assignments = body["results"]
+        except Exception as e:
+            log(f"❌ Upload failed: {e}", level="error")
+            results.update({upload["request"]["file_name"]: False for upload in uploads})
+            return results
+
+        for upload, assignment in zip(uploads, assignments):
+            file_name = upload["request"]["file_name"]
+            if "error" in assignment:
+                log(f"❌ Failed to assign blocks for '{file_name}': {assignment['error']}", level="error")
+                results[file_name] = False
+                continue
+            try:
+                results[file_name] = self._send_assigned_blocks(upload, assignment)
+            except Exception as e:
+                log(f"❌ Upload of '{file_name}' failed: {e}", level="error")
+                results[file_name] = False
+        return results
+
+    def _prepare_upload(self, file_path, codec, level, workers, erasure_coding, chunking, dedup,
+                        block_size, replication):
+        """
+        Splits, compresses and (for erasure coding) encodes a file ahead of block
+        assignment. Returns {"request", "blocks", "parity_cells", "dedup"}, where request is
+        the /assign_blocks body, or None if the file cannot be uploaded.
+        """
         file_path = Path(file_path)
+        codec = codec or Config.COMPRESSION_CODEC
+        chunking = chunking or Config.CHUNKING
+        dedup = Config.DEDUP if dedup is None else dedup
+        if dedup and erasure_coding:
+            log("⚠️ Deduplication does not apply to erasure-coded files; uploading without it.", level="warning")
+            dedup = False
 
         if not file_path.exists():
             log(f"❌ File '{file_path}' does not exist!", level="error")
-            return
-        
+            return None
+        try:
+            validate_codec(codec)
+        except ValueError as e:
+            log(f"❌ {e}", level="error")
+            return None
+
         file_name = file_path.name
-        blocks = self.splitter.split_file(str(file_path))
+        splitter = FileSplitter(block_size) if block_size else self.splitter
+        blocks = splitter.split_file(str(file_path), chunking=chunking)
         num_blocks = len(blocks)
+        raw_lengths = [len(block) for block in blocks]
+        raw_hashes = [hashlib.sha256(block).hexdigest() for block in blocks]
+        blocks = self._compress_blocks(blocks, codec, level, workers)
+        block_lengths = [
+            {"raw_length": raw, "stored_length": len(block), "hash": raw_hash}
+            for raw, raw_hash, block in zip(raw_lengths, raw_hashes, blocks)
+        ]
 
         log(f"📤 Uploading '{file_name}' in {num_blocks} blocks.")
+        if codec != "none":
+            stored = sum(len(block) for block in blocks)
+            log(f"🗜️ {codec} compressed {sum(raw_lengths)} bytes to {stored} bytes.")
 
+        request_body = {
+            "file_name": file_name,
+            "num_blocks": num_blocks,
+            "codec": codec,
+            "chunking": chunking,
+            "block_size": splitter.block_size,
+            "replication": replication,
+            "block_lengths": block_lengths
+        }
+        if dedup:
+            request_body["block_ids"] = [hashlib.sha256(block).hexdigest() for block in blocks]
+        parity_cells = {}
+        if erasure_coding:
+            request_body["erasure_coding"] = {
+                "data_units": Config.EC_DATA_UNITS,
+                "parity_units": Config.EC_PARITY_UNITS
+            }
+            parity_cells = self._encode_stripes(blocks, Config.EC_DATA_UNITS, Config.EC_PARITY_UNITS)
+
+        return {"request": request_body, "blocks": blocks, "parity_cells": parity_cells, "dedup": dedup}
+
+    def _send_assigned_blocks(self, upload, assignment):
+        """
+        Sends a prepared upload's blocks to the DataNodes the NameNode assigned, then
+        confirms the newly written content-addressed blocks so later uploads may reuse
+        them. Returns True if every replica was stored.
+        """
+        blocks, dedup = upload["blocks"], upload["dedup"]
+        data_blocks = iter(blocks)
+        # Content-addressed blocks the cluster already has, plus each one stored below
+        skip = set(assignment.get("existing", []))
+        skipped_bytes = 0
+        ok = True
+        confirmed = {}
+
+        for block in assignment.get("blocks", []):
+            if "parity" in block:
+                block_data = upload["parity_cells"][(block["stripe"], block["parity"])]
+            else:
+                block_data = next(data_blocks)
+            block_id = block.get("block_id")
+            datanodes = block.get("datanodes", [])
+
+            if not block_id or not datanodes:
+                log(f"❌ Invalid assignment: {block}", level="error")
+                ok = False
+                continue
+            if block_id in skip:
+                skipped_bytes += len(block_data)
+                continue
+
+            stored_on = [url for url in datanodes if self._send_block_to_datanode(url, block_id, block_data)]
+            ok = ok and len(stored_on) == len(datanodes)
+            if dedup and stored_on:
+                # A repeat of this ID is only skipped once a replica exists.
+                skip.add(block_id)
+                if block.get("pending"):
+                    confirmed[block_id] = stored_on
+
+        if confirmed:
+            status, body = self._call_namenode("confirm_blocks", {"blocks": confirmed})
+            if status != 200:
+                log(f"❌ Could not confirm stored blocks: {body}", level="error")
+                ok = False
+        if dedup:
+            total = sum(len(block) for block in blocks)
+            log(f"♻️ Dedup skipped {skipped_bytes} of {total} bytes already in the cluster.")
+        return ok
+
+    @timed(OPERATION_SECONDS, op="upload_stream")
+    def upload_stream(self, source, file_name, codec=None, level=None, prefetch=None,
+                      block_size=None, replication=None):
+        """
+        Uploads from a binary stream or an iterable of bytes whose length is not known up
+        front. Blocks are allocated `prefetch` at a time while data flows, and the file
+        only becomes visible once the NameNode completes it. If the upload dies, the
+        lease expires and the NameNode discards the written blocks.
+        """
+        codec = codec or Config.COMPRESSION_CODEC
+        level = Config.COMPRESSION_LEVEL if level is None else level
+        prefetch = prefetch or Config.STREAM_PREFETCH_BLOCKS
         try:
-            log("📨 Requesting block assignment from NameNode...", level="info")
-            response = requests.post(
-                f"{self.namenode_url}/assign_blocks",
-                json={"file_name": file_name, "num_blocks": num_blocks}
-            )
+            validate_codec(codec)
+            splitter = FileSplitter(block_size) if block_size else self.splitter
+            response = self.http.post(f"{self.namenode_url}/create_file", json={
+                "file_name": file_name,
+                "codec": codec,
+                "block_size": splitter.block_size,
+                "replication": replication,
+            })
+            if response.status_code != 200:
+                log(f"❌ Could not open '{file_name}' for writing: {response.text}", level="error")
+                return False
+            lease = {"file_name": file_name, "lease_id": response.json()["lease_id"]}
+            renew_every = response.json().get("lease_timeout", Config.LEASE_TIMEOUT) / 3
+
+            allocations, written, total = [], [], 0
+            with self._keep_lease(lease, renew_every):
+                for data in splitter.iter_stream(source):
+                    if not allocations:
+                        response = self.http.post(f"{self.namenode_url}/add_block",
+                                                  json={**lease, "count": prefetch})
+                        if response.status_code != 200:
+                            log(f"❌ Block allocation failed: {response.text}", level="error")
+                            return False
+                        allocations = response.json()["blocks"]
+
+                    block = allocations.pop(0)
+                    stored = compress_block(data, codec, level)
+                    stored_on = [url for url in block["datanodes"]
+                                 if self._send_block_to_datanode(url, block["block_id"], stored)]
+                    if not stored_on:
+                        log(f"❌ Could not store block {block['block_id']}; abandoning upload.", level="error")
+                        return False
+                    if len(stored_on) < len(block["datanodes"]):
+                        log(f"⚠️ Block {block['block_id']} stored on {len(stored_on)} of "
+                            f"{len(block['datanodes'])} DataNodes; the NameNode re-replicates it.",
+                            level="warning")
+                    written.append({
+                        "block_id": block["block_id"],
+                        "raw_length": len(data),
+                        "stored_length": len(stored),
+                        "hash": hashlib.sha256(data).hexdigest(),
+                        "datanodes": stored_on,
+                    })
+                    total += len(data)
 
+            response = self.http.post(f"{self.namenode_url}/complete_file", json={**lease, "blocks": written})
             if response.status_code != 200:
-                log(f"❌ Failed to assign blocks. Status Code: {response.status_code}, Response: {response.text}", level="error")
-                return
+                log(f"❌ Could not complete '{file_name}': {response.text}", level="error")
+                return False
+        except Exception as e:
+            log(f"❌ Streaming upload failed: {e}", level="error")
+            return False
 
-            block_assignments = response.json().get("blocks", [])
+        log(f"📤 Streamed '{file_name}': {total} bytes in {len(written)} blocks.")
+        return True
 
-            for block_data, assignment in zip(blocks, block_assignments):
-                block_id = assignment.get("block_id")
-                datanodes = assignment.get("datanodes", [])
+    @contextlib.contextmanager
+    def _keep_lease(self, lease, every):
+        """
+        Renews a write lease every `every` seconds until the block exits, so a slow source
+        (a pipe that takes minutes to fill a block) does not lose it between blocks.
+        """
+        stop = threading.Event()
 
-                if not block_id or not datanodes:
-                    log(f"❌ Invalid assignment: {assignment}", level="error")
-                    continue
+        def renew():
+            while not stop.wait(every):
+                try:
+                    response = requests.post(f"{self.namenode_url}/renew_lease", json=lease,
+                                             timeout=Config.REQUEST_TIMEOUT)
+                    if response.status_code != 200:
+                        log(f"⚠️ Could not renew lease on '{lease['file_name']}': {response.text}",
+                            level="warning")
+                except requests.exceptions.RequestException as e:
+                    log(f"⚠️ Could not renew lease on '{lease['file_name']}': {e}", level="warning")
 
-                for datanode_url in datanodes:
-                    self._send_block_to_datanode(datanode_url, block_id, block_data)
+        thread = threading.Thread(target=renew, name="lease-renewer", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
 
-        except Exception as e:
-            log(f"❌ Upload failed: {e}", level="error")
+    def _compress_blocks(self, blocks, codec, level=None, workers=None):
+        if codec == "none":
+            return blocks
+        level = Config.COMPRESSION_LEVEL if level is None else level
+        workers = Config.COMPRESSION_WORKERS if workers is None else workers
+        if workers > 1 and len(blocks) > 1:
+            # Separate processes sidestep the GIL for CPU-bound codecs like lzma and bz2.
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(compress_block, blocks, repeat(codec), repeat(level)))
+        return [compress_block(block, codec, level) for block in blocks]
+
+    def _encode_stripes(self, blocks, data_units, parity_units):
+        """Returns {(stripe, parity_index): parity cell} for the stored (compressed) blocks."""
+        rs = ReedSolomon(data_units, parity_units)
+        parity_cells = {}
+        for stripe, start in enumerate(range(0, len(blocks), data_units)):
+            cells = blocks[start:start + data_units]
+            cell_size = max(len(cell) for cell in cells)
+            # Short cells are zero-padded and a short last stripe gets all-zero cells;
+            # padding is never stored, readers trim cells back to stored_length.
+            padded = [cell.ljust(cell_size, b"\0") for cell in cells]
+            padded += [bytes(cell_size)] * (data_units - len(cells))
+            for index, parity in enumerate(rs.encode(padded)):
+                parity_cells[(stripe, index)] = parity
+        return parity_cells
 
     def _send_block_to_datanode(self, datanode_url, block_id, data):
-        try:
-            url = f"{datanode_url}/store_block"
-            response = requests.post(
-                url,
-                files={"data": data},
-                data={"block_id": block_id}
-            )
+        with BLOCK_SECONDS.labels("send", self.transport).time():
+            if self.transport == "rpc":
+                try:
+                    self._rpc(datanode_url, "store_block", {"block_id": block_id, "checksum": zlib.crc32(data)}, data)
+                    log("✅ Block sent", level="debug", block_id=block_id, datanode=datanode_url, bytes=len(data))
+                    return True
+                except (RPCError, OSError) as e:
+                    log(f"⚠️ Failed to send block {block_id} to {datanode_url}: {e}", level="warning")
+                    return False
 
-            if response.status_code == 200:
-                log(f"✅ Block {block_id} sent to DataNode at {datanode_url}")
-            else:
+            try:
+                url = f"{datanode_url}/store_block"
+                response = self.http.post(
+                    url,
+                    files={"data": data},
+                    data={"block_id": block_id}
+                )
+
+                if response.status_code == 200:
+                    log("✅ Block sent", level="debug", block_id=block_id, datanode=datanode_url, bytes=len(data))
+                    return True
                 log(f"⚠️ Failed to send block {block_id} to {datanode_url}. Status: {response.status_code}", level="warning")
-        except Exception as e:
-            log(f"❌ Error sending block to DataNode {datanode_url}: {e}", level="error")
+            except Exception as e:
+                log(f"❌ Error sending block to DataNode {datanode_url}: {e}", level="error")
+            return False
 
-    def download_file(self, file_name, output_path):
+    @timed(OPERATION_SECONDS, op="sync")
+    def sync_file(self, file_path, level=None):
+        """
+        Uploads a new version of an existing file, sending only blocks whose content
+        hash is not already part of the stored version. Unchanged blocks are reused by
+        reference and the NameNode swaps in the new version atomically once every
+        changed block is stored. Falls back to a full transfer for new files.
+        """
+        file_path = Path(file_path)
+        if not file_path.exists():
+            log(f"❌ File '{file_path}' does not exist!", level="error")
+            return False
+        file_name = file_path.name
+
+        current, attributes = [], {}
+        response = self.http.get(f"{self.namenode_url}/get_file_blocks", params={"file_name": file_name})
+        if response.status_code == 200:
+            current, attributes = response.json().get("blocks", []), response.json().get("attributes", {})
+        codec = attributes.get("codec", Config.COMPRESSION_CODEC)
+        chunking = attributes.get("chunking", Config.CHUNKING)
+        splitter = FileSplitter(attributes["block_size"]) if attributes.get("block_size") else self.splitter
+        by_hash = {block["hash"]: block["block_id"] for block in current if "hash" in block}
+
+        # One streaming pass: hash every local block and remember where the changed ones
+        # are; they are re-read and compressed one at a time once the plan is accepted.
+        plan, changed, offset = [], [], 0
+        for data in splitter.iter_blocks(str(file_path), chunking):
+            raw_hash = hashlib.sha256(data).hexdigest()
+            if raw_hash in by_hash:
+                plan.append({"block_id": by_hash[raw_hash]})
+            else:
+                plan.append({"raw_length": len(data), "hash": raw_hash})
+                changed.append((offset, len(data)))
+            offset += len(data)
+
+        level = Config.COMPRESSION_LEVEL if level is None else level
+        sent = 0
         try:
-            response = requests.get(f"{self.namenode_url}/get_file_blocks?file_name={file_name}")
+            response = self.http.post(f"{self.namenode_url}/sync_file", json={
+                "file_name": file_name, "blocks": plan, "codec": codec, "chunking": chunking
+            })
             if response.status_code != 200:
-                log("❌ Failed to get file block info.", level="error")
-                return
+                log(f"❌ Sync planning failed: {response.text}", level="error")
+                return False
+            sync_id = response.json()["sync_id"]
+            new_blocks = [info for step, info in zip(plan, response.json()["blocks"]) if "block_id" not in step]
 
-            block_info = response.json().get("blocks", [])
-            block_data = []
+            written = []
+            with open(file_path, "rb") as f:
+                for (offset, length), info in zip(changed, new_blocks):
+                    f.seek(offset)
+                    data = f.read(length)
+                    if hashlib.sha256(data).hexdigest() != info["hash"]:
+                        log(f"❌ '{file_path}' changed during the sync; sync not committed.", level="error")
+                        return False
+                    stored = compress_block(data, codec, level)
+                    stored_on = [url for url in info["datanodes"]
+                                 if self._send_block_to_datanode(url, info["block_id"], stored)]
+                    if not stored_on:
+                        log(f"❌ Could not store block {info['block_id']}; sync not committed.", level="error")
+                        return False
+                    written.append({"block_id": info["block_id"], "stored_length": len(stored),
+                                    "datanodes": stored_on})
+                    sent += len(stored)
 
-            for block in block_info:
-                block_id = block.get("block_id")
-                datanodes = block.get("datanodes", [])
+            response = self.http.post(f"{self.namenode_url}/commit_sync", json={"sync_id": sync_id,
+                                                                                "blocks": written})
+            if response.status_code != 200:
+                log(f"❌ Sync commit failed: {response.text}", level="error")
+                return False
+        except Exception as e:
+            log(f"❌ Sync failed: {e}", level="error")
+            return False
+
+        log(f"🔁 Synced '{file_name}': {len(changed)} of {len(plan)} blocks changed, {sent} bytes sent.")
+        return True
+
+    def _get_file_info(self, file_name):
+        """Returns (blocks, attributes) for a file, or (None, None) if the lookup fails."""
+        status, body = self._call_namenode("get_file_blocks", {"file_name": file_name}, http_method="get", read=True)
+        if status != 200:
+            log("❌ Failed to get file block info.", level="error")
+            return None, None
+        return body.get("blocks", []), body.get("attributes", {})
 
-                if not block_id or not datanodes:
-                    log(f"⚠️ Incomplete block info: {block}", level="warning")
+    def _fetch_stored_block(self, block):
+        """Reads a block's stored bytes from the first healthy replica; None if all fail."""
+        block_id = block.get("block_id")
+        datanodes = block.get("datanodes", [])
+
+        if not block_id or not datanodes:
+            log(f"⚠️ Incomplete block info: {block}", level="warning")
+            return None
+
+        if block.get("length") == 0:
+            return b""
+        # Packed small files are a byte range of a shared container block.
+        offset, length = block.get("offset"), block.get("length")
+        for node_url in datanodes:
+            data = self._get_block_from_datanode(node_url, block_id, offset, length)
+            if data:
+                return data
+        log(f"⚠️ No healthy replica of block {block_id}.", level="warning")
+        return None
+
+    def _iter_file_data(self, block_info, attributes, wanted=None):
+        """
+        Yields (block, data) for each data block of a file in order, with data
+        decompressed. Blocks rejected by `wanted` yield None without being fetched.
+        Lost cells of erasure-coded files are rebuilt from the rest of their stripe.
+        Raises IOError if a wanted block cannot be read.
+        """
+        codec = attributes.get("codec", "none")
+        erasure_coding = attributes.get("erasure_coding")
+        wanted = wanted or (lambda block: True)
+
+        if not erasure_coding:
+            for block in block_info:
+                if not wanted(block):
+                    yield block, None
                     continue
+                data = self._fetch_stored_block(block)
+                if data is None:
+                    raise IOError(f"Block {block.get('block_id')} is unavailable")
+                yield block, decompress_block(data, codec)
+            return
+
+        rs = ReedSolomon(erasure_coding["data_units"], erasure_coding["parity_units"])
+        stripes = {}
+        for block in block_info:
+            stripes.setdefault(block["stripe"], []).append(block)
+
+        for stripe in sorted(stripes):
+            data_blocks = [b for b in stripes[stripe] if "parity" not in b]
+            parity_blocks = sorted((b for b in stripes[stripe] if "parity" in b), key=lambda b: b["parity"])
+            cells = [self._fetch_stored_block(b) if wanted(b) else None for b in data_blocks]
+
+            if any(cell is None and wanted(b) for cell, b in zip(cells, data_blocks)):
+                cells = self._reconstruct_stripe(rs, data_blocks, parity_blocks, cells, wanted)
 
-                for node_url in datanodes:
-                    data = self._get_block_from_datanode(node_url, block_id)
-                    if data:
-                        block_data.append(data)
-                        break 
+            for block, cell in zip(data_blocks, cells):
+                if not wanted(block):
+                    yield block, None
+                else:
+                    yield block, decompress_block(cell[:block["stored_length"]], codec)
+
+    def _reconstruct_stripe(self, rs, data_blocks, parity_blocks, cells, wanted):
+        stripe = data_blocks[0]["stripe"]
+        log(f"🧩 Reconstructing stripe {stripe} from parity", level="warning")
+        cell_size = parity_blocks[0]["stored_length"]
+        # Cells beyond the end of a short last stripe are implicit zeros.
+        padding = [bytes(cell_size)] * (rs.data_units - len(data_blocks))
+        # Cells skipped by `wanted` were never fetched; the rest already failed.
+        all_cells = [
+            self._fetch_stored_block(block) if cell is None and not wanted(block) else cell
+            for block, cell in zip(data_blocks, cells)
+        ]
+        all_cells = [cell.ljust(cell_size, b"\0") if cell is not None else None for cell in all_cells]
+        all_cells += padding
+        for block in parity_blocks:
+            if sum(cell is not None for cell in all_cells) >= rs.data_units:
+                all_cells.append(None)
+            else:
+                all_cells.append(self._fetch_stored_block(block))
+        all_cells += [None] * (rs.parity_units - len(parity_blocks))
+
+        try:
+            decoded = rs.decode(all_cells)
+        except ValueError as e:
+            raise IOError(f"Stripe {stripe} cannot be reconstructed: {e}")
+        return decoded[:len(data_blocks)]
+
+    def get_files_info(self, file_names):
+        """
+        Looks up many files in one NameNode request. Returns {file_name: (blocks, attributes)},
+        with (None, None) for files that do not exist.
+        """
+        status, body = self._call_namenode("batch/get_file_blocks", {"file_names": list(file_names)}, read=True)
+        if status != 200:
+            log(f"❌ Failed to get file block info: {body}", level="error")
+            return {file_name: (None, None) for file_name in file_names}
+        missing = [file_name for file_name, result in body["results"].items() if "error" in result]
+        if missing and self.read_url:
+            # Files written since the standby's last sync are only known to the active node.
+            status, retry = self._call_namenode("batch/get_file_blocks", {"file_names": missing})
+            if status == 200:
+                body["results"].update(retry["results"])
+        return {
+            file_name: (None, None) if "error" in result else (result["blocks"], result.get("attributes", {}))
+            for file_name, result in body["results"].items()
+        }
+
+    @timed(OPERATION_SECONDS, op="download_many")
+    def download_files(self, file_names, output_dir):
+        """
+        Downloads many files into output_dir, resolving all block locations with a
+        single NameNode lookup. Returns {file_name: True/False}.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        try:
+            infos = self.get_files_info(file_names)
+        except Exception as e:
+            log(f"❌ Download failed: {e}", level="error")
+            return {file_name: False for file_name in file_names}
+
+        results = {}
+        for file_name, (block_info, attributes) in infos.items():
+            if block_info is None:
+                log(f"❌ '{file_name}' not found.", level="error")
+                results[file_name] = False
+                continue
+            try:
+                block_data = [data for _, data in self._iter_file_data(block_info, attributes)]
+                self.splitter.merge_blocks(block_data, os.path.join(output_dir, file_name))
+                results[file_name] = True
+            except Exception as e:
+                log(f"❌ Download of '{file_name}' failed: {e}", level="error")
+                results[file_name] = False
+        log(f"✅ Downloaded {sum(results.values())} of {len(results)} files to '{output_dir}'")
+        return results
 
-            self.splitter.merge_blocks(block_data, output_path)
+    @timed(OPERATION_SECONDS, op="download")
+    def download_file(self, file_name, output_path):
+        try:
+            block_info, attributes = self._get_file_info(file_name)
+            if block_info is None:
+                return
+
+            with span("client.fetch_blocks", blocks=len(block_info)):
+                block_data = [data for _, data in self._iter_file_data(block_info, attributes)]
+
+            with span("client.merge"):
+                self.splitter.merge_blocks(block_data, output_path)
             log(f"✅ Downloaded file saved to '{output_path}'")
 
         except Exception as e:
             log(f"❌ Download failed: {e}", level="error")
 
-    def _get_block_from_datanode(self, datanode_url, block_id):
+    def iter_file(self, file_name):
+        """
+        Yields a file's contents block by block, decompressed and with lost erasure-coded
+        cells rebuilt, holding one block (one stripe for erasure-coded files) in memory
+        at a time. Nothing is fetched until the first item is requested. Raises
+        FileNotFoundError if the file does not exist and IOError if a block cannot be read.
+        """
+        block_info, attributes = self._get_file_info(file_name)
+        if block_info is None:
+            raise FileNotFoundError(f"'{file_name}' not found")
+        for _, data in self._iter_file_data(block_info, attributes):
+            yield data
+
+    @timed(OPERATION_SECONDS, op="read_range")
+    def read_range(self, file_name, offset, length):
+        """
+        Returns `length` bytes of the file starting at `offset` (in uncompressed bytes),
+        fetching only the blocks that overlap the range.
+        """
+        block_info, attributes = self._get_file_info(file_name)
+        if block_info is None:
+            return None
+        data_blocks = [block for block in block_info if "parity" not in block]
+        if any("raw_length" not in block for block in data_blocks):
+            log(f"❌ '{file_name}' has no block length metadata; download it instead.", level="error")
+            return None
+
+        # Map each overlapping block to the slice of it that falls inside the range.
+        slices = {}
+        block_start = 0
+        for block in data_blocks:
+            block_end = block_start + block["raw_length"]
+            if block_end > offset and block_start < offset + length:
+                # Keyed per entry: a deduplicated block can appear more than once in a file.
+                slices[id(block)] = (max(offset - block_start, 0),
+                                             min(offset + length - block_start, block["raw_length"]))
+            block_start = block_end
+
+        result = bytearray()
         try:
-            url = f"{datanode_url}/read_block?block_id={block_id}"
-            response = requests.get(url)
-            if response.status_code == 200:
-                log(f"📥 Fetched block {block_id} from {datanode_url}")
-                return response.content
-            else:
-                log(f"⚠️ Failed to get block {block_id} from {datanode_url}", level="warning")
+            for block, data in self._iter_file_data(block_info, attributes,
+                                                    wanted=lambda b: id(b) in slices):
+                if data is not None:
+                    lo, hi = slices[id(block)]
+                    result.extend(data[lo:hi])
+        except IOError as e:
+            log(f"❌ Ranged read failed: {e}", level="error")
+            return None
+        return bytes(result)
+
+    def _get_block_from_datanode(self, datanode_url, block_id, offset=None, length=None):
+        """Fetches a whole block, or `length` bytes at `offset` within it."""
+        with BLOCK_SECONDS.labels("fetch", self.transport).time():
+            if self.short_circuit and self._is_local(datanode_url):
+                with span("client.short_circuit_read", block_id=block_id):
+                    data = self._read_block_short_circuit(datanode_url, block_id, offset, length)
+                if data is not None:
+                    return data
+
+            try:
+                params = {"block_id": block_id}
+                if offset is not None:
+                    params.update(offset=offset, length=length)
+                if self.transport == "rpc":
+                    return self._get_block_via_rpc(datanode_url, block_id, params)
+                response = self.http.get(f"{datanode_url}/read_block", params=params)
+                if response.status_code == 200:
+                    expected = response.headers.get("X-Block-CRC32")
+                    if expected is not None and int(expected) != zlib.crc32(response.content):
+                        log(f"⚠️ Block {block_id} from {datanode_url} failed checksum, trying another replica", level="warning")
+                        return None
+                    log("📥 Fetched block", level="debug", block_id=block_id, datanode=datanode_url)
+                    return response.content
+                else:
+                    log(f"⚠️ Failed to get block {block_id} from {datanode_url}", level="warning")
+                    return None
+            except Exception as e:
+                log(f"❌ Error fetching block from {datanode_url}: {e}", level="error")
+                return None
+
+    def _get_block_via_rpc(self, datanode_url, block_id, params):
+        try:
+            header, data = self._rpc(datanode_url, "read_block", params)
+        except RPCError as e:
+            log(f"⚠️ Failed to get block {block_id} from {datanode_url}: {e}", level="warning")
+            return None
+        if header.get("crc32") is not None and header["crc32"] != zlib.crc32(data):
+            log(f"⚠️ Block {block_id} from {datanode_url} failed checksum, trying another replica", level="warning")
+            return None
+        log("📥 Fetched block", level="debug", block_id=block_id, datanode=datanode_url)
+        return data
+
+    def _is_local(self, datanode_url):
+        if self._local_addresses is None:
+            addresses = {"127.0.0.1", "::1", "localhost"}
+            try:
+                addresses.update(socket.gethostbyname_ex(socket.gethostname())[2])
+            except OSError:
+                pass
+            self._local_addresses = addresses
+        host = urlparse(datanode_url).hostname or ""
+        return host in self._local_addresses or host.startswith("127.")
+
+    def _read_block_short_circuit(self, datanode_url, block_id, offset=None, length=None):
+        """
+        Reads a replica (or a range of it) straight from the local disk. Uses a file
+        descriptor passed over the DataNode's Unix socket when available, otherwise the
+        block path it reports. Returns None so the caller falls back to HTTP.
+        """
+        socket_path = self._short_circuit_sockets.get(datanode_url)
+        if socket_path:
+            data = self._read_block_via_domain_socket(socket_path, block_id, offset, length)
+            if data is not None:
+                return data
+
+        try:
+            response = self.http.get(
+                f"{datanode_url}/short_circuit_read", params={"block_id": block_id})
+            if response.status_code != 200:
+                return None
+            info = response.json()
+
+            if info.get("socket") and hasattr(socket, "recv_fds"):
+                self._short_circuit_sockets[datanode_url] = info["socket"]
+                data = self._read_block_via_domain_socket(info["socket"], block_id, offset, length)
+                if data is not None:
+                    return data
+
+            with open(info["path"], "rb") as f:
+                data = self._read_local_block(f.fileno(), info, block_id, offset, length)
+            log("⚡ Short-circuit read", level="debug", block_id=block_id, path=info["path"])
+            return data
+        except Exception as e:
+            log(f"⚠️ Short-circuit read of block {block_id} failed, using HTTP: {e}", level="warning")
+            return None
+
+    def _read_local_block(self, fd, info, block_id, offset=None, length=None):
+        """
+        Reads a block, or the chunks covering [offset, offset + length), from a local
+        file and checks them against the DataNode's checksum sidecar.
+        """
+        if offset is None:
+            offset, length = 0, info["length"]
+        length = max(0, min(length, info["length"] - offset))
+        start, end, first_chunk = offset, offset + length, 0
+        if info.get("checksums") is not None:
+            start, end, first_chunk = chunk_aligned_range(offset, length, info["chunk_size"], info["length"])
+
+        data = os.pread(fd, end - start, info["offset"] + start)
+        if len(data) != end - start:
+            raise ChecksumError(f"Short read of block {block_id}")
+        if info.get("checksums") is not None:
+            verify_checksums(data, info["checksums"], info["chunk_size"], first_chunk=first_chunk, block_id=block_id)
+        return data[offset - start:offset - start + length]
+
+    def _read_block_via_domain_socket(self, socket_path, block_id, offset=None, length=None):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(Config.REQUEST_TIMEOUT)
+                sock.connect(socket_path)
+                sock.sendall(block_id.encode("utf-8") + b"\n")
+                message, fds, _, _ = socket.recv_fds(sock, 64 * 1024, 1)
+                # Large checksum lists can spill past the message carrying the descriptor.
+                while message and not message.endswith(b"\n"):
+                    more = sock.recv(64 * 1024)
+                    if not more:
+                        break
+                    message += more
+            header = json.loads(message.decode("utf-8"))
+            if not fds:
                 return None
+            try:
+                data = self._read_local_block(fds[0], header, block_id, offset, length)
+            finally:
+                os.close(fds[0])
+            log("⚡ Short-circuit read via passed file descriptor", level="debug", block_id=block_id)
+            return data
         except Exception as e:
-            log(f"❌ Error fetching block from {datanode_url}: {e}", level="error")
+            log(f"⚠️ Domain socket read of block {block_id} failed: {e}", level="warning")
             return None
 
+    @timed(OPERATION_SECONDS, op="pack")
+    def pack_files(self, file_paths, container_size=None, replication=None):
+        """
+        Uploads many small files packed into a few container blocks (like a Hadoop
+        archive). Each file stays individually readable through a ranged read of its
+        container. Returns the number of files packed.
+        """
+        container_size = container_size or Config.PACK_CONTAINER_SIZE
+        paths = []
+        for file_path in map(Path, file_paths):
+            if not file_path.is_file():
+                log(f"⚠️ Skipping '{file_path}': not a file", level="warning")
+                continue
+            paths.append(file_path)
+        # Files are stored under their base name, so two inputs must not share one.
+        names = [file_path.name for file_path in paths]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            log(f"❌ Cannot pack several files named {', '.join(duplicates)}", level="error")
+            return 0
+
+        containers, files = [], []
+        current = bytearray()
+        for file_path in paths:
+            data = file_path.read_bytes()
+            if current and len(current) + len(data) > container_size:
+                containers.append(bytes(current))
+                current = bytearray()
+            files.append({
+                "file_name": file_path.name,
+                "container": len(containers),
+                "offset": len(current),
+                "length": len(data),
+                "hash": hashlib.sha256(data).hexdigest(),
+            })
+            current.extend(data)
+        if files and files[-1]["container"] == len(containers):
+            containers.append(bytes(current))
+        if not files:
+            log("❌ No files to pack", level="error")
+            return 0
+
+        try:
+            response = self.http.post(f"{self.namenode_url}/pack_files", json={
+                "containers": [len(container) for container in containers],
+                "files": files,
+                "replication": replication,
+            })
+            if response.status_code != 200:
+                log(f"❌ Packing failed: {response.text}", level="error")
+                return 0
+            for data, placement in zip(containers, response.json()["containers"]):
+                for datanode_url in placement["datanodes"]:
+                    self._send_block_to_datanode(datanode_url, placement["block_id"], data)
+        except Exception as e:
+            log(f"❌ Packing failed: {e}", level="error")
+            return 0
+
+        log(f"📦 Packed {len(files)} files into {len(containers)} container blocks.")
+        return len(files)
+
+    @timed(OPERATION_SECONDS, op="delete")
     def delete_file(self, file_name):
         try:
-            response = requests.post(f"{self.namenode_url}/delete_file", json={"file_name": file_name})
-            if response.status_code == 200:
-                log(response.json()["message"])
+            status, body = self._call_namenode("delete_file", {"file_name": file_name})
+            if status == 200:
+                log(body["message"])
             else:
-                log(f"❌ Error deleting file: {response.text}", level="error")
+                log(f"❌ Error deleting file: {body}", level="error")
+        except Exception as e:
+            log(f"❌ Exception during file deletion: {e}", level="error")
+
+    @timed(OPERATION_SECONDS, op="delete_many")
+    def delete_files(self, file_names):
+        """Deletes many files in one NameNode request. Returns {file_name: True/False}."""
+        try:
+            status, body = self._call_namenode("batch/delete_files", {"file_names": list(file_names)})
+            if status != 200:
+                log(f"❌ Error deleting files: {body}", level="error")
+                return {file_name: False for file_name in file_names}
         except Exception as e:
             log(f"❌ Exception during file deletion: {e}", level="error")
+            return {file_name: False for file_name in file_names}
+
+        results = {}
+        for file_name, result in body["results"].items():
+            if "error" in result:
+                log(f"❌ Could not delete '{file_name}': {result['error']}", level="error")
+            results[file_name] = "error" not in result
+        log(f"🗑️ Deleted {sum(results.values())} of {len(results)} files")
+        return results
+
+    @timed(OPERATION_SECONDS, op="copy")
+    def copy_file(self, source_name, destination_name):
+        """Copies a file inside HDFS; the DataNodes duplicate the blocks themselves."""
+        try:
+            response = self.http.post(
+                f"{self.namenode_url}/copy_file",
+                json={"source": source_name, "destination": destination_name}
+            )
+            if response.status_code == 200:
+                log(response.json()["message"])
+                return True
+            log(f"❌ Error copying file: {response.text}", level="error")
+        except Exception as e:
+            log(f"❌ Exception during file copy: {e}", level="error")
+        return False
+
+    @timed(OPERATION_SECONDS, op="set_replication")
+    def set_replication(self, file_name, replication):
+        """Changes a file's replication factor; the NameNode adds or trims replicas in the background."""
+        try:
+            response = self.http.post(
+                f"{self.namenode_url}/set_replication",
+                json={"file_name": file_name, "replication": replication}
+            )
+            if response.status_code == 200:
+                log(response.json()["message"])
+                return True
+            log(f"❌ Error setting replication: {response.text}", level="error")
+        except Exception as e:
+            log(f"❌ Exception setting replication: {e}", level="error")
+        return False
+
+    @timed(OPERATION_SECONDS, op="run_job")
+    def run_job(self, file_name, map_function, reduce_function=None, params=None):
+        """
+        Runs map_function ("module:function" inside Config.COMPUTE_ALLOWED_PACKAGES) on
+        every block of file_name, on DataNodes that hold the blocks, as
+        map_function(block_bytes, **params). Only the map results come back. Returns
+        reduce_function(results) (a callable or "module:function"), or without one the
+        list of results in block order. Returns None if the job fails.
+        """
+        try:
+            reduce = resolve_function(reduce_function) if isinstance(reduce_function, str) else reduce_function
+            status, job = self._call_namenode("submit_job", {
+                "file_name": file_name,
+                "function": map_function,
+                "params": params or {},
+            })
+            if status != 200:
+                log(f"❌ Could not submit job on '{file_name}': {job.get('error')}", level="error")
+                return None
+
+            while job["state"] == "running":
+                time.sleep(Config.COMPUTE_POLL_INTERVAL)
+                status, job = self._call_namenode("job_status", {"job_id": job["job_id"]}, http_method="get")
+                if status != 200:
+                    log(f"❌ Lost track of job: {job.get('error')}", level="error")
+                    return None
+        except Exception as e:
+            log(f"❌ Job failed: {e}", level="error")
+            return None
+
+        if job["state"] != "succeeded":
+            log(f"❌ Job {job['job_id']} failed: {job['error']}", level="error")
+            return None
+        log(f"✅ Job {job['job_id']}: {job['tasks']} tasks in {job['elapsed']}s "
+            f"({job['speculative']} speculative attempts, {job['speculative_won']} won)")
+        return reduce(job["results"]) if reduce else job["results"]
+
+    def get_metrics(self):
+        """
+        Client-side timings recorded by this process: {metric: {labels: summary}}, where
+        each summary has count, sum, mean and estimated p50/p95/p99 in seconds.
+        """
+        return REGISTRY.snapshot("hdfs_client_")
+
+    def get_dedup_stats(self):
+        try:
+            response = self.http.get(f"{self.namenode_url}/dedup_stats")
+            if response.status_code == 200:
+                return response.json()
+            log(f"❌ Error fetching dedup stats: {response.text}", level="error")
+        except Exception as e:
+            log(f"❌ Exception fetching dedup stats: {e}", level="error")
+        return None
 
     def list_files(self):
         try:
-            response = requests.get(f"{self.namenode_url}/files")
+            response = None
+            if self.read_url:
+                try:
+                    response = self.http.get(f"{self.read_url}/files", timeout=Config.REQUEST_TIMEOUT)
+                except requests.exceptions.RequestException as e:
+                    log(f"⚠️ Standby NameNode unavailable ({e}); listing from the active NameNode.", level="warning")
+            if response is None or response.status_code == 503:
+                response = self.http.get(f"{self.namenode_url}/files")
             log(f"📡 Response Code: {response.status_code}", level="info")
 
             if response.status_code == 200:
@@ -135,6 +1068,7 @@ class HDFSClient:
                 if isinstance(files, list):
                     if files:
                         log("📂 Files stored in HDFS:")
+                        flush_logs()
                         for file_name in files:
                             print(" -", file_name)
                     else:
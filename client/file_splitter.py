@@ -1,21 +1,52 @@
 import os
+from core.config import Config
 from core.logger import log
+from client.chunker import ContentDefinedChunker
 
 
 class FileSplitter:
     def __init__(self, block_size):
         self.block_size = block_size
 
-    def split_file(self, file_path):
-        """Splits the file into chunks of block_size and returns a list of bytes."""
+    def iter_blocks(self, file_path, chunking="fixed"):
+        """
+        Yields the file's blocks one at a time. "fixed" cuts every block_size bytes;
+        "cdc" cuts at content-defined boundaries (Config.CDC_*_SIZE).
+        """
+        with open(file_path, 'rb') as f:
+            if chunking == "cdc":
+                chunker = ContentDefinedChunker(Config.CDC_MIN_SIZE, Config.CDC_AVG_SIZE, Config.CDC_MAX_SIZE)
+                yield from chunker.chunks(f)
+                return
+            while True:
+                chunk = f.read(self.block_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def iter_stream(self, source):
+        """
+        Yields block_size blocks from a binary stream (pipe, socket, ...) or an iterable of
+        bytes, without knowing the total length. Short reads are gathered into full blocks.
+        """
+        if hasattr(source, "read"):
+            chunks = iter(lambda: source.read(self.block_size), b"")
+        else:
+            chunks = iter(source)
+        buffer = bytearray()
+        for chunk in chunks:
+            buffer.extend(chunk)
+            while len(buffer) >= self.block_size:
+                yield bytes(buffer[:self.block_size])
+                del buffer[:self.block_size]
+        if buffer:
+            yield bytes(buffer)
+
+    def split_file(self, file_path, chunking="fixed"):
+        """Splits the file into blocks (see iter_blocks) and returns a list of bytes."""
         blocks = []
         try:
-            with open(file_path, 'rb') as f:
-                while True:
-                    chunk = f.read(self.block_size)
-                    if not chunk:
-                        break
-                    blocks.append(chunk)
+            blocks = list(self.iter_blocks(file_path, chunking))
             log(f"Split '{file_path}' into {len(blocks)} blocks.")
         except Exception as e:
             log(f"Error splitting file: {e}", level="error")
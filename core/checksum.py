@@ -0,0 +1,79 @@
+import struct
+import zlib
+from core.config import Config
+
+# Sidecar layout: header | one big-endian CRC32 per chunk
+SIDECAR_HEADER = struct.Struct(">4sIQI")  # magic, chunk size, data length, chunk count
+SIDECAR_MAGIC = b"HCRC"
+
+
+class ChecksumError(Exception):
+    """Raised when stored block data no longer matches its checksums."""
+
+
+def compute_checksums(data, chunk_size=None):
+    """Returns the CRC32 of every chunk_size slice of data."""
+    chunk_size = chunk_size or Config.CHECKSUM_CHUNK_SIZE
+    view = memoryview(data)
+    return [zlib.crc32(view[i:i + chunk_size]) for i in range(0, len(data), chunk_size)]
+
+
+def read_with_checksums(stream, chunk_size=None):
+    """Reads a stream to the end in one pass, checksumming each chunk as it arrives."""
+    chunk_size = chunk_size or Config.CHECKSUM_CHUNK_SIZE
+    buffer = bytearray()
+    checksums = []
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        # A short read mid-stream would misalign chunks, so top each one up to chunk_size.
+        while len(chunk) < chunk_size:
+            more = stream.read(chunk_size - len(chunk))
+            if not more:
+                break
+            chunk += more
+        checksums.append(zlib.crc32(chunk))
+        buffer.extend(chunk)
+    return bytes(buffer), checksums
+
+
+def verify_checksums(data, checksums, chunk_size, first_chunk=0, block_id=None):
+    """
+    Verifies data chunk by chunk against checksums[first_chunk:], stopping at the first
+    mismatch. `data` must start on a chunk boundary.
+    """
+    view = memoryview(data)
+    for i, offset in enumerate(range(0, len(data), chunk_size)):
+        index = first_chunk + i
+        if index >= len(checksums) or zlib.crc32(view[offset:offset + chunk_size]) != checksums[index]:
+            raise ChecksumError(f"Checksum mismatch in block {block_id} at chunk {index}")
+
+
+def chunk_aligned_range(offset, length, chunk_size, data_length):
+    """
+    Widens [offset, offset + length) to whole checksum chunks so the bytes can be verified.
+    Returns (start, end, first_chunk); the caller slices offset - start onwards.
+    """
+    start = (offset // chunk_size) * chunk_size
+    end = min(-(-(offset + length) // chunk_size) * chunk_size, data_length)
+    return start, end, start // chunk_size
+
+
+def pack_checksums(checksums, data_length, chunk_size=None):
+    chunk_size = chunk_size or Config.CHECKSUM_CHUNK_SIZE
+    header = SIDECAR_HEADER.pack(SIDECAR_MAGIC, chunk_size, data_length, len(checksums))
+    return header + struct.pack(f">{len(checksums)}I", *checksums)
+
+
+def unpack_checksums(blob):
+    """Returns (chunk_size, data_length, checksums) from a sidecar blob."""
+    magic, chunk_size, data_length, count = SIDECAR_HEADER.unpack_from(blob)
+    if magic != SIDECAR_MAGIC:
+        raise ChecksumError("Invalid checksum sidecar")
+    checksums = list(struct.unpack_from(f">{count}I", blob, SIDECAR_HEADER.size))
+    return chunk_size, data_length, checksums
+
+
+def sidecar_size(count):
+    return SIDECAR_HEADER.size + 4 * count
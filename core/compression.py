@@ -0,0 +1,28 @@
+import bz2
+import lzma
+import zlib
+
+# Codec name -> (compress(data, level), decompress(data), default level)
+CODECS = {
+    "none": (lambda data, level: data, lambda data: data, None),
+    "zlib": (lambda data, level: zlib.compress(data, level), zlib.decompress, 6),
+    "lzma": (lambda data, level: lzma.compress(data, preset=level), lzma.decompress, 6),
+    "bz2": (lambda data, level: bz2.compress(data, compresslevel=level), bz2.decompress, 9),
+}
+
+
+def validate_codec(codec):
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec '{codec}' (expected one of {sorted(CODECS)})")
+    return codec
+
+
+def compress_block(data, codec, level=None):
+    """Compresses one block independently; module-level so it can run in a process pool."""
+    compress, _, default_level = CODECS[validate_codec(codec)]
+    return compress(data, default_level if level is None else level)
+
+
+def decompress_block(data, codec):
+    _, decompress, _ = CODECS[validate_codec(codec)]
+    return decompress(data)
@@ -0,0 +1,49 @@
+import importlib
+import signal
+from core.config import Config
+
+
+class TaskTimeout(Exception):
+    """Raised inside a task process when its map function runs out of time."""
+
+
+def _timed_out(signum, frame):
+    raise TaskTimeout()
+
+
+def resolve_function(path):
+    """
+    Imports a compute job function given as "module:function". DataNodes run whatever
+    a job names, so only modules inside Config.COMPUTE_ALLOWED_PACKAGES are accepted.
+    Raises ValueError for anything else.
+    """
+    module_name, _, name = (path or "").partition(":")
+    if not module_name or not name:
+        raise ValueError(f"Function must be given as 'module:function', not {path!r}")
+    if not any(module_name == package or module_name.startswith(package + ".")
+               for package in Config.COMPUTE_ALLOWED_PACKAGES):
+        raise ValueError(f"Module '{module_name}' is not in Config.COMPUTE_ALLOWED_PACKAGES")
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError as e:
+        raise ValueError(f"Cannot import '{module_name}': {e}")
+    function = getattr(module, name, None)
+    if not callable(function):
+        raise ValueError(f"'{path}' is not a function")
+    return function
+
+
+def run_map(function_path, data, params, timeout=None):
+    """
+    Entry point of DataNode task processes: applies a map function to one block. An
+    alarm interrupts the function after `timeout` seconds, so the worker is free again
+    when the DataNode reports the timeout.
+    """
+    if timeout:
+        signal.signal(signal.SIGALRM, _timed_out)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return resolve_function(function_path)(data, **params)
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
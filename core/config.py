@@ -6,9 +6,29 @@ class Config:
     # Timeout for requests (useful in case network hiccups)
     REQUEST_TIMEOUT = 3  
 
-    # Enable debug logging
+    # Enable debug logging (per-block and heartbeat events)
     DEBUG = True 
 
+    # Minimum level logged: "debug", "info", "warning" or "error" (None = "debug" if DEBUG else "info")
+    LOG_LEVEL = None
+
+    # Log line format: "text" ([time] [LEVEL] message key=value), "kv" (logfmt) or "json"
+    LOG_FORMAT = "text"
+
+    # Records buffered for the background log writer; further records are dropped and counted
+    LOG_QUEUE_SIZE = 10000
+
+    # Sampled events (heartbeats) are logged at most once per key every this many seconds
+    LOG_SAMPLE_INTERVAL = 10
+
+    # Largest X-Trace-Spans response header; spans beyond it are dropped (and counted),
+    # as HTTP clients reject header lines over 64 KB
+    TRACE_HEADER_MAX_BYTES = 32 * 1024
+
+    # /admin/profile: longest window a caller may ask for, and seconds between stack samples
+    PROFILE_MAX_SECONDS = 60
+    PROFILE_SAMPLE_INTERVAL = 0.01
+
     # Default ports
     NAMENODE_PORT = 8000
     DATANODE_PORT = 5000
@@ -28,4 +48,131 @@ class Config:
     # Storage paths
     DATA_DIR = "data"
     METADATA_DIR = "metadata"
-    METADATA_FILE = f"{METADATA_DIR}/files_metadata.json"
\ No newline at end of file
+    METADATA_FILE = f"{METADATA_DIR}/files_metadata.json"
+
+    # Default per-file compression codec for uploads: "none", "zlib", "lzma" or "bz2"
+    COMPRESSION_CODEC = "none"
+
+    # Compression level (None = codec default)
+    COMPRESSION_LEVEL = None
+
+    # Processes used to compress blocks on upload (1 = compress inline)
+    COMPRESSION_WORKERS = 1
+
+    # Erasure coding layout: each stripe has EC_DATA_UNITS data cells and EC_PARITY_UNITS
+    # parity cells on distinct DataNodes (4+2 = 1.5x storage, survives any 2 lost cells)
+    EC_DATA_UNITS = 4
+    EC_PARITY_UNITS = 2
+
+    # How uploads split files: "fixed" (BLOCK_SIZE blocks) or "cdc" (content-defined chunks)
+    CHUNKING = "fixed"
+
+    # Content-defined chunking: chunk size bounds and target average in bytes
+    CDC_MIN_SIZE = 32 * 1024
+    CDC_AVG_SIZE = 128 * 1024
+    CDC_MAX_SIZE = 512 * 1024
+
+    # Name blocks by the SHA-256 of their content and skip blocks the cluster already stores
+    DEDUP = False
+
+    # Target size of the container blocks that pack_files fills with small files
+    PACK_CONTAINER_SIZE = 8 * 1024 * 1024
+
+    # Seconds a streaming writer may go without renewing its lease before the
+    # unfinished file and its blocks are discarded
+    LEASE_TIMEOUT = 60
+
+    # Block allocations a streaming upload requests ahead of the data it has read
+    STREAM_PREFETCH_BLOCKS = 2
+
+    # Seconds a planned sync may stay uncommitted before its uploaded blocks are discarded
+    SYNC_TIMEOUT = 60 * 60
+
+    # Use the binary RPC transport (length-prefixed frames over persistent TCP connections)
+    # for NameNode metadata calls and DataNode block transfers. The HTTP API stays available.
+    RPC_TRANSPORT = False
+
+    # Each node's RPC listener runs on its HTTP port plus this offset (NameNode 9000, DataNodes 6001, ...)
+    RPC_PORT_OFFSET = 1000
+
+    # Threads that execute RPC handlers, seconds a client waits for a reply, and the largest frame accepted
+    RPC_WORKERS = 16
+    RPC_TIMEOUT = 30
+    RPC_MAX_FRAME = 256 * 1024 * 1024
+
+    # Mutations the NameNode keeps in memory for standby NameNodes to replay; a standby
+    # that falls further behind bootstraps from a fresh snapshot instead
+    EDIT_LOG_RETAINED = 10000
+
+    # Read-only standby NameNode for clients and the web UI (None = read from NAMENODE_URL),
+    # how often it polls the active NameNode for edits, and how many seconds without a
+    # successful poll it tolerates before refusing reads (503) so clients use the active node
+    NAMENODE_READ_URL = None
+    STANDBY_POLL_INTERVAL = 0.5
+    STANDBY_MAX_STALENESS = 5
+
+    # Files per page of the NameNode /summary view (the web UI file list), and the largest page a caller may request
+    SUMMARY_PAGE_SIZE = 50
+    SUMMARY_MAX_PAGE_SIZE = 1000
+
+    # Seconds between /events checks for DataNode status and namespace changes, and
+    # between keep-alive comments on an otherwise idle event stream
+    EVENTS_INTERVAL = 1
+    EVENTS_KEEPALIVE = 15
+
+    # DataNode block storage backend: "file" (one .block file per block) or "segment" (log-structured)
+    STORAGE_BACKEND = "file"
+
+    # Segment backend: roll to a new segment file after this many bytes
+    SEGMENT_SIZE = 64 * 1024 * 1024
+
+    # Segment backend: compact sealed segments once this fraction of their bytes is garbage
+    SEGMENT_COMPACTION_THRESHOLD = 0.5
+
+    # Segment backend: seconds between compaction passes (0 disables background compaction)
+    SEGMENT_COMPACTION_INTERVAL = 60
+
+    # Segment backend: checkpoint the offset index after this many appends
+    SEGMENT_CHECKPOINT_EVERY = 100
+
+    # Bytes covered by each CRC32 in a block's checksum sidecar
+    CHECKSUM_CHUNK_SIZE = 4 * 1024
+
+    # Background block scanner: read budget in bytes/sec and seconds between full passes
+    BLOCK_SCANNER_BYTES_PER_SEC = 1024 * 1024
+    BLOCK_SCANNER_INTERVAL = 6 * 60 * 60
+
+    # Let clients on a DataNode's host read block files directly instead of over HTTP
+    SHORT_CIRCUIT_READS = True
+
+    # Directory for the Unix domain sockets DataNodes use to pass block file descriptors
+    SHORT_CIRCUIT_SOCKET_DIR = "/tmp/hdfs_sockets"
+
+    # DataNode I/O scheduler limits per traffic class, highest priority first
+    # rate/burst are in bytes (0 = unlimited), max_concurrency is operations in flight (0 = unlimited)
+    IO_CLASS_LIMITS = {
+        "read": {"rate": 0, "max_concurrency": 16},
+        "write": {"rate": 0, "max_concurrency": 8},
+        "maintenance": {"rate": 10 * 1024 * 1024, "max_concurrency": 2},
+    }
+
+    # Data-local compute jobs (HDFSClient.run_job): map tasks a DataNode runs at once (its
+    # worker process pool, and the NameNode's per-DataNode scheduling limit), seconds one
+    # task may run, extra seconds before a task that ignores its timeout (stuck in C code)
+    # gets its worker pool killed, and the only packages map and reduce functions may be
+    # imported from
+    COMPUTE_WORKERS = 2
+    COMPUTE_TASK_TIMEOUT = 300
+    COMPUTE_TIMEOUT_GRACE = 5
+    COMPUTE_ALLOWED_PACKAGES = ("jobs",)
+
+    # Speculative execution: once this fraction of a job's tasks has finished, a task running
+    # SPECULATIVE_SLOWDOWN times longer than their median (and at least SPECULATIVE_MIN_SECONDS)
+    # gets a second attempt on another replica; the first result wins
+    SPECULATIVE_MIN_DONE = 0.5
+    SPECULATIVE_SLOWDOWN = 2.0
+    SPECULATIVE_MIN_SECONDS = 1.0
+
+    # Finished jobs the NameNode keeps for /job_status, and seconds between run_job's status polls
+    COMPUTE_JOBS_RETAINED = 100
+    COMPUTE_POLL_INTERVAL = 0.2
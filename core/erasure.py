@@ -0,0 +1,115 @@
+import numpy as np
+
+# GF(256) arithmetic over the primitive polynomial x^8 + x^4 + x^3 + x^2 + 1 (0x11d).
+GF_EXP = np.zeros(512, dtype=np.uint8)
+GF_LOG = np.zeros(256, dtype=np.int32)
+
+_value = 1
+for _power in range(255):
+    GF_EXP[_power] = _value
+    GF_LOG[_value] = _power
+    _value <<= 1
+    if _value & 0x100:
+        _value ^= 0x11d
+GF_EXP[255:510] = GF_EXP[:255]
+
+# GF_MUL[a] is the 256-entry "multiply by a" table, so a * cell is GF_MUL[a][cell].
+GF_MUL = np.zeros((256, 256), dtype=np.uint8)
+for _a in range(1, 256):
+    GF_MUL[_a, 1:] = GF_EXP[(GF_LOG[_a] + GF_LOG[1:]) % 255]
+
+
+def gf_mul(a, b):
+    return int(GF_MUL[a, b])
+
+
+def gf_inv(a):
+    if a == 0:
+        raise ZeroDivisionError("0 has no inverse in GF(256)")
+    return int(GF_EXP[255 - GF_LOG[a]])
+
+
+def gf_invert_matrix(matrix):
+    """Inverts a square matrix over GF(256) with Gauss-Jordan elimination."""
+    size = len(matrix)
+    rows = [list(row) + [1 if i == j else 0 for j in range(size)] for i, row in enumerate(matrix)]
+    for col in range(size):
+        pivot = next((r for r in range(col, size) if rows[r][col]), None)
+        if pivot is None:
+            raise ValueError("Matrix is singular")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        inv = gf_inv(rows[col][col])
+        rows[col] = [gf_mul(inv, v) for v in rows[col]]
+        for r in range(size):
+            factor = rows[r][col]
+            if r != col and factor:
+                rows[r] = [v ^ gf_mul(factor, p) for v, p in zip(rows[r], rows[col])]
+    return [row[size:] for row in rows]
+
+
+class ReedSolomon:
+    """
+    Systematic Reed-Solomon code with data_units data cells and parity_units parity cells
+    per stripe. Parity rows form a Cauchy matrix, so any data_units of the
+    data_units + parity_units cells are enough to rebuild the stripe.
+    """
+
+    def __init__(self, data_units, parity_units):
+        if data_units < 1 or parity_units < 1 or data_units + parity_units > 256:
+            raise ValueError("Need data_units >= 1, parity_units >= 1 and at most 256 cells per stripe")
+        self.data_units = data_units
+        self.parity_units = parity_units
+        self.parity_matrix = [
+            [gf_inv((data_units + i) ^ j) for j in range(data_units)]
+            for i in range(parity_units)
+        ]
+
+    def _generator_row(self, index):
+        if index < self.data_units:
+            return [1 if j == index else 0 for j in range(self.data_units)]
+        return self.parity_matrix[index - self.data_units]
+
+    @staticmethod
+    def _combine(coefficients, cells, cell_size):
+        out = np.zeros(cell_size, dtype=np.uint8)
+        for coefficient, cell in zip(coefficients, cells):
+            if coefficient == 1:
+                out ^= cell
+            elif coefficient:
+                out ^= GF_MUL[coefficient][cell]
+        return out
+
+    def encode(self, data_cells):
+        """
+        Computes the parity cells for one stripe. All data cells must have the same length.
+        """
+        if len(data_cells) != self.data_units:
+            raise ValueError(f"Expected {self.data_units} data cells, got {len(data_cells)}")
+        cell_size = len(data_cells[0])
+        cells = [np.frombuffer(cell, dtype=np.uint8) for cell in data_cells]
+        return [self._combine(row, cells, cell_size).tobytes() for row in self.parity_matrix]
+
+    def decode(self, cells):
+        """
+        Rebuilds the data cells of a stripe. `cells` lists all data and then parity cells,
+        with None for every cell that is missing. Returns the data cells.
+        """
+        available = [i for i, cell in enumerate(cells) if cell is not None]
+        if len(available) < self.data_units:
+            raise ValueError(f"Only {len(available)} of {len(cells)} cells available, "
+                             f"need {self.data_units} to decode")
+        if all(cells[i] is not None for i in range(self.data_units)):
+            return list(cells[:self.data_units])
+
+        chosen = available[:self.data_units]
+        cell_size = len(cells[chosen[0]])
+        inputs = [np.frombuffer(cells[i], dtype=np.uint8) for i in chosen]
+        decode_matrix = gf_invert_matrix([self._generator_row(i) for i in chosen])
+
+        data = []
+        for j in range(self.data_units):
+            if cells[j] is not None:
+                data.append(cells[j])
+            else:
+                data.append(self._combine(decode_matrix[j], inputs, cell_size).tobytes())
+        return data
@@ -1,7 +1,155 @@
+import atexit
 import datetime
+import json
+import queue
+import sys
+import threading
+import time
+from core.config import Config
 
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
 
-def log(message, level="info"):
-    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    tag = level.upper()
-    print(f"[{now}] [{tag}] {message}")
\ No newline at end of file
+
+def _threshold():
+    level = Config.LOG_LEVEL or ("debug" if Config.DEBUG else "info")
+    return LEVELS[level]
+
+
+class _Sampler:
+    """Lets through at most one record per key every `interval` seconds and counts the rest."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.last_emitted = {}
+        self.suppressed = {}
+        self.lock = threading.Lock()
+
+    def admit(self, key, now):
+        """Returns None to drop the record, else how many records of key were dropped before it."""
+        with self.lock:
+            if now - self.last_emitted.get(key, float("-inf")) < self.interval:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return None
+            self.last_emitted[key] = now
+            return self.suppressed.pop(key, 0)
+
+
+class _Writer:
+    """
+    Background thread that formats and prints queued records, so callers only pay for
+    a queue put. When the queue is full records are dropped (and counted) rather
+    than blocking the caller.
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.queue = queue.Queue(maxsize=Config.LOG_QUEUE_SIZE)
+        self.dropped = 0
+        self.thread = None
+        self.start_lock = threading.Lock()
+
+    def put(self, record):
+        if self.thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self.start_lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self.thread.start()
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < 512:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = []
+            for record in batch:
+                if record is not None:
+                    lines.append(_format(*record))
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                lines.append(_format(time.time(), "warning", "Log queue full; dropped %d records", (dropped,), {}))
+            if lines:
+                try:
+                    self.stream.write("\n".join(lines) + "\n")
+                    self.stream.flush()
+                except (OSError, ValueError):
+                    # A closed stdout (e.g. piped into `head`) must not kill the writer,
+                    # or flush() would wait forever on records nobody will mark done.
+                    pass
+            for _ in batch:
+                self.queue.task_done()
+
+    def flush(self):
+        """Waits until every queued record has been written."""
+        if self.thread is not None:
+            self.queue.join()
+
+
+def _format(created, level, message, args, fields):
+    if args:
+        try:
+            message = message % args
+        except (TypeError, ValueError):
+            message = f"{message} {args}"
+
+    if Config.LOG_FORMAT == "json":
+        return json.dumps({"time": created, "level": level, "msg": message, **fields}, default=str)
+
+    timestamp = datetime.datetime.fromtimestamp(created).strftime("%Y-%m-%d %H:%M:%S")
+    if Config.LOG_FORMAT == "kv":
+        pairs = {"time": timestamp, "level": level, "msg": message, **fields}
+        return " ".join(f"{key}={_kv_value(value)}" for key, value in pairs.items())
+
+    line = f"[{timestamp}] [{level.upper()}] {message}"
+    if fields:
+        line += " " + " ".join(f"{key}={_kv_value(value)}" for key, value in fields.items())
+    return line
+
+
+def _kv_value(value):
+    text = str(value)
+    if not text or any(c in text for c in ' "='):
+        return json.dumps(text, ensure_ascii=False)
+    return text
+
+
+_writer = _Writer()
+_sampler = _Sampler(Config.LOG_SAMPLE_INTERVAL)
+
+
+def log(message, *args, level="info", sample=None, **fields):
+    """
+    Queues a log record for the background writer.
+
+    Records below the configured level (Config.LOG_LEVEL, or debug/info from
+    Config.DEBUG) cost one comparison. `args` are %-formatted into message by the
+    writer thread, so pass them instead of pre-formatting hot-path messages. Keyword
+    fields are appended as key=value pairs (or JSON keys with Config.LOG_FORMAT =
+    "json"). Records with the same `sample` key are rate-limited to one per
+    Config.LOG_SAMPLE_INTERVAL seconds; the next one carries a suppressed=N count.
+    """
+    if LEVELS.get(level, 20) < _threshold():
+        return
+    now = time.time()
+    if sample is not None:
+        suppressed = _sampler.admit(sample, now)
+        if suppressed is None:
+            return
+        if suppressed:
+            fields["suppressed"] = suppressed
+    _writer.put((now, level, message, args, fields))
+
+
+def flush():
+    """Blocks until every record logged so far has been written."""
+    _writer.flush()
@@ -0,0 +1,299 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+
+# Request and I/O latencies in seconds, from half a millisecond to ten seconds.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(labelnames, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(labelnames, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """Context manager that observes the seconds spent inside it."""
+        return _Timer(self)
+
+    def quantile(self, q):
+        """Estimates the q-quantile by interpolating inside the bucket that contains it."""
+        with self.lock:
+            counts, total = list(self.counts), sum(self.counts)
+        if not total:
+            return None
+        rank, seen = q * total, 0
+        for index, count in enumerate(counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    return lower
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def summary(self):
+        with self.lock:
+            count, total = sum(self.counts), self.sum
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "mean": round(total / count, 6) if count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+
+class _Timer:
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.started)
+        return False
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=(), **options):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.options = options
+        self.children = {}
+        self.lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        key = tuple(str(value) for value in values) or tuple(str(kwargs[name]) for name in self.labelnames)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self):
+        with self.lock:
+            items = sorted(self.children.items(), key=lambda item: item[0])
+        return items
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._samples():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_label_text(self.labelnames, values)} {_number(child.value)}"]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def replace(self, values):
+        """Replaces every labelled value at once, e.g. with a fresh per-DataNode reading."""
+        children = {}
+        for labels, value in values.items():
+            child = _GaugeChild()
+            child.set(value)
+            children[labels if isinstance(labels, tuple) else (str(labels),)] = child
+        self.children = children
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_label_text(self.labelnames, values)} {_number(child.value)}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def _new_child(self):
+        return _HistogramChild(self.options.get("buckets") or LATENCY_BUCKETS)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _render_child(self, values, child):
+        with child.lock:
+            counts, total = list(child.counts), child.sum
+        lines, cumulative = [], 0
+        for bound, count in zip(list(child.buckets) + [float("inf")], counts):
+            cumulative += count
+            labels = _label_text(self.labelnames, values, [("le", _number(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _label_text(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_number(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metrics. Metrics are created once (get-or-create by name) and updated
+    through per-label children, each with its own lock, so hot paths never contend on
+    a registry-wide lock.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labelnames, **options):
+        metric = self.metrics.get(name)
+        if metric is None:
+            with self.lock:
+                metric = self.metrics.setdefault(name, cls(name, help_text, labelnames, **options))
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get(Counter, name, help_text, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._get(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=None):
+        return self._get(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        lines = []
+        for name in sorted(self.metrics):
+            lines.extend(self.metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self, prefix=""):
+        """Returns {metric: {labels: value or histogram summary}} for metrics starting with prefix."""
+        result = {}
+        for name, metric in sorted(self.metrics.items()):
+            if not name.startswith(prefix):
+                continue
+            values = {}
+            for key, child in metric._samples():
+                label = ",".join(f"{n}={v}" for n, v in zip(metric.labelnames, key)) or "total"
+                values[label] = child.summary() if isinstance(metric, Histogram) else child.value
+            result[name] = values
+        return result
+
+
+REGISTRY = MetricsRegistry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = counter("hdfs_http_requests_total", "HTTP requests handled",
+                        ("component", "endpoint", "method", "status"))
+HTTP_SECONDS = histogram("hdfs_http_request_duration_seconds", "HTTP request latency",
+                         ("component", "endpoint", "method"))
+
+
+def timed(metric, **labels):
+    """Decorator that observes each call's duration in a histogram."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with metric.labels(**labels).time():
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_app(app, component):
+    """
+    Times every request of a Flask app and counts it by endpoint and status. Flask
+    skips after_request hooks when a handler raises, so the sample is recorded at
+    teardown, with status 500 for unhandled exceptions.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _note_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _record_request(exc):
+        started = g.pop("metrics_started", None)
+        if started is not None:
+            status = g.pop("metrics_status", 500)
+            endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+            HTTP_SECONDS.labels(component, endpoint, request.method).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(component, endpoint, request.method, str(status)).inc()
@@ -0,0 +1,121 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from core.config import Config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("cpu", "wall", "memory")
+
+_running = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is still running."""
+
+
+def _location(filename, lineno, name=None):
+    path = os.path.relpath(filename, ROOT) if filename.startswith(ROOT) else os.path.basename(filename)
+    return f"{name} ({path}:{lineno})" if name else f"{path}:{lineno}"
+
+
+def _cpu_time(ident):
+    """CPU seconds a thread has used, or None where per-thread CPU clocks are unavailable."""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+
+def sample_stacks(seconds, top=25, cpu_only=True, interval=None):
+    """
+    Samples the Python stack of every other thread each `interval` seconds. cProfile only
+    sees the thread that enables it, while requests here run on many threads (HTTP
+    connections, RPC workers), so a sampler is what attributes time across all of them.
+    With cpu_only, a thread is only sampled if it used CPU since the previous sample, so
+    idle threads (waiting on sockets, sleeping) do not crowd out the hot code.
+    """
+    interval = interval or Config.PROFILE_SAMPLE_INTERVAL
+    me = threading.get_ident()
+    own, inclusive = Counter(), Counter()
+    # Threads started during the window count from zero CPU time.
+    last_cpu = {ident: _cpu_time(ident) for ident in sys._current_frames()} if cpu_only else {}
+    samples = 0
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            if cpu_only:
+                used, previous = _cpu_time(ident), last_cpu.get(ident, 0)
+                last_cpu[ident] = used
+                if used is not None and used == previous:
+                    continue
+            samples += 1
+            seen = set()
+            own[_location(frame.f_code.co_filename, frame.f_code.co_firstlineno, frame.f_code.co_name)] += 1
+            while frame is not None:
+                key = _location(frame.f_code.co_filename, frame.f_code.co_firstlineno, frame.f_code.co_name)
+                if key not in seen:
+                    seen.add(key)
+                    inclusive[key] += 1
+                frame = frame.f_back
+        time.sleep(interval)
+
+    def ranked(counts):
+        return [{"function": key, "samples": count, "percent": round(100 * count / samples, 1)}
+                for key, count in counts.most_common(top)]
+
+    return {"samples": samples, "interval": interval, "self": ranked(own), "cumulative": ranked(inclusive)}
+
+
+def trace_allocations(seconds, top=25):
+    """Returns the source lines whose allocated memory grew the most during the window."""
+    started_here = not tracemalloc.is_tracing()
+    if started_here:
+        tracemalloc.start()
+    try:
+        ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+        before = tracemalloc.take_snapshot().filter_traces(ignore)
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot().filter_traces(ignore)
+        traced, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+
+    return {
+        "traced_bytes": traced,
+        "peak_bytes": peak,
+        "allocations": [
+            {"location": _location(stat.traceback[0].filename, stat.traceback[0].lineno),
+             "size_diff": stat.size_diff, "size": stat.size, "count_diff": stat.count_diff}
+            for stat in after.compare_to(before, "lineno")[:top]
+        ],
+    }
+
+
+def profile(mode="cpu", seconds=5, top=25):
+    """
+    Profiles this process for `seconds` (at most Config.PROFILE_MAX_SECONDS) and returns
+    the hottest functions ("cpu" or "wall" stack samples) or allocation sites ("memory").
+    Raises ValueError for bad arguments and ProfilerBusy if a profile is already running.
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    seconds, top = float(seconds), int(top)
+    if not 0 < seconds <= Config.PROFILE_MAX_SECONDS:
+        raise ValueError(f"seconds must be between 0 and {Config.PROFILE_MAX_SECONDS}")
+    if not _running.acquire(blocking=False):
+        raise ProfilerBusy("A profile is already running")
+    try:
+        if mode == "memory":
+            result = trace_allocations(seconds, top)
+        else:
+            result = sample_stacks(seconds, top, cpu_only=mode == "cpu")
+    finally:
+        _running.release()
+    return {"mode": mode, "seconds": seconds, **result}
@@ -0,0 +1,228 @@
+import asyncio
+import contextlib
+import json
+import select
+import socket
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from core.config import Config
+from core.logger import log
+from core.metrics import counter, histogram
+from core.tracing import current as current_trace, span, start_trace
+
+# Every frame is: kind (1 byte), header length (4 bytes), payload length (4 bytes), then a
+# JSON header and the raw payload. Block data travels as the payload, never re-encoded.
+FRAME = struct.Struct("!BII")
+REQUEST, RESPONSE, ERROR = 0, 1, 2
+
+# Calls that are safe to run twice. Only these are re-sent when a reused connection
+# fails after the request went out, since the server may already have run it.
+IDEMPOTENT_METHODS = {"heartbeat", "get_file_blocks", "batch/get_file_blocks", "files", "read_block",
+                      "job_status"}
+
+RPC_SECONDS = histogram("hdfs_rpc_request_duration_seconds", "Binary RPC handler latency", ("method",))
+RPC_ERRORS = counter("hdfs_rpc_errors_total", "Binary RPC calls that failed", ("method", "status"))
+
+
+class RPCError(Exception):
+    """An RPC the peer rejected; status mirrors the HTTP status code of the same call."""
+
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+def rpc_address(http_url):
+    """Returns the (host, port) of the RPC listener belonging to a NameNode or DataNode URL."""
+    parsed = urlparse(http_url)
+    return parsed.hostname, parsed.port + Config.RPC_PORT_OFFSET
+
+
+def encode_frame(kind, header, payload=b""):
+    """Returns the frame prefix and header bytes; the payload is sent after them as-is."""
+    header = json.dumps(header, separators=(",", ":")).encode()
+    if len(header) + len(payload) > Config.RPC_MAX_FRAME:
+        raise RPCError("Frame too large", 413)
+    return FRAME.pack(kind, len(header), len(payload)) + header
+
+
+def _check_lengths(header_length, payload_length):
+    if header_length + payload_length > Config.RPC_MAX_FRAME:
+        raise RPCError("Frame too large", 413)
+
+
+def _recv_exact(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("Connection closed mid-frame")
+        received += count
+    return bytes(buffer)
+
+
+def read_frame(sock):
+    """Reads one frame from a blocking socket; returns (kind, header, payload)."""
+    kind, header_length, payload_length = FRAME.unpack(_recv_exact(sock, FRAME.size))
+    _check_lengths(header_length, payload_length)
+    header = json.loads(_recv_exact(sock, header_length))
+    return kind, header, _recv_exact(sock, payload_length)
+
+
+async def read_frame_async(reader):
+    kind, header_length, payload_length = FRAME.unpack(await reader.readexactly(FRAME.size))
+    _check_lengths(header_length, payload_length)
+    header = json.loads(await reader.readexactly(header_length))
+    return kind, header, await reader.readexactly(payload_length)
+
+
+class RPCServer:
+    """
+    Serves length-prefixed binary RPCs over persistent TCP connections.
+
+    handlers maps a method name to handler(args, payload). A handler returns a JSON-able
+    result, or a (result, payload) tuple to send bytes back; it raises RPCError (or
+    KeyError/ValueError for 404/400) to fail the call. Handlers run in a thread pool,
+    so they may block on locks or disk. The event loop runs in a daemon thread next to
+    the Flask app. Requests carrying a trace_id get their spans returned under "spans".
+    """
+
+    def __init__(self, handlers, host, port, workers=None, component="rpc"):
+        self.handlers = handlers
+        self.component = component
+        self.host = host
+        self.port = port
+        self.executor = ThreadPoolExecutor(max_workers=workers or Config.RPC_WORKERS)
+        self._ready = threading.Event()
+
+    def start(self):
+        thread = threading.Thread(target=asyncio.run, args=(self._serve(),), daemon=True)
+        thread.start()
+        self._ready.wait()
+        log(f"🔌 RPC transport listening on {self.host}:{self.port}")
+
+    async def _serve(self):
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        self._ready.set()
+        async with server:
+            await server.serve_forever()
+
+    def _dispatch(self, header, payload):
+        handler = self.handlers.get(header.get("method"))
+        if handler is None:
+            raise RPCError(f"Unknown method '{header.get('method')}'", 404)
+        trace_id = header.get("trace_id")
+        tracing = start_trace(trace_id, self.component) if trace_id else contextlib.nullcontext()
+        with RPC_SECONDS.labels(header["method"]).time(), tracing as trace:
+            with span(f"rpc {header['method']}"):
+                reply = handler(header.get("args") or {}, payload)
+        result, data = reply if isinstance(reply, tuple) else (reply, b"")
+        if trace is not None and isinstance(result, dict):
+            result = {**result, "spans": trace.spans}
+        return result, data
+
+    async def _handle(self, reader, writer):
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    kind, header, payload = await read_frame_async(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                if kind != REQUEST:
+                    break
+
+                try:
+                    result, data = await loop.run_in_executor(self.executor, self._dispatch, header, payload)
+                    writer.write(encode_frame(RESPONSE, result, data))
+                    writer.write(data)
+                except Exception as e:
+                    status = e.status if isinstance(e, RPCError) else \
+                        404 if isinstance(e, KeyError) else 400 if isinstance(e, ValueError) else 500
+                    RPC_ERRORS.labels(header.get("method"), status).inc()
+                    if status == 500:
+                        log(f"❌ RPC {header.get('method')} failed: {e}", level="error")
+                    writer.write(encode_frame(ERROR, {"error": str(e), "status": status}))
+                await writer.drain()
+        except (ConnectionError, RPCError, ValueError) as e:
+            log(f"⚠️ RPC connection dropped: {e}", level="warning")
+        finally:
+            writer.close()
+
+
+class RPCClient:
+    """
+    Blocking client for RPCServer. Keeps one persistent connection, reconnecting when
+    the server has closed it; calls from several threads are serialized.
+    """
+
+    def __init__(self, host, port, timeout=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout or Config.RPC_TIMEOUT
+        self.sock = None
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        if self.sock is not None and self._closed_by_peer(self.sock):
+            self.close()
+        if self.sock is None:
+            self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return self.sock
+
+    @staticmethod
+    def _closed_by_peer(sock):
+        """True if an idle connection was closed by the server (it reads as EOF or reset)."""
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+            return bool(readable) and not sock.recv(1, socket.MSG_PEEK)
+        except OSError:
+            return True
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def call(self, method, args=None, payload=b""):
+        """Invokes method on the server; returns (result, payload) or raises RPCError."""
+        trace = current_trace()
+        request = {"method": method, "args": args or {}}
+        if trace is not None:
+            request["trace_id"] = trace.trace_id
+        prefix = encode_frame(REQUEST, request, payload)
+        with self.lock:
+            # A reused connection may have been closed by the server while idle; retry once
+            # on a fresh one if the request never got out, or if running it twice is
+            # harmless. A fresh connection failing is a real error.
+            for reused in (self.sock is not None, False):
+                sock = self._connect()
+                sent = False
+                try:
+                    sock.sendall(prefix)
+                    if payload:
+                        sock.sendall(payload)
+                    sent = True
+                    kind, header, data = read_frame(sock)
+                    break
+                except ConnectionError:
+                    self.close()
+                    if not reused or (sent and method not in IDEMPOTENT_METHODS):
+                        raise
+                except (OSError, RPCError, ValueError):
+                    # The stream is no longer in a known state; never reuse it.
+                    self.close()
+                    raise
+        if kind == ERROR:
+            raise RPCError(header.get("error", "RPC failed"), header.get("status", 500))
+        if trace is not None:
+            trace.extend(header.pop("spans", []))
+        return header, data
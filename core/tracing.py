@@ -0,0 +1,206 @@
+import contextlib
+import contextvars
+import json
+import threading
+import time
+import uuid
+from urllib.parse import urlparse
+import requests
+from core.config import Config
+
+# The client sends TRACE_HEADER with every request made inside a trace; a NameNode or
+# DataNode that sees it records spans for the request and returns them in SPANS_HEADER.
+TRACE_HEADER = "X-Trace-Id"
+SPANS_HEADER = "X-Trace-Spans"
+
+_current = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """Spans recorded for one trace ID in this process, plus any returned by its peers."""
+
+    def __init__(self, trace_id=None, component="client"):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.component = component
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def add(self, span):
+        with self.lock:
+            self.spans.append(span)
+
+    def extend(self, spans):
+        with self.lock:
+            self.spans.extend(spans)
+
+    def timeline(self):
+        """Spans ordered by start time, with offset_ms relative to the earliest one."""
+        with self.lock:
+            spans = sorted(self.spans, key=lambda span: span["start"])
+        if not spans:
+            return []
+        origin = spans[0]["start"]
+        return [{"offset_ms": round((span["start"] - origin) * 1000, 3), **span} for span in spans]
+
+    def format(self):
+        lines = [f"Trace {self.trace_id}"]
+        for span in self.timeline():
+            attrs = " ".join(f"{key}={value}" for key, value in span.get("attrs", {}).items())
+            lines.append(f"{span['offset_ms']:>10.3f} ms {span['duration_ms']:>10.3f} ms  "
+                         f"{span['component']:<9} {span['name']} {attrs}".rstrip())
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def start_trace(trace_id=None, component="client"):
+    """Makes a new Trace current until the block exits: `with start_trace() as trace: ...`."""
+    trace = Trace(trace_id, component)
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+class _Span:
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        span = {"name": self.name, "component": self.trace.component, "start": self.start,
+                "duration_ms": round((time.perf_counter() - self.started) * 1000, 3)}
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        if self.attrs:
+            span["attrs"] = self.attrs
+        self.trace.add(span)
+        return False
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def current():
+    return _current.get()
+
+
+def span(name, **attrs):
+    """Times a phase of the current trace; outside a trace it costs one lookup."""
+    trace = _current.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name, attrs)
+
+
+def headers():
+    """Headers that carry the current trace to a peer ({} outside a trace)."""
+    trace = _current.get()
+    return {TRACE_HEADER: trace.trace_id} if trace else {}
+
+
+def absorb(response_headers):
+    """
+    Adds the spans a peer returned in its response headers to the current trace. A
+    malformed header is ignored; tracing must never fail the traced operation.
+    """
+    trace = _current.get()
+    if trace is None or not response_headers or SPANS_HEADER not in response_headers:
+        return
+    try:
+        spans = json.loads(response_headers[SPANS_HEADER])
+    except ValueError:
+        return
+    if isinstance(spans, list):
+        trace.extend(span for span in spans if isinstance(span, dict) and "start" in span)
+
+
+def encode_spans(spans, limit=None):
+    """
+    JSON for SPANS_HEADER, at most `limit` bytes (Config.TRACE_HEADER_MAX_BYTES), since
+    HTTP clients reject long header lines. The last span (the request's own) is always
+    kept, then the earliest others that fit; a "spans dropped" span counts the rest.
+    """
+    limit = Config.TRACE_HEADER_MAX_BYTES if limit is None else limit
+    encoded = [json.dumps(span, separators=(",", ":")) for span in spans]
+    if sum(len(item) + 1 for item in encoded) + 1 <= limit:
+        return "[" + ",".join(encoded) + "]"
+
+    own, others = encoded[-1:], encoded[:-1]
+    last = spans[-1]
+
+    def marker(dropped):
+        return json.dumps({"name": "spans dropped", "component": last.get("component", ""),
+                           "start": last.get("start", 0), "duration_ms": 0, "attrs": {"dropped": dropped}},
+                          separators=(",", ":"))
+
+    used = len(own[0]) + len(marker(len(others))) + 3
+    kept = []
+    for item in others:
+        if used + len(item) + 1 > limit:
+            break
+        kept.append(item)
+        used += len(item) + 1
+    return "[" + ",".join(kept + [marker(len(others) - len(kept))] + own) + "]"
+
+
+class TracedSession(requests.Session):
+    """
+    requests.Session that propagates the current trace: each request gets the trace
+    header and a span, and the peer's spans are merged in from the response.
+    """
+
+    def request(self, method, url, **kwargs):
+        trace = _current.get()
+        if trace is None:
+            return super().request(method, url, **kwargs)
+        kwargs["headers"] = {**(kwargs.get("headers") or {}), TRACE_HEADER: trace.trace_id}
+        with span(f"{method.upper()} {urlparse(url).path}", peer=urlparse(url).netloc):
+            response = super().request(method, url, **kwargs)
+        absorb(response.headers)
+        return response
+
+
+def trace_app(app, component):
+    """
+    Records a span for every Flask request that carries a trace header, and returns
+    the spans recorded while handling it (including nested ones) in SPANS_HEADER,
+    capped at Config.TRACE_HEADER_MAX_BYTES.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_trace():
+        trace_id = request.headers.get(TRACE_HEADER)
+        if trace_id:
+            g.trace = Trace(trace_id, component)
+            g.trace_token = _current.set(g.trace)
+            g.trace_span = _Span(g.trace, f"{request.method} {request.path}", {}).__enter__()
+
+    @app.after_request
+    def _return_spans(response):
+        trace = g.pop("trace", None)
+        if trace is not None:
+            g.pop("trace_span").__exit__(None, None, None)
+            response.headers[SPANS_HEADER] = encode_spans(trace.spans)
+        return response
+
+    @app.teardown_request
+    def _end_trace(exc):
+        token = g.pop("trace_token", None)
+        if token is not None:
+            _current.reset(token)
@@ -10,5 +10,6 @@ This package handles:
 """
 
 from .datanode import DataNode
-from .storage import BlockStorage
+from .storage import BlockStorage, create_block_storage
+from .segment_storage import SegmentBlockStorage
 from .heartbeat import HeartbeatManager
\ No newline at end of file
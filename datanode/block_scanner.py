@@ -0,0 +1,58 @@
+import time
+from core.checksum import ChecksumError
+from core.config import Config
+from core.logger import log
+from datanode.io_scheduler import TokenBucket
+
+
+class BlockScanner:
+    def __init__(self, storage, io_scheduler, on_corrupt_block, bytes_per_sec=None, interval=None):
+        """
+        Periodically re-verifies every stored block against its checksums.
+        :param storage: Block storage backend to scrub
+        :param io_scheduler: DataNode I/O scheduler; scans run in the 'maintenance' class
+        :param on_corrupt_block: Callback invoked with the ID of each corrupt block
+        :param bytes_per_sec: Read budget for the scanner itself, on top of the class limit
+        :param interval: Seconds between the start of full passes
+        """
+        self.storage = storage
+        self.io_scheduler = io_scheduler
+        self.on_corrupt_block = on_corrupt_block
+        self.budget = TokenBucket(bytes_per_sec or Config.BLOCK_SCANNER_BYTES_PER_SEC)
+        self.interval = interval or Config.BLOCK_SCANNER_INTERVAL
+        self.last_scan = {"started": None, "finished": None, "blocks": 0, "bytes": 0, "corrupt": []}
+
+    def run(self):
+        """
+        Scans forever, spreading reads out so the scanner never exceeds its I/O budget.
+        """
+        while True:
+            started = time.time()
+            try:
+                self.scan_once()
+            except Exception as e:
+                log(f"❌ Block scan failed: {e}", level="error")
+            time.sleep(max(0, self.interval - (time.time() - started)))
+
+    def scan_once(self):
+        self.last_scan = {"started": time.time(), "finished": None, "blocks": 0, "bytes": 0, "corrupt": []}
+        for block_id in self.storage.list_blocks():
+            try:
+                with self.io_scheduler.acquire("maintenance") as grant:
+                    scanned = self.storage.verify_block(block_id)
+                    grant.consume(scanned)
+            except ChecksumError as e:
+                log(f"🧪 Block scanner found corrupt block {block_id}: {e}", level="error")
+                self.last_scan["corrupt"].append(block_id)
+                self.on_corrupt_block(block_id)
+                continue
+
+            self.last_scan["blocks"] += 1
+            self.last_scan["bytes"] += scanned
+            wait = self.budget.reserve(scanned)
+            if wait > 0:
+                time.sleep(wait)
+
+        self.last_scan["finished"] = time.time()
+        log(f"🧪 Block scan finished: {self.last_scan['blocks']} blocks, "
+            f"{self.last_scan['bytes']} bytes, {len(self.last_scan['corrupt'])} corrupt")
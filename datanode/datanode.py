@@ -1,22 +1,40 @@
 import argparse
 import threading
+import os
+import zlib
 import requests
 from flask import Flask, request, jsonify
 from time import sleep
+from core.checksum import ChecksumError, compute_checksums
+from core.compression import decompress_block
+from core.config import Config
 from core.logger import log
-from datanode.storage import BlockStorage
+from core.tracing import span
+from datanode.storage import create_block_storage
 from datanode.heartbeat import HeartbeatManager
+from datanode.block_scanner import BlockScanner
+from core.rpc import RPCError, RPCServer
+from datanode.io_scheduler import IOScheduler, TRAFFIC_CLASSES
+from datanode.short_circuit import DomainSocketServer
+from datanode.task_runner import TaskRunner
 
 app = Flask(__name__)
 data_node = None 
 class DataNode:
-    def __init__(self, datanode_id, namenode_url, storage_path, ip="127.0.0.1", port=5001):
+    def __init__(self, datanode_id, namenode_url, storage_path, ip="127.0.0.1", port=5001,
+                 storage_backend=None, rpc=None):
         self.datanode_id = datanode_id
         self.namenode_url = namenode_url
-        self.storage = BlockStorage(storage_path)
-        self.heartbeat_manager = HeartbeatManager(self.datanode_id, self.namenode_url)
+        self.storage = create_block_storage(storage_path, storage_backend)
+        self.io_scheduler = IOScheduler()
+        self.rpc = Config.RPC_TRANSPORT if rpc is None else rpc
+        self.heartbeat_manager = HeartbeatManager(self.datanode_id, self.namenode_url, rpc=self.rpc)
         self.ip = ip
         self.port = port
+        self.url = f"http://{self.ip}:{self.port}"
+        self.short_circuit_socket = None
+        self.block_scanner = BlockScanner(self.storage, self.io_scheduler, self.report_bad_block)
+        self.task_runner = TaskRunner()
 
         self._register_with_namenode()
 
@@ -42,16 +60,204 @@ class DataNode:
         thread.start()
         log("🫀 Heartbeat thread started.")
 
-    def store_block(self, block_id, data):
-        self.storage.save_block(block_id, data)
-        log(f"📦 Block {block_id} stored successfully.")
+    def start_block_scanner(self):
+        thread = threading.Thread(target=self.block_scanner.run, daemon=True)
+        thread.start()
+        log("🧪 Block scanner thread started.")
+
+    def report_bad_block(self, block_id):
+        """Tells the NameNode this node's replica of block_id is corrupt so it can be replaced."""
+        try:
+            requests.post(
+                f"{self.namenode_url}/report_bad_block",
+                json={"block_id": block_id, "datanode": self.url}
+            )
+            log(f"📣 Reported corrupt block {block_id} to NameNode", level="warning")
+        except Exception as e:
+            log(f"❌ Could not report corrupt block {block_id}: {e}", level="error")
+
+    def start_short_circuit_server(self):
+        """Starts the Unix domain socket that hands block file descriptors to local clients."""
+        socket_path = os.path.join(Config.SHORT_CIRCUIT_SOCKET_DIR, f"datanode_{self.port}.sock")
+        server = DomainSocketServer(self.storage, socket_path)
+        self.short_circuit_socket = socket_path if server.start() else None
+
+    def start_rpc_server(self):
+        """Serves block reads and writes over the binary RPC transport (HTTP port + offset)."""
+        def traffic_class(args, default):
+            name = args.get("traffic_class", default)
+            if name not in TRAFFIC_CLASSES:
+                raise RPCError(f"Unknown traffic class '{name}'", 400)
+            return name
+
+        def store_block(args, payload):
+            if args.get("checksum") is not None and args["checksum"] != zlib.crc32(payload):
+                log(f"❌ Checksum mismatch for incoming block {args['block_id']}", level="error")
+                raise RPCError("Checksum mismatch", 409)
+            self.store_block(args["block_id"], payload, traffic_class=traffic_class(args, "write"),
+                             checksums=compute_checksums(payload))
+            return {"status": "success"}
+
+        def read_block(args, _):
+            try:
+                if args.get("offset") is not None:
+                    data = self.read_block_range(args["block_id"], int(args["offset"]), int(args["length"]),
+                                                 traffic_class=traffic_class(args, "read"))
+                else:
+                    data = self.read_block(args["block_id"], traffic_class=traffic_class(args, "read"))
+            except ChecksumError:
+                raise RPCError("Checksum mismatch", 500)
+            if data is None:
+                raise RPCError("Block not found", 404)
+            return {"crc32": zlib.crc32(data)}, data
+
+        def delete_block(args, _):
+            self.delete_block(args["block_id"], traffic_class=traffic_class(args, "maintenance"))
+            return {"status": f"Block {args['block_id']} deleted."}
+
+        handlers = {"store_block": store_block, "read_block": read_block, "delete_block": delete_block}
+        RPCServer(handlers, "0.0.0.0", self.port + Config.RPC_PORT_OFFSET, component="datanode").start()
+
+    def get_short_circuit_info(self, block_id):
+        """Returns where a local client can read block_id directly, or None if it is missing."""
+        location = self.storage.get_block_location(block_id)
+        if not location:
+            return None
+        path, offset, length = location
+        sidecar = self.storage.get_checksums(block_id)
+        return {
+            "path": os.path.abspath(path),
+            "offset": offset,
+            "length": length,
+            "socket": self.short_circuit_socket,
+            "chunk_size": sidecar[0] if sidecar else None,
+            "checksums": sidecar[2] if sidecar else None,
+        }
+
+    def store_block(self, block_id, data, traffic_class="write", checksums=None):
+        # The span includes waiting for the I/O scheduler; storage.write is the disk part.
+        with span("datanode.store", bytes=len(data)), self.io_scheduler.acquire(traffic_class, len(data)):
+            self.storage.save_block(block_id, data, checksums=checksums)
+        log("📦 Block stored", level="debug", block_id=block_id, bytes=len(data))
+
+    def read_block(self, block_id, traffic_class="read"):
+        """Reads and verifies a block; a ChecksumError is reported to the NameNode and re-raised."""
+        with span("datanode.read"), self.io_scheduler.acquire(traffic_class) as grant:
+            try:
+                data = self.storage.read_block(block_id)
+            except ChecksumError:
+                self.report_bad_block(block_id)
+                raise
+            grant.consume(len(data) if data else 0)
+        return data
+
+    def read_block_range(self, block_id, offset, length, traffic_class="read"):
+        """Reads part of a block (e.g. one file packed into a container block)."""
+        with self.io_scheduler.acquire(traffic_class) as grant:
+            try:
+                data = self.storage.read_block_range(block_id, offset, length)
+            except ChecksumError:
+                self.report_bad_block(block_id)
+                raise
+            grant.consume(len(data) if data else 0)
+        return data
 
-    def read_block(self, block_id):
-        return self.storage.read_block(block_id)
+    def run_task(self, block_id, function_path, params=None, codec="none", offset=None, length=None,
+                 traffic_class="read"):
+        """
+        Runs a compute job's map function on a local block: the block is read and
+        verified like any read (offset/length for a file packed into a container),
+        decompressed, and handed to the task runner. Only the result leaves this node.
+        Raises FileNotFoundError if the block is not stored here.
+        """
+        with span("datanode.task", function=function_path):
+            if offset is None:
+                data = self.read_block(block_id, traffic_class=traffic_class)
+            else:
+                data = self.read_block_range(block_id, offset, length, traffic_class=traffic_class)
+            if data is None:
+                raise FileNotFoundError(f"Block {block_id} not found")
+            return self.task_runner.run(function_path, decompress_block(data, codec), params)
+
+    def delete_block(self, block_id, traffic_class="maintenance"):
+        with self.io_scheduler.acquire(traffic_class):
+            self.storage.delete_block(block_id)
+        log("🗑️ Block deleted", level="debug", block_id=block_id)
+
+    def transfer_block(self, block_id, mode, peer_url, target_block_id=None, report=True):
+        """
+        Copies a block between this node and a peer without involving a client.
+        mode="pull" fetches `block_id` from the peer and stores it here as `target_block_id`;
+        mode="push" sends the local block to the peer. A peer equal to this node copies locally.
+        The receiving side verifies the CRC32 and the outcome is reported to the NameNode.
+        """
+        target_block_id = target_block_id or block_id
+        receiver = self.url if mode == "pull" else peer_url
+        try:
+            if mode == "pull":
+                self._pull_block(block_id, peer_url, target_block_id)
+            elif mode == "push":
+                self._push_block(block_id, peer_url, target_block_id)
+            else:
+                raise ValueError(f"Unknown transfer mode '{mode}' (expected 'pull' or 'push')")
+            result = {"status": "success", "block_id": target_block_id, "datanode": receiver}
+            log(f"🔁 Block {block_id} transferred ({mode}) to {receiver} as {target_block_id}")
+        except Exception as e:
+            result = {"status": "failed", "block_id": target_block_id, "datanode": receiver, "error": str(e)}
+            log(f"❌ Transfer ({mode}) of block {block_id} with {peer_url} failed: {e}", level="error")
 
-    def delete_block(self, block_id):
-        self.storage.delete_block(block_id)
-        log(f"🗑️ Block {block_id} deleted.")
+        if report:
+            self._report_transfer(result)
+        return result
+
+    def _pull_block(self, block_id, peer_url, target_block_id):
+        if peer_url.rstrip("/") == self.url:
+            data = self.read_block(block_id, traffic_class="maintenance")
+            if data is None:
+                raise IOError(f"Block {block_id} not found locally")
+        else:
+            response = requests.get(
+                f"{peer_url}/read_block",
+                params={"block_id": block_id, "traffic_class": "maintenance"},
+                stream=True
+            )
+            if response.status_code != 200:
+                raise IOError(f"Peer returned status {response.status_code}")
+
+            expected = response.headers.get("X-Block-CRC32")
+            buffer = bytearray()
+            crc = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                crc = zlib.crc32(chunk, crc)
+                buffer.extend(chunk)
+            if expected is not None and int(expected) != crc:
+                raise IOError(f"Checksum mismatch (expected {expected}, got {crc})")
+            data = bytes(buffer)
+
+        self.store_block(target_block_id, data, traffic_class="maintenance")
+
+    def _push_block(self, block_id, peer_url, target_block_id):
+        data = self.read_block(block_id, traffic_class="maintenance")
+        if data is None:
+            raise IOError(f"Block {block_id} not found locally")
+
+        response = requests.post(
+            f"{peer_url}/store_block",
+            files={"data": data},
+            data={
+                "block_id": target_block_id,
+                "checksum": str(zlib.crc32(data)),
+                "traffic_class": "maintenance",
+            }
+        )
+        if response.status_code != 200:
+            raise IOError(f"Peer returned status {response.status_code}: {response.text}")
+
+    def _report_transfer(self, result):
+        try:
+            requests.post(f"{self.namenode_url}/block_transfer_report", json=result)
+        except Exception as e:
+            log(f"⚠️ Could not report transfer of block {result['block_id']} to NameNode: {e}", level="warning")
 
 
 @app.route('/store_block', methods=['POST'])
@@ -102,6 +308,8 @@ def main():
     parser.add_argument('--id', required=True, help="DataNode ID (e.g., 127.0.0.1:5001)")
     parser.add_argument('--port', type=int, default=5001, help="Port to run DataNode on")  # ✅ Include this!
     parser.add_argument('--storage', required=True, help="Path to storage directory")
+    parser.add_argument('--storage-backend', choices=["file", "segment"], default=None,
+                        help="Block storage layout (defaults to Config.STORAGE_BACKEND)")
     args = parser.parse_args()
 
     node_id = args.id
@@ -109,6 +317,7 @@ def main():
     storage_path = args.storage
     namenode_url = "http://127.0.0.1:8000"
 
-    data_node = DataNode(node_id, namenode_url, storage_path, ip="127.0.0.1", port=port)
+    data_node = DataNode(node_id, namenode_url, storage_path, ip="127.0.0.1", port=port,
+                         storage_backend=args.storage_backend)
     data_node.start_heartbeat()
     run_flask("0.0.0.0", port)
\ No newline at end of file
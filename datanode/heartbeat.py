@@ -2,19 +2,22 @@ import time
 import requests
 import sys
 from core.logger import log
+from core.rpc import RPCClient, rpc_address
 
 
 class HeartbeatManager:
-    def __init__(self, node_id, namenode_url, interval=5):
+    def __init__(self, node_id, namenode_url, interval=5, rpc=False):
         """
         Initialize the HeartbeatManager with node details and interval.
         :param node_id: Unique identifier for the DataNode
         :param namenode_url: URL of the NameNode to send heartbeats to
         :param interval: Time interval (in seconds) between heartbeats
+        :param rpc: Send heartbeats over the NameNode's binary RPC transport instead of HTTP
         """
         self.node_id = node_id
         self.namenode_url = namenode_url
         self.interval = interval 
+        self.rpc_client = RPCClient(*rpc_address(namenode_url)) if rpc else None
 
     def send_heartbeat(self):
         """
@@ -23,14 +26,18 @@ class HeartbeatManager:
         while True:
             try:
                 # Send a heartbeat message to the NameNode
-                response = requests.post(
-                    f"{self.namenode_url}/heartbeat",
-                    json={"node_id": self.node_id}
-                )
-                if response.status_code == 200:
-                    log(f"💓 Heartbeat sent from DataNode {self.node_id}")
+                if self.rpc_client:
+                    self.rpc_client.call("heartbeat", {"node_id": self.node_id})
+                    log("💓 Heartbeat sent from DataNode %s", self.node_id, level="debug", sample="heartbeat")
                 else:
-                    log(f"⚠️ Heartbeat failed with status: {response.status_code}", level="warning")
+                    response = requests.post(
+                        f"{self.namenode_url}/heartbeat",
+                        json={"node_id": self.node_id}
+                    )
+                    if response.status_code == 200:
+                        log("💓 Heartbeat sent from DataNode %s", self.node_id, level="debug", sample="heartbeat")
+                    else:
+                        log(f"⚠️ Heartbeat failed with status: {response.status_code}", level="warning")
             except requests.exceptions.RequestException as e:
                 # Handle network-related errors
                 log(f"❌ Network error while sending heartbeat: {e}", level="error")
@@ -0,0 +1,190 @@
+import threading
+import time
+from contextlib import contextmanager
+from core.config import Config
+from core.logger import log
+
+# Traffic classes in priority order: a class is only admitted while no higher-priority class is queued.
+TRAFFIC_CLASSES = ["read", "write", "maintenance"]
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: Sustained bandwidth in bytes per second (0 means unlimited)
+        :param burst: Bucket capacity in bytes (defaults to one second of traffic)
+        """
+        self.lock = threading.Lock()
+        self.configured_burst = None
+        self.rate = 0
+        self.tokens = None
+        self.last_refill = time.monotonic()
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate, burst=None):
+        """
+        Changes the rate, and the burst if one is given; a burst set earlier is kept.
+        Tokens earned at the old rate are credited first and capped at the new burst,
+        so a change neither forgives debt nor hands out a fresh burst.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if self.tokens is not None and self.rate > 0:
+                self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            if burst:
+                self.configured_burst = burst
+            self.rate = max(0, rate)
+            self.burst = self.configured_burst or self.rate
+            self.tokens = self.burst if self.tokens is None else min(self.tokens, self.burst)
+
+    def reserve(self, nbytes):
+        """
+        Takes `nbytes` tokens, going into debt if needed, and returns how long the caller must wait.
+        """
+        with self.lock:
+            if self.rate <= 0 or nbytes <= 0:
+                return 0.0
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            self.tokens -= nbytes
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class _TrafficClass:
+    def __init__(self, name, priority, rate, max_concurrency, burst=None):
+        self.name = name
+        self.priority = priority
+        self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max_concurrency
+        self.running = 0
+        self.waiting = 0
+        self.operations = 0
+        self.bytes = 0
+        self.total_queue_time = 0.0
+        self.max_queue_time = 0.0
+
+
+class _Grant:
+    """Handle returned by IOScheduler.acquire(); charges bandwidth once the size is known."""
+
+    def __init__(self, scheduler, traffic_class):
+        self.scheduler = scheduler
+        self.traffic_class = traffic_class
+        self.queue_time = 0.0
+
+    def consume(self, nbytes):
+        waited = self.scheduler._throttle(self.traffic_class, nbytes)
+        self.queue_time += waited
+
+
+class IOScheduler:
+    """
+    Schedules DataNode disk and network I/O by traffic class.
+
+    Each class has a token-bucket bandwidth limit and a concurrency cap. Admission is
+    strict priority: while foreground reads are queued, writes and maintenance wait.
+    """
+
+    def __init__(self, limits=None):
+        limits = limits or Config.IO_CLASS_LIMITS
+        self.cond = threading.Condition()
+        self.classes = {}
+        for priority, name in enumerate(TRAFFIC_CLASSES):
+            settings = limits.get(name, {})
+            self.classes[name] = _TrafficClass(
+                name, priority,
+                rate=settings.get("rate", 0),
+                max_concurrency=settings.get("max_concurrency", 0),
+                burst=settings.get("burst"),
+            )
+
+    def _get_class(self, traffic_class):
+        if traffic_class not in self.classes:
+            raise ValueError(f"Unknown traffic class '{traffic_class}' (expected one of {TRAFFIC_CLASSES})")
+        return self.classes[traffic_class]
+
+    def _can_start(self, cls):
+        if cls.max_concurrency and cls.running >= cls.max_concurrency:
+            return False
+        return not any(other.waiting for other in self.classes.values() if other.priority < cls.priority)
+
+    @contextmanager
+    def acquire(self, traffic_class, nbytes=0):
+        """
+        Waits for a slot in `traffic_class` and for `nbytes` of bandwidth.
+        Call grant.consume(n) inside the block to charge bytes only known after the I/O (reads).
+        """
+        cls = self._get_class(traffic_class)
+        start = time.monotonic()
+        with self.cond:
+            cls.waiting += 1
+            try:
+                while not self._can_start(cls):
+                    self.cond.wait()
+            finally:
+                cls.waiting -= 1
+            cls.running += 1
+            # Leaving the queue may unblock lower-priority classes.
+            self.cond.notify_all()
+
+        grant = _Grant(self, traffic_class)
+        grant.queue_time = time.monotonic() - start
+        try:
+            grant.consume(nbytes)
+            yield grant
+        finally:
+            with self.cond:
+                cls.running -= 1
+                cls.operations += 1
+                cls.total_queue_time += grant.queue_time
+                cls.max_queue_time = max(cls.max_queue_time, grant.queue_time)
+                self.cond.notify_all()
+
+    def _throttle(self, traffic_class, nbytes):
+        cls = self._get_class(traffic_class)
+        wait = cls.bucket.reserve(nbytes)
+        if wait > 0:
+            time.sleep(wait)
+        with self.cond:
+            cls.bytes += max(0, nbytes)
+        return wait
+
+    def set_limits(self, traffic_class, rate=None, burst=None, max_concurrency=None):
+        """
+        Adjusts a class's limits at runtime.
+        """
+        cls = self._get_class(traffic_class)
+        if rate is not None or burst is not None:
+            cls.bucket.set_rate(cls.bucket.rate if rate is None else rate, burst)
+        if max_concurrency is not None:
+            with self.cond:
+                cls.max_concurrency = max(0, int(max_concurrency))
+                self.cond.notify_all()
+        log(f"🎚️ I/O limits for '{traffic_class}' set to rate={cls.bucket.rate} B/s, "
+            f"burst={cls.bucket.burst} B, max_concurrency={cls.max_concurrency}")
+
+    def get_limits(self):
+        return {
+            name: {
+                "rate": cls.bucket.rate,
+                "burst": cls.bucket.burst,
+                "max_concurrency": cls.max_concurrency,
+            }
+            for name, cls in self.classes.items()
+        }
+
+    def get_stats(self):
+        with self.cond:
+            return {
+                name: {
+                    "running": cls.running,
+                    "waiting": cls.waiting,
+                    "operations": cls.operations,
+                    "bytes": cls.bytes,
+                    "avg_queue_time": cls.total_queue_time / cls.operations if cls.operations else 0.0,
+                    "max_queue_time": cls.max_queue_time,
+                }
+                for name, cls in self.classes.items()
+            }
@@ -0,0 +1,37 @@
+import functools
+import time
+from core.metrics import counter, gauge, histogram
+from core.tracing import span
+
+STORAGE_SECONDS = histogram("hdfs_block_storage_seconds", "Block storage operation latency", ("op",))
+STORAGE_BYTES = counter("hdfs_block_storage_bytes_total", "Bytes written to or read from block storage", ("op",))
+STORED_BLOCKS = gauge("hdfs_datanode_blocks", "Blocks held by this DataNode, updated on scrape")
+TASKS = counter("hdfs_compute_tasks_total", "Compute job map tasks run on this DataNode", ("outcome",))
+TASK_SECONDS = histogram("hdfs_compute_task_seconds", "Time a map task spent in the worker pool")
+
+
+def instrument_storage(op):
+    """
+    Decorator for BlockStorage-style methods: times the call and counts the bytes moved
+    (the `data` argument for writes, the returned bytes for reads). Inside a traced
+    request the call is also recorded as a `storage.<op>` span.
+    """
+    seconds = STORAGE_SECONDS.labels(op)
+    moved = STORAGE_BYTES.labels(op)
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(self, block_id, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with span(f"storage.{op}", block_id=block_id):
+                    result = function(self, block_id, *args, **kwargs)
+            finally:
+                seconds.observe(time.perf_counter() - started)
+            if op == "write" and args:
+                moved.inc(len(args[0]))
+            elif isinstance(result, (bytes, bytearray)):
+                moved.inc(len(result))
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,411 @@
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from core.checksum import (ChecksumError, SIDECAR_HEADER, chunk_aligned_range, compute_checksums,
+                           pack_checksums, sidecar_size, unpack_checksums, verify_checksums)
+from core.config import Config
+from core.logger import log
+from core.utils import read_json, write_json
+from datanode.metrics import instrument_storage
+
+# Every record is: header | block_id | payload. Deletes append a tombstone record with no payload.
+# Checksummed records carry their CRC32 sidecar in front of the data: payload = sidecar | data.
+RECORD_HEADER = struct.Struct(">4sBHI")  # magic, flags, block_id length, payload length
+RECORD_MAGIC = b"HSEG"
+FLAG_TOMBSTONE = 0x01
+FLAG_CHECKSUMMED = 0x02
+
+
+class SegmentBlockStorage:
+    """
+    Log-structured block store that appends blocks into large segment files.
+
+    Small blocks share a handful of segment files instead of taking one inode each.
+    An in-memory index maps block_id -> (segment, offset, length) and is checkpointed
+    to disk; anything written after the last checkpoint is recovered by scanning the
+    segment tails, and the whole index can be rebuilt from the segments alone.
+    """
+
+    def __init__(self, storage_path, segment_size=None, compaction_threshold=None,
+                 compaction_interval=None):
+        self.storage_path = storage_path
+        self.segment_size = segment_size or Config.SEGMENT_SIZE
+        self.compaction_threshold = (compaction_threshold if compaction_threshold is not None
+                                     else Config.SEGMENT_COMPACTION_THRESHOLD)
+        self.compaction_interval = (compaction_interval if compaction_interval is not None
+                                    else Config.SEGMENT_COMPACTION_INTERVAL)
+        self.index_path = os.path.join(self.storage_path, "segments.index")
+
+        self.index = {}           # block_id -> [segment_id, data_offset, length, sidecar_offset]
+        self.segment_sizes = {}   # segment_id -> bytes written
+        self.segment_garbage = {} # segment_id -> bytes no longer referenced by the index
+        self.lock = threading.RLock()
+        self._read_fds = {}
+        self._active_id = None
+        self._active_fd = None
+        self._writes_since_checkpoint = 0
+
+        os.makedirs(self.storage_path, exist_ok=True)
+        self._load_index()
+        self._open_active_segment()
+
+        if self.compaction_interval > 0:
+            thread = threading.Thread(target=self._compaction_loop, daemon=True)
+            thread.start()
+
+        log(f"✅ Segment block storage initialized at {self.storage_path} "
+            f"({len(self.index)} blocks in {len(self.segment_sizes)} segments)")
+
+    # --- Segment files ---
+
+    def _segment_path(self, segment_id):
+        return os.path.join(self.storage_path, f"{segment_id:08d}.segment")
+
+    def _list_segments(self):
+        segment_ids = []
+        for name in os.listdir(self.storage_path):
+            if name.endswith(".segment"):
+                try:
+                    segment_ids.append(int(name[:-len(".segment")]))
+                except ValueError:
+                    continue
+        return sorted(segment_ids)
+
+    def _open_active_segment(self):
+        segment_ids = sorted(self.segment_sizes)
+        if segment_ids and self.segment_sizes[segment_ids[-1]] < self.segment_size:
+            self._active_id = segment_ids[-1]
+        else:
+            self._active_id = (segment_ids[-1] + 1) if segment_ids else 0
+            self.segment_sizes[self._active_id] = 0
+            self.segment_garbage[self._active_id] = 0
+        self._active_fd = os.open(self._segment_path(self._active_id),
+                                  os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _roll_segment(self):
+        os.close(self._active_fd)
+        self._active_id += 1
+        self.segment_sizes[self._active_id] = 0
+        self.segment_garbage[self._active_id] = 0
+        self._active_fd = os.open(self._segment_path(self._active_id),
+                                  os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._checkpoint()
+
+    def _read_fd(self, segment_id):
+        fd = self._read_fds.get(segment_id)
+        if fd is None:
+            fd = os.open(self._segment_path(segment_id), os.O_RDONLY)
+            self._read_fds[segment_id] = fd
+        return fd
+
+    def _append_record(self, block_id, data, flags=0):
+        """Appends one record to the active segment and returns the offset of its payload."""
+        key = block_id.encode("utf-8")
+        header = RECORD_HEADER.pack(RECORD_MAGIC, flags, len(key), len(data))
+        if self.segment_sizes[self._active_id] >= self.segment_size:
+            self._roll_segment()
+
+        record_offset = self.segment_sizes[self._active_id]
+        os.write(self._active_fd, header + key + data)
+        self.segment_sizes[self._active_id] += RECORD_HEADER.size + len(key) + len(data)
+
+        self._writes_since_checkpoint += 1
+        if self._writes_since_checkpoint >= Config.SEGMENT_CHECKPOINT_EVERY:
+            self._checkpoint()
+        return record_offset + RECORD_HEADER.size + len(key)
+
+    def _forget(self, block_id):
+        """Drops a block from the index and accounts its bytes as garbage."""
+        entry = self.index.pop(block_id, None)
+        if entry:
+            segment_id, data_offset, length = entry[:3]
+            payload_offset = entry[3] if len(entry) > 3 else data_offset
+            record_size = RECORD_HEADER.size + len(block_id.encode("utf-8")) + data_offset - payload_offset + length
+            self.segment_garbage[segment_id] = self.segment_garbage.get(segment_id, 0) + record_size
+        return entry
+
+    def _index_entry(self, segment_id, payload_offset, payload_length, flags, sidecar_head=b""):
+        """Builds the index entry for a record; checksummed records need their sidecar header."""
+        if not flags & FLAG_CHECKSUMMED:
+            return [segment_id, payload_offset, payload_length]
+        count = SIDECAR_HEADER.unpack_from(sidecar_head)[3]
+        data_offset = payload_offset + sidecar_size(count)
+        return [segment_id, data_offset, payload_offset + payload_length - data_offset, payload_offset]
+
+    # --- Index persistence and recovery ---
+
+    def _checkpoint(self):
+        write_json(self.index_path + ".tmp", {
+            "segments": {str(k): v for k, v in self.segment_sizes.items()},
+            "garbage": {str(k): v for k, v in self.segment_garbage.items()},
+            "blocks": self.index,
+        })
+        os.replace(self.index_path + ".tmp", self.index_path)
+        self._writes_since_checkpoint = 0
+
+    def _load_index(self):
+        checkpoint = read_json(self.index_path)
+        on_disk = self._list_segments()
+
+        covered = {int(k): v for k, v in checkpoint.get("segments", {}).items()}
+        garbage = {int(k): v for k, v in checkpoint.get("garbage", {}).items()}
+        self.index = {
+            block_id: entry for block_id, entry in checkpoint.get("blocks", {}).items()
+            if entry[0] in on_disk
+        }
+
+        replayed = 0
+        for segment_id in on_disk:
+            start = covered.get(segment_id, 0)
+            self.segment_garbage[segment_id] = garbage.get(segment_id, 0)
+            self.segment_sizes[segment_id] = self._scan_segment(segment_id, start)
+            if self.segment_sizes[segment_id] > start:
+                replayed += 1
+
+        if replayed or not checkpoint:
+            log(f"🔁 Rebuilt segment index from {replayed} segment tail(s).")
+            self._checkpoint()
+
+    def _scan_segment(self, segment_id, start):
+        """Applies every record from `start` to the index; truncates a torn tail. Returns the valid size."""
+        path = self._segment_path(segment_id)
+        offset = start
+        with open(path, "rb") as f:
+            f.seek(offset)
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                magic, flags, key_len, data_len = RECORD_HEADER.unpack(header)
+                if magic != RECORD_MAGIC:
+                    break
+                key = f.read(key_len)
+                payload_offset = offset + RECORD_HEADER.size + key_len
+                sidecar_head = f.read(SIDECAR_HEADER.size) if flags & FLAG_CHECKSUMMED else b""
+                f.seek(payload_offset + data_len)
+                if (len(key) < key_len or f.tell() > os.path.getsize(path)
+                        or len(sidecar_head) < (SIDECAR_HEADER.size if flags & FLAG_CHECKSUMMED else 0)):
+                    break
+
+                block_id = key.decode("utf-8")
+                self._forget(block_id)
+                if flags & FLAG_TOMBSTONE:
+                    self.segment_garbage[segment_id] = (self.segment_garbage.get(segment_id, 0)
+                                                        + RECORD_HEADER.size + key_len)
+                else:
+                    self.index[block_id] = self._index_entry(
+                        segment_id, payload_offset, data_len, flags, sidecar_head)
+                offset = payload_offset + data_len
+
+        if offset < os.path.getsize(path):
+            log(f"⚠️ Truncating torn tail of segment {segment_id} at offset {offset}.", level="warning")
+            os.truncate(path, offset)
+        return offset
+
+    # --- BlockStorage interface ---
+
+    @instrument_storage("write")
+    def save_block(self, block_id, data, checksums=None):
+        """
+        Append a block and its CRC32 sidecar to the active segment.
+        """
+        try:
+            if checksums is None:
+                checksums = compute_checksums(data)
+            sidecar = pack_checksums(checksums, len(data))
+            with self.lock:
+                self._forget(block_id)
+                payload_offset = self._append_record(block_id, sidecar + data, flags=FLAG_CHECKSUMMED)
+                self.index[block_id] = [self._active_id, payload_offset + len(sidecar), len(data), payload_offset]
+            log("✅ Block appended to segment", level="debug", block_id=block_id, segment=self._active_id)
+        except Exception as e:
+            log(f"❌ Error saving block {block_id}: {e}", level="error")
+
+    @contextmanager
+    def _lookup(self, block_id):
+        """
+        Yields (entry, fd) for a block, or (None, None). The fd is a dup taken under the
+        lock, so compaction may close and delete the segment while the caller reads it.
+        """
+        with self.lock:
+            entry = self.index.get(block_id)
+            fd = os.dup(self._read_fd(entry[0])) if entry else None
+        try:
+            yield entry, fd
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def _read_sidecar(self, entry, fd):
+        if len(entry) < 4:
+            return None
+        _, data_offset, _, sidecar_offset = entry
+        return unpack_checksums(os.pread(fd, data_offset - sidecar_offset, sidecar_offset))
+
+    def get_checksums(self, block_id):
+        """
+        Return (chunk_size, data_length, checksums) for a block, or None if it has no sidecar.
+        """
+        with self._lookup(block_id) as (entry, fd):
+            return self._read_sidecar(entry, fd) if entry else None
+
+    def _read_verified(self, block_id, entry, fd):
+        segment_id, data_offset, length = entry[:3]
+        sidecar = self._read_sidecar(entry, fd)
+        if sidecar is None:
+            return os.pread(fd, length, data_offset)
+
+        chunk_size, data_length, checksums = sidecar
+        data = bytearray()
+        for index in range(len(checksums)):
+            chunk = os.pread(fd, min(chunk_size, length - index * chunk_size), data_offset + index * chunk_size)
+            verify_checksums(chunk, checksums, chunk_size, first_chunk=index, block_id=block_id)
+            data.extend(chunk)
+        if len(data) != data_length:
+            raise ChecksumError(f"Block {block_id} has length {len(data)}, expected {data_length}")
+        return bytes(data)
+
+    @instrument_storage("read")
+    def read_block(self, block_id):
+        """
+        Read a block with positional reads on its segment, verifying each chunk.
+        Raises ChecksumError on corruption.
+        """
+        try:
+            with self._lookup(block_id) as (entry, fd):
+                if not entry:
+                    log(f"⚠️ Block {block_id} not found in segment index.", level="warning")
+                    return None
+                data = self._read_verified(block_id, entry, fd)
+            log("✅ Block read from segment", level="debug", block_id=block_id, segment=entry[0])
+            return data
+        except ChecksumError as e:
+            log(f"❌ {e}", level="error")
+            raise
+        except Exception as e:
+            log(f"❌ Error reading block {block_id}: {e}", level="error")
+            return None
+
+    @instrument_storage("read_range")
+    def read_block_range(self, block_id, offset, length):
+        """
+        Read `length` bytes at `offset` within a block, verifying only the chunks that
+        cover the range. Raises ChecksumError on corruption.
+        """
+        with self._lookup(block_id) as (entry, fd):
+            if not entry:
+                log(f"⚠️ Block {block_id} not found in segment index.", level="warning")
+                return None
+            data_offset, block_length = entry[1], entry[2]
+            sidecar = self._read_sidecar(entry, fd)
+            if sidecar is None:
+                return os.pread(fd, max(0, min(length, block_length - offset)), data_offset + offset)
+            chunk_size, data_length, checksums = sidecar
+            start, end, first_chunk = chunk_aligned_range(offset, length, chunk_size, data_length)
+            data = os.pread(fd, end - start, data_offset + start)
+        try:
+            verify_checksums(data, checksums, chunk_size, first_chunk=first_chunk, block_id=block_id)
+        except ChecksumError as e:
+            log(f"❌ {e}", level="error")
+            raise
+        return data[offset - start:offset - start + length]
+
+    def verify_block(self, block_id):
+        """
+        Re-reads a block and checks it against its sidecar. Returns the number of bytes
+        scanned; raises ChecksumError on corruption.
+        """
+        with self._lookup(block_id) as (entry, fd):
+            if not entry:
+                return 0
+            return len(self._read_verified(block_id, entry, fd))
+
+    def list_blocks(self):
+        with self.lock:
+            return list(self.index)
+
+    def get_block_location(self, block_id):
+        """
+        Return (segment path, offset, length) of a block, or None if it is missing.
+        """
+        with self.lock:
+            entry = self.index.get(block_id)
+            if not entry:
+                return None
+            segment_id, data_offset, length = entry[:3]
+            return self._segment_path(segment_id), data_offset, length
+
+    @instrument_storage("delete")
+    def delete_block(self, block_id):
+        """
+        Delete a block by appending a tombstone; space is reclaimed by compaction.
+        """
+        try:
+            with self.lock:
+                if block_id not in self.index:
+                    log(f"⚠️ Block {block_id} does not exist in segment index.", level="warning")
+                    return
+                self._forget(block_id)
+                self._append_record(block_id, b"", flags=FLAG_TOMBSTONE)
+            log("✅ Block tombstoned", level="debug", block_id=block_id)
+        except Exception as e:
+            log(f"❌ Error deleting block {block_id}: {e}", level="error")
+
+    # --- Compaction ---
+
+    def _compaction_loop(self):
+        while True:
+            time.sleep(self.compaction_interval)
+            try:
+                self.compact()
+            except Exception as e:
+                log(f"❌ Segment compaction failed: {e}", level="error")
+
+    def compact(self):
+        """
+        Rewrites the live blocks of sealed segments whose garbage ratio exceeds the
+        threshold into the active segment, then removes the old segment files.
+        """
+        with self.lock:
+            candidates = [
+                segment_id for segment_id, size in self.segment_sizes.items()
+                if segment_id != self._active_id and size > 0
+                and self.segment_garbage.get(segment_id, 0) / size >= self.compaction_threshold
+            ]
+
+        for segment_id in sorted(candidates):
+            with self.lock:
+                self._compact_segment(segment_id)
+                self.segment_sizes.pop(segment_id)
+                reclaimed = self.segment_garbage.pop(segment_id, 0)
+                self._checkpoint()
+            log(f"🧹 Compacted segment {segment_id}, reclaimed {reclaimed} bytes.")
+
+    def _compact_segment(self, segment_id):
+        fd = self._read_fd(segment_id)
+        older_segments_exist = any(other < segment_id for other in self.segment_sizes)
+        offset = 0
+        while offset < self.segment_sizes[segment_id]:
+            magic, flags, key_len, data_len = RECORD_HEADER.unpack(
+                os.pread(fd, RECORD_HEADER.size, offset))
+            block_id = os.pread(fd, key_len, offset + RECORD_HEADER.size).decode("utf-8")
+            payload_offset = offset + RECORD_HEADER.size + key_len
+
+            if flags & FLAG_TOMBSTONE:
+                # Keep the tombstone while an older segment may still hold the deleted data.
+                if older_segments_exist and block_id not in self.index:
+                    self._append_record(block_id, b"", flags=FLAG_TOMBSTONE)
+            else:
+                sidecar_head = os.pread(fd, SIDECAR_HEADER.size, payload_offset) if flags & FLAG_CHECKSUMMED else b""
+                entry = self._index_entry(segment_id, payload_offset, data_len, flags, sidecar_head)
+                if self.index.get(block_id) == entry:
+                    # Copy the payload verbatim so the original checksums keep guarding the data.
+                    payload = os.pread(fd, data_len, payload_offset)
+                    new_offset = self._append_record(block_id, payload, flags=flags)
+                    self.index[block_id] = self._index_entry(self._active_id, new_offset, data_len, flags, payload)
+            offset = payload_offset + data_len
+
+        os.close(self._read_fds.pop(segment_id))
+        os.remove(self._segment_path(segment_id))
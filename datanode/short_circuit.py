@@ -0,0 +1,90 @@
+import json
+import os
+import socket
+import struct
+import threading
+from core.logger import log
+
+
+def is_loopback(address):
+    return address in ("127.0.0.1", "::1", "localhost") or address.startswith("127.")
+
+
+class DomainSocketServer:
+    """
+    Hands open block file descriptors to local clients over a Unix domain socket.
+
+    A client sends a block_id terminated by a newline; the reply is a newline-terminated
+    JSON header ({"offset", "length", "chunk_size", "checksums"} or {"error"}) with the file
+    descriptor attached via SCM_RIGHTS. Only peers running as the same user as the DataNode
+    are served.
+    """
+
+    def __init__(self, storage, socket_path):
+        self.storage = storage
+        self.socket_path = socket_path
+
+    def start(self):
+        if not hasattr(socket, "send_fds"):
+            log("⚠️ File descriptor passing is not supported on this platform.", level="warning")
+            return False
+
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        server.listen()
+
+        thread = threading.Thread(target=self._serve, args=(server,), daemon=True)
+        thread.start()
+        log(f"🔌 Short-circuit read socket listening at {self.socket_path}")
+        return True
+
+    def _serve(self, server):
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _peer_allowed(self, conn):
+        if not hasattr(socket, "SO_PEERCRED"):
+            return True
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", creds)
+        return uid == os.getuid()
+
+    def _handle(self, conn):
+        with conn:
+            try:
+                if not self._peer_allowed(conn):
+                    conn.sendall(json.dumps({"error": "Permission denied"}).encode() + b"\n")
+                    return
+
+                reader = conn.makefile("rb")
+                while True:
+                    line = reader.readline()
+                    if not line:
+                        break
+                    block_id = line.decode("utf-8").strip()
+                    location = self.storage.get_block_location(block_id)
+                    if not location:
+                        conn.sendall(json.dumps({"error": "Block not found"}).encode() + b"\n")
+                        continue
+
+                    path, offset, length = location
+                    sidecar = self.storage.get_checksums(block_id)
+                    fd = os.open(path, os.O_RDONLY)
+                    try:
+                        header = json.dumps({
+                            "offset": offset,
+                            "length": length,
+                            "chunk_size": sidecar[0] if sidecar else None,
+                            "checksums": sidecar[2] if sidecar else None,
+                        }).encode() + b"\n"
+                        socket.send_fds(conn, [header], [fd])
+                    finally:
+                        os.close(fd)
+            except Exception as e:
+                log(f"❌ Short-circuit socket error: {e}", level="error")
@@ -1,5 +1,11 @@
 import os
+import zlib
+from core.checksum import (ChecksumError, chunk_aligned_range, compute_checksums, pack_checksums,
+                           unpack_checksums, verify_checksums)
+from core.config import Config
 from core.logger import log
+from datanode.metrics import instrument_storage
+from datanode.segment_storage import SegmentBlockStorage
 
 
 class BlockStorage:
@@ -15,35 +21,126 @@ class BlockStorage:
         """
         return os.path.join(self.storage_path, f"{block_id}.block")
 
-    def save_block(self, block_id, data):
+    def _get_meta_path(self, block_id):
         """
-        Save a block to disk.
+        Helper method to construct the checksum sidecar path for the given block ID.
+        """
+        return os.path.join(self.storage_path, f"{block_id}.meta")
+
+    @instrument_storage("write")
+    def save_block(self, block_id, data, checksums=None):
+        """
+        Save a block to disk along with its per-chunk CRC32 sidecar.
         """
         try:
+            if checksums is None:
+                checksums = compute_checksums(data)
             block_path = self._get_block_path(block_id)
             with open(block_path, 'wb') as f:
                 f.write(data)
-            log(f"✅ Block {block_id} saved to disk at {block_path}.")
+            with open(self._get_meta_path(block_id), 'wb') as f:
+                f.write(pack_checksums(checksums, len(data)))
+            log("✅ Block saved to disk", level="debug", block_id=block_id, bytes=len(data))
         except Exception as e:
             log(f"❌ Error saving block {block_id}: {e}", level="error")
 
+    def get_checksums(self, block_id):
+        """
+        Return (chunk_size, data_length, checksums) for a block, or None if it has no sidecar.
+        """
+        meta_path = self._get_meta_path(block_id)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'rb') as f:
+            return unpack_checksums(f.read())
+
+    def _read_verified(self, block_id, block_path):
+        """
+        Reads a block chunk by chunk, verifying each chunk against the sidecar as it goes.
+        """
+        sidecar = self.get_checksums(block_id)
+        with open(block_path, 'rb') as f:
+            if sidecar is None:
+                return f.read()
+
+            chunk_size, data_length, checksums = sidecar
+            data = bytearray()
+            for index, expected in enumerate(checksums):
+                chunk = f.read(chunk_size)
+                if zlib.crc32(chunk) != expected:
+                    raise ChecksumError(f"Checksum mismatch in block {block_id} at chunk {index}")
+                data.extend(chunk)
+            if len(data) != data_length or f.read(1):
+                raise ChecksumError(f"Block {block_id} has length {os.path.getsize(block_path)}, expected {data_length}")
+        return bytes(data)
+
+    @instrument_storage("read")
     def read_block(self, block_id):
         """
-        Read a block from disk.
+        Read a block from disk, verifying its checksums. Raises ChecksumError on corruption.
         """
         try:
             block_path = self._get_block_path(block_id)
             if not os.path.exists(block_path):
                 log(f"⚠️ Block {block_id} not found at {block_path}.", level="warning")
                 return None
-            with open(block_path, 'rb') as f:
-                data = f.read()
-            log(f"✅ Block {block_id} read from disk.")
+            data = self._read_verified(block_id, block_path)
+            log("✅ Block read from disk", level="debug", block_id=block_id)
             return data
+        except ChecksumError as e:
+            log(f"❌ {e}", level="error")
+            raise
         except Exception as e:
             log(f"❌ Error reading block {block_id}: {e}", level="error")
             return None
 
+    @instrument_storage("read_range")
+    def read_block_range(self, block_id, offset, length):
+        """
+        Read `length` bytes at `offset` within a block, verifying only the chunks that
+        cover the range. Raises ChecksumError on corruption.
+        """
+        block_path = self._get_block_path(block_id)
+        if not os.path.exists(block_path):
+            log(f"⚠️ Block {block_id} not found at {block_path}.", level="warning")
+            return None
+        sidecar = self.get_checksums(block_id)
+        with open(block_path, 'rb') as f:
+            if sidecar is None:
+                return os.pread(f.fileno(), length, offset)
+            chunk_size, data_length, checksums = sidecar
+            start, end, first_chunk = chunk_aligned_range(offset, length, chunk_size, data_length)
+            data = os.pread(f.fileno(), end - start, start)
+        try:
+            verify_checksums(data, checksums, chunk_size, first_chunk=first_chunk, block_id=block_id)
+        except ChecksumError as e:
+            log(f"❌ {e}", level="error")
+            raise
+        return data[offset - start:offset - start + length]
+
+    def verify_block(self, block_id):
+        """
+        Re-reads a block and checks it against its sidecar. Returns the number of bytes
+        scanned; raises ChecksumError on corruption.
+        """
+        block_path = self._get_block_path(block_id)
+        if not os.path.exists(block_path):
+            return 0
+        return len(self._read_verified(block_id, block_path))
+
+    def list_blocks(self):
+        return [name[:-len(".block")] for name in os.listdir(self.storage_path) if name.endswith(".block")]
+
+    def get_block_location(self, block_id):
+        """
+        Return (path, offset, length) of a block on local disk, or None if it is missing.
+        """
+        block_path = self._get_block_path(block_id)
+        if not os.path.exists(block_path):
+            return None
+        return block_path, 0, os.path.getsize(block_path)
+
+    @instrument_storage("delete")
     def delete_block(self, block_id):
         """
         Delete a block from disk.
@@ -52,8 +149,22 @@ class BlockStorage:
             block_path = self._get_block_path(block_id)
             if os.path.exists(block_path):
                 os.remove(block_path)
-                log(f"✅ Block {block_id} deleted from {block_path}.")
+                if os.path.exists(self._get_meta_path(block_id)):
+                    os.remove(self._get_meta_path(block_id))
+                log("✅ Block deleted from disk", level="debug", block_id=block_id)
             else:
                 log(f"⚠️ Block {block_id} does not exist at {block_path}.", level="warning")
         except Exception as e:
-            log(f"❌ Error deleting block {block_id}: {e}", level="error")
\ No newline at end of file
+            log(f"❌ Error deleting block {block_id}: {e}", level="error")
+
+
+def create_block_storage(storage_path, backend=None):
+    """
+    Builds the block storage backend selected for a DataNode.
+    """
+    backend = backend or Config.STORAGE_BACKEND
+    if backend == "file":
+        return BlockStorage(storage_path)
+    if backend == "segment":
+        return SegmentBlockStorage(storage_path)
+    raise ValueError(f"Unknown storage backend '{backend}' (expected 'file' or 'segment')")
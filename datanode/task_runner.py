@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from core.compute import TaskTimeout, resolve_function, run_map
+from core.config import Config
+from core.logger import log
+from datanode.metrics import TASK_SECONDS, TASKS
+
+
+def _exit_with(datanode_pid):
+    """
+    Worker initializer. Workers hold pipes to each other and to the forkserver, so none
+    of them sees EOF when the DataNode is killed; instead each one polls for it.
+    """
+    def watch():
+        while True:
+            time.sleep(1)
+            try:
+                os.kill(datanode_pid, 0)
+            except ProcessLookupError:
+                os._exit(0)
+
+    threading.Thread(target=watch, daemon=True).start()
+
+
+class TaskError(Exception):
+    """Raised when a job's map function itself fails, so retrying elsewhere would not help."""
+
+
+class TaskRunner:
+    """
+    Runs map tasks of compute jobs in a pool of worker processes: tasks run in parallel
+    without sharing the GIL with request handlers, and a crashing function cannot take
+    the DataNode down. Workers are started from a forkserver rather than fork(), since
+    forking a process with live threads can copy locks held by those threads.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or Config.COMPUTE_WORKERS
+        self.pool = None
+        self.retired = weakref.WeakSet()  # pools killed because of a stuck task
+        self.lock = threading.Lock()
+
+    def _get_pool(self):
+        with self.lock:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("forkserver"),
+                                                initializer=_exit_with, initargs=(os.getpid(),))
+            return self.pool
+
+    def _recycle(self, pool):
+        """Replaces a pool with a stuck task and kills its workers; its other tasks are retried elsewhere."""
+        with self.lock:
+            if self.pool is pool:
+                self.pool = None
+            self.retired.add(pool)
+        # ProcessPoolExecutor cannot cancel a running task, so its worker is terminated.
+        for process in list((pool._processes or {}).values()):
+            process.terminate()
+        pool.shutdown(wait=False)
+
+    def run(self, function_path, data, params=None, timeout=None):
+        """
+        Returns function_path(data, **params) computed in a worker process. Raises
+        ValueError for a function that may not be run, TimeoutError after `timeout`
+        seconds and TaskError if the function raised. A timed-out function is
+        interrupted in its worker; one that does not respond within
+        Config.COMPUTE_TIMEOUT_GRACE seconds gets the pool recycled, so a stuck task
+        never holds a slot the NameNode believes is free.
+        """
+        resolve_function(function_path)
+        timeout = timeout or Config.COMPUTE_TASK_TIMEOUT
+        pool = self._get_pool()
+        try:
+            with TASK_SECONDS.time():
+                result = pool.submit(run_map, function_path, data, params or {}, timeout).result(
+                    timeout=timeout + Config.COMPUTE_TIMEOUT_GRACE)
+        except TaskTimeout:
+            TASKS.labels("timeout").inc()
+            raise TimeoutError(f"Task exceeded {timeout}s")
+        except FutureTimeoutError:
+            TASKS.labels("timeout").inc()
+            log(f"❌ {function_path} ignored its {timeout}s timeout; recycling the task workers", level="error")
+            self._recycle(pool)
+            raise TimeoutError(f"Task exceeded {timeout}s")
+        except BrokenProcessPool:
+            if pool in self.retired:
+                # Killed along with a stuck task; the block itself may be fine elsewhere.
+                TASKS.labels("timeout").inc()
+                raise TimeoutError("Task was interrupted when its worker pool was recycled")
+            # A worker died (crash, OOM kill); start a fresh pool for the next task.
+            with self.lock:
+                if self.pool is pool:
+                    self.pool = None
+            pool.shutdown(wait=False)
+            TASKS.labels("crashed").inc()
+            log(f"❌ Task worker died while running {function_path}", level="error")
+            raise TaskError(f"Worker process died while running {function_path}")
+        except Exception as e:
+            TASKS.labels("failed").inc()
+            raise TaskError(f"{type(e).__name__}: {e}")
+        TASKS.labels("succeeded").inc()
+        return result
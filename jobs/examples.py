@@ -0,0 +1,37 @@
+from collections import Counter
+
+# Map and reduce functions for HDFSClient.run_job, e.g.
+#   client.run_job("logs.txt", "jobs.examples:count_lines", "jobs.examples:total")
+# A map function gets the bytes of one block (decompressed) plus the job's params and
+# returns something JSON-serializable. A reduce function gets the map results in block
+# order. Blocks are cut at fixed sizes, so a line or word may be split between two
+# blocks; these examples only compute aggregates that are exact regardless.
+
+
+def count_lines(data):
+    return data.count(b"\n")
+
+
+def count_bytes(data):
+    return len(data)
+
+
+def count_occurrences(data, pattern):
+    """Occurrences of pattern (matches split across a block boundary are missed)."""
+    return data.count(pattern.encode())
+
+
+def byte_histogram(data):
+    """Occurrences of each byte value, keyed by str(value) since results travel as JSON."""
+    return {str(value): count for value, count in Counter(data).items()}
+
+
+def total(results):
+    return sum(results)
+
+
+def merge_counts(results):
+    merged = Counter()
+    for counts in results:
+        merged.update(counts)
+    return dict(merged)
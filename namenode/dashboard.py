@@ -0,0 +1,66 @@
+import json
+import time
+from core.config import Config
+
+# Read-only views behind the dashboard endpoints, shared by the active and standby NameNode.
+
+
+def heartbeat_status(datanodes):
+    """Returns {node_id: {"status": "active"/"inactive", "last_heartbeat": "..."}}."""
+    now = time.time()
+    status_dict = {}
+    for node_id, info in list(datanodes.items()):
+        last_heartbeat = info.get("last_heartbeat", 0)
+        status = "active" if now - last_heartbeat < Config.HEARTBEAT_TIMEOUT else "inactive"
+
+        status_dict[node_id] = {
+            "status": status,
+            "last_heartbeat": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_heartbeat)) if last_heartbeat else "N/A"
+        }
+    return status_dict
+
+
+def summary_page(metadata, args):
+    """
+    Returns one /summary page from a MetadataStore for the request's `offset` and
+    `limit` query arguments. Raises ValueError for malformed or out-of-range values.
+    """
+    offset = int(args.get("offset", 0))
+    limit = int(args.get("limit", Config.SUMMARY_PAGE_SIZE))
+    if offset < 0 or not 1 <= limit <= Config.SUMMARY_MAX_PAGE_SIZE:
+        raise ValueError(f"offset must be >= 0 and limit between 1 and {Config.SUMMARY_MAX_PAGE_SIZE}")
+    return metadata.get_summary(offset, limit)
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def event_stream(get_datanodes, metadata, interval=None, keepalive=None):
+    """
+    Server-sent events for the dashboard. A `status` event carries heartbeat_status()
+    whenever it changes, and a `namespace` event the new txid after mutations; both
+    are sent once on connect. State is checked in process every `interval` seconds,
+    so any number of open dashboards cost no extra requests. Idle streams get a
+    comment every `keepalive` seconds, which is also how a closed connection is noticed.
+    """
+    interval = interval or Config.EVENTS_INTERVAL
+    keepalive = keepalive or Config.EVENTS_KEEPALIVE
+    last_status, last_txid, last_sent = None, None, 0
+
+    while True:
+        messages = []
+        status = heartbeat_status(get_datanodes())
+        if status != last_status:
+            last_status = status
+            messages.append(_event("status", status))
+        if metadata.txid != last_txid:
+            last_txid = metadata.txid
+            messages.append(_event("namespace", {"txid": last_txid}))
+        if not messages and time.monotonic() - last_sent >= keepalive:
+            messages.append(": keepalive\n\n")
+
+        if messages:
+            last_sent = time.monotonic()
+            yield "".join(messages)
+        time.sleep(interval)
@@ -0,0 +1,217 @@
+import statistics
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import requests
+from core.compute import resolve_function
+from core.config import Config
+from core.logger import log
+
+
+class JobScheduler:
+    """
+    Runs data-local compute jobs. A job applies a map function to every data block of a
+    file; each block becomes a task that runs on a DataNode holding a replica, so only
+    the map results cross the network. Tasks go to the replica holder with the fewest
+    tasks in flight, at most Config.COMPUTE_WORKERS per DataNode. A task that fails for
+    reasons other than the function itself is retried on another replica, and a
+    straggler gets a speculative second attempt (see Config.SPECULATIVE_*).
+    """
+
+    def __init__(self, namenode):
+        self.namenode = namenode
+        self.jobs = OrderedDict()  # job_id -> job, oldest first
+        self.running = {}  # DataNode URL -> attempts in flight there
+        self.condition = threading.Condition()
+
+    def start(self):
+        threading.Thread(target=self._run, name="job-scheduler", daemon=True).start()
+
+    def submit(self, file_name, function, params=None):
+        """
+        Queues a job and returns its status. Raises ValueError for a function that may
+        not be run and FileNotFoundError if the file does not exist.
+        """
+        resolve_function(function)
+        if not isinstance(params or {}, dict):
+            raise ValueError("params must be an object of keyword arguments")
+        blocks = self.namenode.get_file_blocks(file_name)
+        if not blocks:
+            raise FileNotFoundError(f"'{file_name}' not found")
+        codec = self.namenode.get_file_attributes(file_name).get("codec", "none")
+
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "file_name": file_name,
+            "function": function,
+            "params": params or {},
+            "codec": codec,
+            "state": "running",
+            "error": None,
+            "submitted": time.time(),
+            "finished": None,
+            "tasks": [
+                {"block": block, "state": "pending", "attempts": [], "result": None, "duration": None}
+                for block in blocks if "parity" not in block
+            ],
+        }
+        with self.condition:
+            self.jobs[job["job_id"]] = job
+            self._evict_finished()
+            self.condition.notify_all()
+            status = self._status(job)
+        log(f"🧮 Job {job['job_id']} submitted: {function} over '{file_name}' ({len(job['tasks'])} tasks)")
+        return status
+
+    def get_status(self, job_id):
+        with self.condition:
+            job = self.jobs.get(job_id)
+            return self._status(job) if job else None
+
+    def _status(self, job):
+        tasks = job["tasks"]
+        attempts = [attempt for task in tasks for attempt in task["attempts"]]
+        status = {
+            "job_id": job["job_id"],
+            "file_name": job["file_name"],
+            "function": job["function"],
+            "state": job["state"],
+            "error": job["error"],
+            "tasks": len(tasks),
+            "tasks_done": sum(task["state"] == "done" for task in tasks),
+            "attempts": len(attempts),
+            "speculative": sum(attempt["speculative"] for attempt in attempts),
+            "speculative_won": sum(attempt["speculative"] and attempt.get("won", False) for attempt in attempts),
+            "elapsed": round((job["finished"] or time.time()) - job["submitted"], 3),
+        }
+        if job["state"] == "succeeded":
+            status["results"] = [task["result"] for task in tasks]
+        return status
+
+    def _evict_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job["state"] != "running"]
+        for job_id in finished[:max(0, len(finished) - Config.COMPUTE_JOBS_RETAINED)]:
+            del self.jobs[job_id]
+
+    def _run(self):
+        # Re-checked on every attempt completion and at least every 0.2s, which is how
+        # stragglers are noticed.
+        while True:
+            with self.condition:
+                self._schedule()
+                self.condition.wait(timeout=0.2)
+
+    def _live_datanodes(self):
+        now = time.time()
+        return {
+            f"http://{info['ip']}:{info['port']}"
+            for info in list(self.namenode.datanodes.values())
+            if now - info.get("last_heartbeat", 0) < Config.HEARTBEAT_TIMEOUT
+        }
+
+    def _schedule(self):
+        running = [job for job in self.jobs.values() if job["state"] == "running"]
+        if not running:
+            return
+        active = self._live_datanodes()
+        for job in running:
+            durations = [task["duration"] for task in job["tasks"] if task["state"] == "done"]
+            for task in job["tasks"]:
+                if job["state"] != "running":
+                    break
+                if task["state"] == "pending":
+                    self._launch(job, task, active)
+                elif task["state"] == "running":
+                    self._speculate(job, task, durations, active)
+
+    def _candidates(self, task, active):
+        """Live replica holders this task has not been tried on, idlest first, with a free slot."""
+        tried = {attempt["datanode"] for attempt in task["attempts"]}
+        urls = [url for url in task["block"]["datanodes"] if url in active and url not in tried]
+        urls.sort(key=lambda url: self.running.get(url, 0))
+        return [url for url in urls if self.running.get(url, 0) < Config.COMPUTE_WORKERS]
+
+    def _launch(self, job, task, active):
+        candidates = self._candidates(task, active)
+        if candidates:
+            self._start_attempt(job, task, candidates[0], speculative=False)
+            return
+        tried = {attempt["datanode"] for attempt in task["attempts"]}
+        if not any(url in active and url not in tried for url in task["block"]["datanodes"]):
+            errors = [attempt["error"] for attempt in task["attempts"] if attempt.get("error")]
+            self._fail(job, f"Block {task['block']['block_id']} has no live replica left to run on"
+                            + (f" (last error: {errors[-1]})" if errors else ""))
+
+    def _speculate(self, job, task, durations, active):
+        live = [attempt for attempt in task["attempts"] if attempt["finished"] is None]
+        if len(live) != 1 or any(attempt["speculative"] for attempt in task["attempts"]):
+            return
+        if not durations or len(durations) < Config.SPECULATIVE_MIN_DONE * len(job["tasks"]):
+            return
+        threshold = max(Config.SPECULATIVE_MIN_SECONDS, Config.SPECULATIVE_SLOWDOWN * statistics.median(durations))
+        if time.time() - live[0]["started"] < threshold:
+            return
+        candidates = self._candidates(task, active)
+        if candidates:
+            log(f"🐢 Block {task['block']['block_id']} is straggling on {live[0]['datanode']}; "
+                f"speculating on {candidates[0]}", level="warning")
+            self._start_attempt(job, task, candidates[0], speculative=True)
+
+    def _start_attempt(self, job, task, url, speculative):
+        attempt = {"datanode": url, "speculative": speculative, "started": time.time(), "finished": None}
+        task["attempts"].append(attempt)
+        task["state"] = "running"
+        self.running[url] = self.running.get(url, 0) + 1
+        threading.Thread(target=self._run_attempt, args=(job, task, attempt), daemon=True).start()
+
+    def _run_attempt(self, job, task, attempt):
+        block = task["block"]
+        body = {
+            "block_id": block["block_id"],
+            "function": job["function"],
+            "params": job["params"],
+            "codec": job["codec"],
+            # Packed small files are a byte range of a shared container block.
+            "offset": block.get("offset"),
+            "length": block.get("length") if "offset" in block else None,
+        }
+        try:
+            response = requests.post(f"{attempt['datanode']}/run_task", json=body,
+                                     timeout=Config.COMPUTE_TASK_TIMEOUT + Config.COMPUTE_TIMEOUT_GRACE
+                                     + Config.REQUEST_TIMEOUT)
+            status, outcome = response.status_code, response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            status, outcome = None, {"error": str(e)}
+
+        with self.condition:
+            self.running[attempt["datanode"]] -= 1
+            attempt["finished"] = time.time()
+            if status == 200:
+                if task["state"] != "done":
+                    attempt["won"] = True
+                    task.update(state="done", result=outcome.get("result"),
+                                duration=attempt["finished"] - attempt["started"])
+                    self._maybe_finish(job)
+            else:
+                attempt["error"] = outcome.get("error", f"HTTP {status}")
+                log(f"⚠️ Task on block {block['block_id']} failed on {attempt['datanode']}: {attempt['error']}",
+                    level="warning")
+                if outcome.get("task_error"):
+                    self._fail(job, f"{job['function']} failed on block {block['block_id']}: {attempt['error']}")
+                elif task["state"] == "running" and all(a["finished"] for a in task["attempts"]):
+                    task["state"] = "pending"  # try the next replica
+            self.condition.notify_all()
+
+    def _maybe_finish(self, job):
+        if job["state"] == "running" and all(task["state"] == "done" for task in job["tasks"]):
+            job["state"] = "succeeded"
+            job["finished"] = time.time()
+            log(f"✅ Job {job['job_id']} finished in {job['finished'] - job['submitted']:.2f}s")
+
+    def _fail(self, job, error):
+        if job["state"] == "running":
+            job["state"] = "failed"
+            job["error"] = error
+            job["finished"] = time.time()
+            log(f"❌ Job {job['job_id']} failed: {error}", level="error")
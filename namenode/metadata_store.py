@@ -1,14 +1,49 @@
 
 
+import copy
 import os
 import json
+import threading
+import uuid
+from collections import deque
+from core.config import Config
 from core.logger import log
+from core.metrics import counter, histogram
+from core.tracing import span
+from core.utils import read_json
+
+MUTATIONS = counter("hdfs_metadata_mutations_total", "Namespace mutations applied", ("op",))
+SAVE_SECONDS = histogram("hdfs_metadata_save_seconds", "Time to persist the metadata files")
+
 
 class MetadataStore:
-    def __init__(self, metadata_file):
+    def __init__(self, metadata_file, standby=False):
+        """
+        standby=True keeps the namespace in memory only; a standby NameNode fills it
+        with load_snapshot() and apply_edit() instead of reading metadata_file.
+        """
         self.metadata_file = metadata_file
+        self.standby = standby
         self.metadata = {}
-        self._load_metadata()
+        # Per-file attributes (codec, ...) live in a sibling file so the
+        # {file_name: [blocks]} layout of metadata_file stays unchanged.
+        self.attributes_file = os.path.splitext(metadata_file)[0] + "_attributes.json"
+        self.attributes = {}
+        # block_id -> every block entry (across all files) that references it; the
+        # length of each list is the block's reference count. Rebuilt on load.
+        self.block_index = {}
+        # Edit log: every mutation gets the next txid and is kept (up to
+        # Config.EDIT_LOG_RETAINED of them) so standby NameNodes can replay it.
+        # log_id changes on every start, telling standbys to bootstrap again.
+        self.log_id = str(uuid.uuid4())
+        self.txid = 0
+        self.edits = deque(maxlen=Config.EDIT_LOG_RETAINED)
+        self.lock = threading.RLock()
+        # Per-file summaries for dashboards, rebuilt only when txid moves on.
+        self._summary = None
+        if not standby:
+            self._load_metadata()
+            self._rebuild_block_index()
 
     def _load_metadata(self):
         if os.path.exists(self.metadata_file):
@@ -19,31 +54,217 @@ class MetadataStore:
             except json.JSONDecodeError:
                 log("Metadata file is corrupted. Starting with empty metadata.", level="warning")
                 self.metadata = {}
+            self.attributes = read_json(self.attributes_file)
         else:
             os.makedirs(os.path.dirname(self.metadata_file), exist_ok=True)
             self._save_metadata()
 
     def _save_metadata(self):
-        with open(self.metadata_file, "w") as f:
-            json.dump(self.metadata, f, indent=4)
-            log("Metadata saved.")
+        # Write-then-rename so a crash never leaves a half-written metadata file.
+        with span("metadata.save"), self.lock, SAVE_SECONDS.time():
+            for path, data in ((self.metadata_file, self.metadata), (self.attributes_file, self.attributes)):
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(data, f, indent=4)
+                os.replace(tmp_path, path)
+        log("Metadata saved.", level="debug")
 
     def save_metadata(self):
         self._save_metadata()
 
+    def _log_edit(self, op, **args):
+        MUTATIONS.labels(op).inc()
+        if self.standby:
+            return
+        self.txid += 1
+        self.edits.append({"txid": self.txid, "op": op, "args": copy.deepcopy(args)})
+
+    def get_snapshot(self):
+        """Returns a consistent copy of the namespace and the txid it reflects."""
+        with self.lock:
+            return {
+                "log_id": self.log_id,
+                "txid": self.txid,
+                "metadata": copy.deepcopy(self.metadata),
+                "attributes": copy.deepcopy(self.attributes),
+            }
+
+    def get_edits(self, since):
+        """
+        Returns the edits after txid `since`, or None if some of them are no longer
+        retained (the caller must bootstrap from a snapshot instead).
+        """
+        with self.lock:
+            if since < self.txid - len(self.edits):
+                return None
+            return [edit for edit in self.edits if edit["txid"] > since]
+
+    def load_snapshot(self, snapshot):
+        """Replaces the namespace with a snapshot from the active NameNode (standby mode)."""
+        with self.lock:
+            self.metadata = snapshot["metadata"]
+            self.attributes = snapshot["attributes"]
+            self.txid = snapshot["txid"]
+            self._summary = None
+            self._rebuild_block_index()
+
+    def apply_edit(self, edit):
+        """Replays one edit from the active NameNode's log (standby mode)."""
+        with self.lock:
+            getattr(self, edit["op"])(**edit["args"])
+            self.txid = edit["txid"]
+
+    def _rebuild_block_index(self):
+        self.block_index = {}
+        for block_list in self.metadata.values():
+            self._retain_blocks(block_list)
+
+    def _retain_blocks(self, block_list):
+        for block in block_list:
+            self.block_index.setdefault(block["block_id"], []).append(block)
+
+    def _release_blocks(self, block_list):
+        """Drops the references held by block_list; returns the blocks nothing references any more."""
+        orphaned = []
+        for block in block_list:
+            entries = [entry for entry in self.block_index.get(block["block_id"], []) if entry is not block]
+            if entries:
+                self.block_index[block["block_id"]] = entries
+            elif self.block_index.pop(block["block_id"], None) is not None:
+                orphaned.append(block)
+        return orphaned
+
     def add_file_blocks(self, file_name, block_list):
-        self.metadata[file_name] = block_list
-        log(f"Added metadata for file: {file_name}")
+        """
+        Sets the blocks of file_name, replacing any previous version. Returns the blocks
+        of the previous version that are no longer referenced by any file.
+        """
+        with self.lock:
+            self._retain_blocks(block_list)
+            orphaned = self._release_blocks(self.metadata.get(file_name, []))
+            self.metadata[file_name] = block_list
+            self._log_edit("add_file_blocks", file_name=file_name, block_list=block_list)
+        log("Added metadata for file: %s", file_name, level="debug")
+        return orphaned
 
     def get_file_blocks(self, file_name):
         return self.metadata.get(file_name, [])
 
+    def set_file_attributes(self, file_name, attributes):
+        with self.lock:
+            self.attributes[file_name] = attributes
+            self._log_edit("set_file_attributes", file_name=file_name, attributes=attributes)
+
+    def get_file_attributes(self, file_name):
+        return self.attributes.get(file_name, {})
+
     def list_all_files(self):
         return list(self.metadata.keys())
 
+    def get_summary(self, offset=0, limit=None):
+        """
+        One page of per-file summaries sorted by name, plus namespace totals. The full
+        list is built on the first request after a mutation and shared by every page
+        until the next one, so dashboards never walk the namespace per request.
+        """
+        limit = limit or Config.SUMMARY_PAGE_SIZE
+        with self.lock:
+            if self._summary is None or self._summary["txid"] != self.txid:
+                self._summary = self._build_summary()
+            summary = self._summary
+        return {
+            "txid": summary["txid"],
+            "total_files": len(summary["files"]),
+            "total_bytes": summary["total_bytes"],
+            "offset": offset,
+            "limit": limit,
+            "files": summary["files"][offset:offset + limit],
+        }
+
+    def _build_summary(self):
+        files = []
+        for file_name in sorted(self.metadata):
+            blocks = self.metadata[file_name]
+            attributes = self.attributes.get(file_name, {})
+            data_blocks = [block for block in blocks if "parity" not in block]
+            # Files written before block lengths were recorded have no known size.
+            lengths = [block.get("raw_length") for block in data_blocks]
+            files.append({
+                "name": file_name,
+                "size": sum(lengths) if None not in lengths else None,
+                "stored_bytes": sum(block.get("stored_length", 0) for block in blocks),
+                "blocks": len(data_blocks),
+                "codec": attributes.get("codec", "none"),
+                "replication": attributes.get("replication"),
+                "erasure_coded": bool(attributes.get("erasure_coding")),
+            })
+        total_bytes = sum(file["size"] or 0 for file in files)
+        return {"txid": self.txid, "files": files, "total_bytes": total_bytes}
+
+    def get_block_entries(self, block_id):
+        """Returns every block entry (across all files) that references block_id."""
+        return list(self.block_index.get(block_id, []))
+
+    def get_block_refcount(self, block_id):
+        return len(self.block_index.get(block_id, []))
+
+    def find_stored_blocks(self, block_ids):
+        """
+        Returns {block_id: datanodes} for the given IDs that have at least one replica
+        confirmed written. Content-addressed blocks stay "pending" from assignment until
+        the uploading client confirms them (confirm_blocks).
+        """
+        found = {}
+        for block_id in block_ids:
+            entries = self.block_index.get(block_id)
+            if entries and not entries[0].get("pending") and entries[0].get("datanodes"):
+                found[block_id] = list(entries[0]["datanodes"])
+        return found
+
+    def confirm_blocks(self, stored):
+        """
+        Marks pending blocks as written. stored is {block_id: datanodes that stored it};
+        a pending entry takes those replicas, an already confirmed one gains any it lacks.
+        """
+        with self.lock:
+            for block_id, datanodes in stored.items():
+                for block in self.block_index.get(block_id, []):
+                    if block.pop("pending", False):
+                        block["datanodes"] = list(datanodes)
+                    else:
+                        block["datanodes"].extend(url for url in datanodes if url not in block["datanodes"])
+            self._log_edit("confirm_blocks", stored=stored)
+
+    def add_block_replica(self, block_id, datanode_url):
+        with self.lock:
+            entries = self.get_block_entries(block_id)
+            for block in entries:
+                if datanode_url not in block["datanodes"]:
+                    block["datanodes"].append(datanode_url)
+            self._log_edit("add_block_replica", block_id=block_id, datanode_url=datanode_url)
+        if entries:
+            log(f"Added replica of block {block_id} on {datanode_url}")
+        return bool(entries)
+
+    def remove_block_replica(self, block_id, datanode_url):
+        with self.lock:
+            entries = self.get_block_entries(block_id)
+            for block in entries:
+                if datanode_url in block["datanodes"]:
+                    block["datanodes"].remove(datanode_url)
+            self._log_edit("remove_block_replica", block_id=block_id, datanode_url=datanode_url)
+        if entries:
+            log(f"Removed replica of block {block_id} on {datanode_url}")
+        return bool(entries)
+
     def remove_file(self, file_name):
-        if file_name in self.metadata:
-            del self.metadata[file_name]
-            log(f"File '{file_name}' metadata removed.")
-        else:
-            log(f"File '{file_name}' not found in metadata.", level="warning")
\ No newline at end of file
+        """Removes a file; returns its blocks that are no longer referenced by any file."""
+        with self.lock:
+            if file_name in self.metadata:
+                orphaned = self._release_blocks(self.metadata.pop(file_name))
+                self.attributes.pop(file_name, None)
+                self._log_edit("remove_file", file_name=file_name)
+                log(f"File '{file_name}' metadata removed.")
+                return orphaned
+        log(f"File '{file_name}' not found in metadata.", level="warning")
+        return []
\ No newline at end of file
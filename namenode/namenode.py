@@ -1,7 +1,10 @@
 import sys
 import os
 import time
+import threading
 import json
+import random
+import uuid
 import requests
 from flask import Flask, request, jsonify
 
@@ -10,17 +13,42 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 
 from namenode.metadata_store import MetadataStore
 from namenode.replication_manager import ReplicationManager
+from namenode.job_scheduler import JobScheduler
+from core.compression import validate_codec
 from core.config import Config
 from core.logger import log
+from core.metrics import histogram
+from core.rpc import RPCError, RPCServer
+from core.tracing import absorb, headers as trace_headers
 
 HEARTBEAT_TIMEOUT = 30  # seconds
 
+HEARTBEAT_INTERVAL = histogram("hdfs_namenode_heartbeat_interval_seconds", "Time between heartbeats of a DataNode",
+                               buckets=(0.5, 1, 2, 3, 5, 10, 15, 30, 60))
+
+
+class SyncConflictError(Exception):
+    """Raised when a file changed between planning and committing a sync."""
+
+
+class LeaseError(Exception):
+    """Raised when a streaming write uses a lease it does not hold (or that expired)."""
+
+
 class NameNode:
     def __init__(self, metadata_file="metadata/files_metadata.json", replication_factor=2, port=8000):
         self.metadata = MetadataStore(metadata_file)
         self.replication_manager = ReplicationManager(self.metadata)
         self.replication_factor = replication_factor
         self.datanodes = {}
+        self.pending_syncs = {}
+        # file_name -> write lease and blocks allocated so far; invisible until completed
+        self.open_files = {}
+        self.lease_lock = threading.Lock()
+        # (block_id, DataNode URL) of corrupt replicas being re-fetched
+        self.repairs = set()
+        self.repairs_lock = threading.Lock()
+        self.job_scheduler = JobScheduler(self)
         self.port = port
         log(f"NameNode initialized on port {self.port}.")
 
@@ -35,9 +63,11 @@ class NameNode:
 
     def receive_heartbeat(self, node_id):
         if node_id in self.datanodes:
+            now = time.time()
+            HEARTBEAT_INTERVAL.observe(now - self.datanodes[node_id].get('last_heartbeat', now))
             self.datanodes[node_id]['status'] = 'active'
-            self.datanodes[node_id]['last_heartbeat'] = time.time()
-            log(f"💓 Heartbeat received from DataNode {node_id}")
+            self.datanodes[node_id]['last_heartbeat'] = now
+            log("💓 Heartbeat received from DataNode %s", node_id, level="debug", sample=("heartbeat", node_id))
         else:
             log(f"⚠️ Unknown DataNode {node_id} tried to send heartbeat", level="warning")
 
@@ -56,37 +86,760 @@ class NameNode:
             raise ValueError("file_size and block_size must be integers")
 
         num_blocks = (file_size + block_size - 1) // block_size
-        block_info = self.replication_manager.assign_blocks(
+        block_info, orphaned = self.replication_manager.assign_blocks(
             file_name, num_blocks, self.replication_factor, self.get_active_datanodes())
         self.metadata.save_metadata()
+        for block in orphaned:
+            self._delete_block_replicas(block)
+        return block_info
+
+    def _layout_attributes(self, replication=None, block_size=None):
+        """Validates a file's replication factor and block size, defaulting to the cluster's."""
+        replication = self.replication_factor if replication is None else int(replication)
+        if replication < 1:
+            raise ValueError("replication must be at least 1")
+        layout = {"replication": replication}
+        if block_size is not None:
+            if int(block_size) < 1:
+                raise ValueError("block_size must be positive")
+            layout["block_size"] = int(block_size)
+        return layout
+
+    def assign_blocks(self, file_name, num_blocks, codec="none", block_lengths=None, erasure_coding=None,
+                      chunking="fixed", replication=None, block_size=None, save=True):
+        """
+        Places num_blocks new blocks for file_name and records the file's codec, chunking,
+        replication factor and block size.
+        block_lengths, if given, holds {"raw_length", "stored_length", "hash"} for each block.
+        erasure_coding ({"data_units", "parity_units"}) stores the file as Reed-Solomon
+        stripes instead of replicas; it requires block_lengths.
+        """
+        validate_codec(codec)
+        if block_lengths is not None and len(block_lengths) != int(num_blocks):
+            raise ValueError("block_lengths must have one entry per block")
+
+        layout = self._layout_attributes(replication, block_size)
+        attributes = {"codec": codec, "chunking": chunking, **layout}
+        if erasure_coding:
+            if block_lengths is None:
+                raise ValueError("Erasure-coded files need block_lengths")
+            data_units = int(erasure_coding["data_units"])
+            parity_units = int(erasure_coding["parity_units"])
+            block_info, orphaned = self.replication_manager.assign_erasure_coded_blocks(
+                file_name, block_lengths, data_units, parity_units, self.get_active_datanodes())
+            attributes["erasure_coding"] = {"data_units": data_units, "parity_units": parity_units}
+            attributes["replication"] = 1
+        else:
+            block_info, orphaned = self.replication_manager.assign_blocks(
+                file_name=file_name,
+                num_blocks=num_blocks,
+                replication_factor=layout["replication"],
+                datanodes=self.get_active_datanodes(),
+                block_lengths=block_lengths
+            )
+        self.metadata.set_file_attributes(file_name, attributes)
+        if save:
+            self.metadata.save_metadata()
+        # Blocks only the replaced version used (the edit log already records the change).
+        for block in orphaned:
+            self._delete_block_replicas(block)
         return block_info
 
+    def assign_deduplicated_blocks(self, file_name, block_ids, codec="none", block_lengths=None, chunking="fixed",
+                                   replication=None, block_size=None, save=True):
+        """
+        Places the blocks of a content-addressed upload. Blocks the cluster already
+        stores (and repeats within the file) reuse their replicas and are only
+        referenced again. Returns (block_info, existing_ids); the client uploads every
+        block except those in existing_ids, and each repeated ID once. Only blocks a
+        client has confirmed (confirm_blocks) count as stored, so a failed or unfinished
+        upload of the same content is sent again rather than referenced.
+        """
+        validate_codec(codec)
+        if block_lengths is not None and len(block_lengths) != len(block_ids):
+            raise ValueError("block_lengths must have one entry per block")
+        layout = self._layout_attributes(replication, block_size)
+
+        existing = self.metadata.find_stored_blocks(set(block_ids))
+        block_info, orphaned = self.replication_manager.assign_blocks(
+            file_name=file_name,
+            num_blocks=len(block_ids),
+            replication_factor=layout["replication"],
+            datanodes=self.get_active_datanodes(),
+            block_lengths=block_lengths,
+            block_ids=block_ids,
+            existing=existing
+        )
+
+        seen = set(existing)
+        reused_blocks = reused_bytes = 0
+        for block in block_info:
+            if block["block_id"] in seen:
+                reused_blocks += 1
+                reused_bytes += block.get("stored_length", 0)
+            seen.add(block["block_id"])
+        log(f"♻️ '{file_name}': {reused_blocks} of {len(block_info)} blocks already stored ({reused_bytes} bytes)")
+
+        self.metadata.set_file_attributes(file_name, {
+            "codec": codec,
+            "chunking": chunking,
+            **layout,
+            "dedup": {"reused_blocks": reused_blocks, "reused_bytes": reused_bytes}
+        })
+        if save:
+            self.metadata.save_metadata()
+        for block in orphaned:
+            self._delete_block_replicas(block)
+        return block_info, sorted(existing)
+
+    def confirm_blocks(self, stored):
+        """
+        Records that content-addressed blocks were written. stored is
+        {block_id: DataNodes that stored it}; each must be a DataNode the block was
+        assigned to. Returns the number of blocks confirmed.
+        """
+        for block_id, datanodes in stored.items():
+            assigned = {url for block in self.metadata.get_block_entries(block_id) for url in block["datanodes"]}
+            if not assigned:
+                raise KeyError(f"Unknown block {block_id}")
+            if not datanodes or not set(datanodes) <= assigned:
+                raise ValueError(f"Block {block_id} lists DataNodes it was not assigned to")
+        self.metadata.confirm_blocks(stored)
+        self.metadata.save_metadata()
+        return len(stored)
+
+    def pack_files(self, containers, files, replication=None):
+        """
+        Records many small files stored inside a few large container blocks.
+        containers lists the byte length of each container; files lists
+        {"file_name", "container", "offset", "length", "hash"}. Every file becomes a single
+        block entry pointing into its container, so the container stays on the DataNodes
+        until the last file packed into it is deleted. Returns the container placements.
+        """
+        layout = self._layout_attributes(replication)
+        datanodes = self.get_active_datanodes()
+        placed = [
+            {"block_id": str(uuid.uuid4()),
+             "datanodes": self.replication_manager.choose_replicas(layout["replication"], datanodes),
+             "length": int(length)}
+            for length in containers
+        ]
+
+        # Validate everything first so a bad request leaves the namespace untouched.
+        names = [file["file_name"] for file in files]
+        if len(set(names)) != len(names):
+            raise ValueError("Each packed file needs a distinct file_name")
+        entries = []
+        for file in files:
+            container = placed[int(file["container"])]
+            offset, length = int(file["offset"]), int(file["length"])
+            if offset < 0 or length < 0 or offset + length > container["length"]:
+                raise ValueError(f"'{file['file_name']}' does not fit inside its container")
+            entries.append((file["file_name"], {
+                "block_id": container["block_id"],
+                "datanodes": list(container["datanodes"]),
+                "offset": offset,
+                "length": length,
+                "raw_length": length,
+                "stored_length": length,
+                "hash": file.get("hash"),
+            }))
+
+        orphaned = []
+        for file_name, entry in entries:
+            orphaned.extend(self.metadata.add_file_blocks(file_name, [entry]))
+            self.metadata.set_file_attributes(file_name, {"codec": "none", "chunking": "fixed", "packed": True, **layout})
+
+        self.metadata.save_metadata()
+        # Blocks (or whole containers) only the replaced versions still referenced.
+        for block in orphaned:
+            self._delete_block_replicas(block)
+        log(f"📦 Packed {len(files)} files into {len(placed)} container blocks")
+        return placed
+
+    def create_file(self, file_name, codec="none", replication=None, block_size=None):
+        """
+        Opens file_name for a streaming write and returns a lease ID. The file stays
+        invisible (an existing version keeps being served) until complete_file.
+        """
+        validate_codec(codec)
+        layout = self._layout_attributes(replication, block_size)
+        self._expire_leases()
+        lease_id = str(uuid.uuid4())
+        with self.lease_lock:
+            if file_name in self.open_files:
+                raise LeaseError(f"'{file_name}' is already being written")
+            self.open_files[file_name] = {
+                "lease_id": lease_id,
+                "codec": codec,
+                "layout": layout,
+                "allocated": {},
+                "renewed": time.time(),
+            }
+        log(f"📝 Opened '{file_name}' for writing")
+        return lease_id
+
+    def _check_lease(self, file_name, lease_id):
+        open_file = self.open_files.get(file_name)
+        if open_file is None or open_file["lease_id"] != lease_id:
+            raise LeaseError(f"No valid lease on '{file_name}'")
+        open_file["renewed"] = time.time()
+        return open_file
+
+    def renew_lease(self, file_name, lease_id):
+        with self.lease_lock:
+            self._check_lease(file_name, lease_id)
+
+    def add_block(self, file_name, lease_id, count=1):
+        """Allocates the next `count` blocks of an open file; also renews the lease."""
+        with self.lease_lock:
+            replication = self._check_lease(file_name, lease_id)["layout"]["replication"]
+        datanodes = self.get_active_datanodes()
+        blocks = [
+            {"block_id": str(uuid.uuid4()),
+             "datanodes": self.replication_manager.choose_replicas(replication, datanodes)}
+            for _ in range(int(count))
+        ]
+        with self.lease_lock:
+            open_file = self._check_lease(file_name, lease_id)
+            for block in blocks:
+                open_file["allocated"][block["block_id"]] = block
+        return blocks
+
+    def complete_file(self, file_name, lease_id, blocks):
+        """
+        Publishes an open file. blocks lists the written blocks in order as
+        {"block_id", "raw_length", "stored_length", "hash", "datanodes"}, where datanodes
+        are the allocated DataNodes that actually stored the block (blocks short of the
+        file's replication factor are re-replicated in the background); allocations that
+        were never used are released. Replaces any previous version atomically. An empty block
+        list is rejected (and the lease dropped), since a file needs at least one block.
+        """
+        with self.lease_lock:
+            open_file = self._check_lease(file_name, lease_id)
+            entries = []
+            for block in blocks:
+                allocated = open_file["allocated"].get(block["block_id"])
+                if allocated is None:
+                    raise ValueError(f"Block {block['block_id']} was not allocated to '{file_name}'")
+                stored_on = block.get("datanodes", allocated["datanodes"])
+                if not stored_on:
+                    raise ValueError(f"Block {block['block_id']} was not stored on any DataNode")
+                if not set(stored_on) <= set(allocated["datanodes"]):
+                    raise ValueError(f"Block {block['block_id']} lists DataNodes it was not allocated to")
+                entries.append({
+                    **allocated,
+                    "datanodes": stored_on,
+                    "raw_length": block["raw_length"],
+                    "stored_length": block["stored_length"],
+                    "hash": block.get("hash"),
+                })
+            del self.open_files[file_name]
+
+        used = {entry["block_id"] for entry in entries}
+        for block_id, block in open_file["allocated"].items():
+            if block_id not in used:
+                self._delete_block_replicas(block)
+        if not entries:
+            raise ValueError(f"'{file_name}' has no data; empty files are not stored")
+
+        orphaned = self.metadata.add_file_blocks(file_name, entries)
+        self.metadata.set_file_attributes(file_name, {"codec": open_file["codec"], "chunking": "fixed",
+                                                      **open_file["layout"]})
+        self.metadata.save_metadata()
+        for block in orphaned:
+            self._delete_block_replicas(block)
+        log(f"✅ Completed '{file_name}' ({len(entries)} blocks)")
+        short = sum(len(entry["datanodes"]) < len(open_file["allocated"][entry["block_id"]]["datanodes"])
+                    for entry in entries)
+        if short:
+            log(f"⚠️ {short} blocks of '{file_name}' were stored on fewer DataNodes than allocated; "
+                f"re-replicating", level="warning")
+            threading.Thread(target=self.reconcile_replication, args=(file_name,), daemon=True).start()
+        return entries
+
+    def _expire_leases(self):
+        now = time.time()
+        with self.lease_lock:
+            expired = [(name, f) for name, f in self.open_files.items() if now - f["renewed"] > Config.LEASE_TIMEOUT]
+            for file_name, _ in expired:
+                del self.open_files[file_name]
+        for file_name, open_file in expired:
+            log(f"⌛ Lease on '{file_name}' expired; discarding {len(open_file['allocated'])} blocks",
+                level="warning")
+            for block in open_file["allocated"].values():
+                self._delete_block_replicas(block)
+
+    def start_lease_monitor(self):
+        """Discards abandoned streaming writes in the background."""
+        def monitor():
+            while True:
+                time.sleep(max(1, Config.LEASE_TIMEOUT / 2))
+                self._expire_leases()
+
+        threading.Thread(target=monitor, daemon=True).start()
+
+    def start_rpc_server(self):
+        """
+        Serves the hot metadata calls over the binary RPC transport, on the HTTP port plus
+        Config.RPC_PORT_OFFSET. Method names match the HTTP paths; the HTTP API stays up.
+        """
+        def heartbeat(args, _):
+            if args.get("node_id") not in self.datanodes:
+                raise RPCError("Unknown DataNode", 404)
+            self.receive_heartbeat(args["node_id"])
+            return {"status": "alive"}
+
+        def get_file_blocks(args, _):
+            blocks = self.get_file_blocks(args.get("file_name"))
+            if not blocks:
+                raise RPCError("File not found", 404)
+            return {"blocks": blocks, "attributes": self.get_file_attributes(args["file_name"])}
+
+        def delete_file(args, _):
+            self.remove_file(args["file_name"])
+            return {"message": f"File '{args['file_name']}' deleted"}
+
+        def submit_job(args, _):
+            try:
+                return self.job_scheduler.submit(args.get("file_name"), args.get("function"), args.get("params"))
+            except FileNotFoundError as e:
+                raise RPCError(str(e), 404)
+
+        def job_status(args, _):
+            status = self.job_scheduler.get_status(args.get("job_id"))
+            if status is None:
+                raise RPCError("Unknown job", 404)
+            return status
+
+        def confirm_blocks(args, _):
+            try:
+                return {"confirmed": self.confirm_blocks(args.get("blocks") or {})}
+            except KeyError as e:
+                raise RPCError(e.args[0], 404)
+            except ValueError as e:
+                raise RPCError(str(e), 400)
+
+        handlers = {
+            "heartbeat": heartbeat,
+            "assign_blocks": lambda args, _: self.assign_file(args),
+            "get_file_blocks": get_file_blocks,
+            "files": lambda args, _: self.list_files(),
+            "delete_file": delete_file,
+            "batch/get_file_blocks": lambda args, _: {"results": self.get_files_blocks(args["file_names"])},
+            "batch/assign_blocks": lambda args, _: {"results": self.assign_files(args["files"])},
+            "confirm_blocks": confirm_blocks,
+            "batch/delete_files": lambda args, _: {"results": self.remove_files(args["file_names"])},
+            "submit_job": submit_job,
+            "job_status": job_status,
+        }
+        RPCServer(handlers, "0.0.0.0", self.port + Config.RPC_PORT_OFFSET, component="namenode").start()
+
+    def plan_sync(self, file_name, blocks, codec="none", chunking="fixed"):
+        """
+        Plans a new version of file_name. `blocks` lists the new version in order: either
+        {"block_id"} to reuse a block of the current version by reference, or
+        {"raw_length", "hash"} for data the client must upload (its stored_length is
+        reported to commit_sync once the block is written). Nothing changes until
+        commit_sync; returns (sync_id, block_info) where block_info[i] describes blocks[i].
+        """
+        validate_codec(codec)
+        self._expire_pending_syncs()
+        attributes = self.metadata.get_file_attributes(file_name)
+        if attributes.get("erasure_coding"):
+            raise ValueError("Erasure-coded files cannot be synced")
+        if attributes and attributes.get("codec", "none") != codec:
+            raise ValueError(f"'{file_name}' is stored with codec '{attributes.get('codec', 'none')}'")
+
+        current = self.metadata.get_file_blocks(file_name)
+        current_by_id = {block["block_id"]: block for block in current}
+        datanodes = self.get_active_datanodes()
+        replication = attributes.get("replication", self.replication_factor)
+
+        block_info = []
+        for block in blocks:
+            if "block_id" in block:
+                if block["block_id"] not in current_by_id:
+                    raise ValueError(f"Block {block['block_id']} is not part of '{file_name}'")
+                reused = current_by_id[block["block_id"]]
+                block_info.append({**reused, "datanodes": list(reused["datanodes"])})
+            else:
+                block_info.append({
+                    "block_id": str(uuid.uuid4()),
+                    "datanodes": self.replication_manager.choose_replicas(replication, datanodes),
+                    "raw_length": block["raw_length"],
+                    "stored_length": block.get("stored_length"),
+                    "hash": block["hash"],
+                })
+
+        sync_id = str(uuid.uuid4())
+        self.pending_syncs[sync_id] = {
+            "file_name": file_name,
+            "base": [block["block_id"] for block in current],
+            "blocks": block_info,
+            "new_blocks": [info for block, info in zip(blocks, block_info) if "block_id" not in block],
+            "attributes": {**attributes, "codec": codec, "chunking": chunking},
+            "created": time.time(),
+        }
+        reused_count = len(block_info) - len(self.pending_syncs[sync_id]["new_blocks"])
+        log(f"🔁 Sync plan for '{file_name}': {reused_count} of {len(block_info)} blocks reused")
+        return sync_id, block_info
+
+    def commit_sync(self, sync_id, written=None):
+        """
+        Atomically replaces the file's block list with the planned version. `written`
+        reports every new block as {"block_id", "stored_length", "datanodes"}, where
+        datanodes are the planned DataNodes that actually stored it. Blocks only the old
+        version referenced are deleted afterwards.
+        """
+        plan = self.pending_syncs.get(sync_id)
+        if plan is None:
+            raise KeyError(f"Unknown or expired sync {sync_id}")
+        if written is not None:
+            reported = {block["block_id"]: block for block in written}
+            for block in plan["new_blocks"]:
+                report = reported.get(block["block_id"])
+                if report is None:
+                    raise ValueError(f"Block {block['block_id']} was not reported as written")
+                if not report.get("datanodes") or not set(report["datanodes"]) <= set(block["datanodes"]):
+                    raise ValueError(f"Block {block['block_id']} lists DataNodes it was not planned on")
+                block.update(stored_length=report["stored_length"], datanodes=list(report["datanodes"]))
+        if self.pending_syncs.pop(sync_id, None) is None:
+            raise KeyError(f"Unknown or expired sync {sync_id}")
+        file_name = plan["file_name"]
+        current = [block["block_id"] for block in self.metadata.get_file_blocks(file_name)]
+        if current != plan["base"]:
+            for block in plan["new_blocks"]:
+                self._delete_block_replicas(block)
+            raise SyncConflictError(f"'{file_name}' changed while the sync was in progress")
+
+        orphaned = self.metadata.add_file_blocks(file_name, plan["blocks"])
+        self.metadata.set_file_attributes(file_name, plan["attributes"])
+        self.metadata.save_metadata()
+        for block in orphaned:
+            self._delete_block_replicas(block)
+        log(f"✅ Committed new version of '{file_name}' ({len(plan['new_blocks'])} new blocks, "
+            f"{len(orphaned)} old blocks released)")
+        return plan["blocks"]
+
+    def _expire_pending_syncs(self):
+        now = time.time()
+        for sync_id, plan in list(self.pending_syncs.items()):
+            if now - plan["created"] > Config.SYNC_TIMEOUT:
+                log(f"⌛ Abandoning sync of '{plan['file_name']}'", level="warning")
+                self.pending_syncs.pop(sync_id)
+                for block in plan["new_blocks"]:
+                    self._delete_block_replicas(block)
+
+    def get_dedup_stats(self):
+        """
+        Compares the bytes files reference (logical) with the bytes of distinct blocks
+        actually stored (physical), per copy; replication multiplies both equally.
+        """
+        logical_bytes = sum(
+            block.get("stored_length", 0)
+            for block_list in self.metadata.metadata.values()
+            for block in block_list
+        )
+        physical_bytes = sum(
+            entries[0].get("stored_length", 0) for entries in self.metadata.block_index.values()
+        )
+        wire_bytes_saved = sum(
+            attributes.get("dedup", {}).get("reused_bytes", 0)
+            for attributes in self.metadata.attributes.values()
+        )
+        shared_blocks = sum(1 for entries in self.metadata.block_index.values() if len(entries) > 1)
+        return {
+            "files": len(self.metadata.metadata),
+            "unique_blocks": len(self.metadata.block_index),
+            "shared_blocks": shared_blocks,
+            "logical_bytes": logical_bytes,
+            "physical_bytes": physical_bytes,
+            "bytes_saved": logical_bytes - physical_bytes,
+            "dedup_ratio": round(logical_bytes / physical_bytes, 3) if physical_bytes else 1.0,
+            "wire_bytes_saved": wire_bytes_saved,
+        }
+
     def get_file_blocks(self, file_name):
         return self.metadata.get_file_blocks(file_name)
 
+    def get_file_attributes(self, file_name):
+        return self.metadata.get_file_attributes(file_name)
+
     def list_files(self):
         return list(self.metadata.metadata.keys())
 
-    def remove_file(self, file_name):
-        # Get blocks before removing metadata
-        blocks = self.metadata.get_file_blocks(file_name)
-        
-        for block in blocks:
-            block_id = block.get("block_id")
-            datanodes = block.get("datanodes", [])
-            
-            for datanode_url in datanodes:
-                try:
-                    # datanode_url is like "http://127.0.0.1:5001"
-                    requests.delete(f"{datanode_url}/delete_block?block_id={block_id}")
-                    log(f"🗑️ Requested deletion of block {block_id} from {datanode_url}")
-                except Exception as e:
-                    log(f"❌ Failed to request deletion from {datanode_url}: {e}", level="error")
-
-        self.metadata.remove_file(file_name)
-        self.metadata.save_metadata()
+    def remove_file(self, file_name, save=True):
+        # Blocks shared with other files (deduplicated uploads) stay on the DataNodes
+        # until their last reference is gone.
+        for block in self.metadata.remove_file(file_name):
+            self._delete_block_replicas(block)
+
+        if save:
+            self.metadata.save_metadata()
         log(f"🗑️ File '{file_name}' removed from metadata.")
 
+    def assign_file(self, body, save=True):
+        """
+        Allocates blocks for one /assign_blocks request body. Requests carrying
+        block_ids take the deduplicated path. Returns {"blocks"[, "existing"]}.
+        """
+        file_name = body.get("file_name")
+        num_blocks = body.get("num_blocks")
+        if not file_name or not num_blocks:
+            raise ValueError("Missing file_name or num_blocks")
+
+        if body.get("block_ids"):
+            block_info, existing = self.assign_deduplicated_blocks(
+                file_name,
+                body["block_ids"],
+                codec=body.get("codec", "none"),
+                block_lengths=body.get("block_lengths"),
+                chunking=body.get("chunking", "fixed"),
+                replication=body.get("replication"),
+                block_size=body.get("block_size"),
+                save=save
+            )
+            return {"blocks": block_info, "existing": existing}
+
+        block_info = self.assign_blocks(
+            file_name,
+            num_blocks,
+            codec=body.get("codec", "none"),
+            block_lengths=body.get("block_lengths"),
+            erasure_coding=body.get("erasure_coding"),
+            chunking=body.get("chunking", "fixed"),
+            replication=body.get("replication"),
+            block_size=body.get("block_size"),
+            save=save
+        )
+        return {"blocks": block_info}
+
+    def get_files_blocks(self, file_names):
+        """Resolves blocks and attributes for many files; missing files get an error entry."""
+        results = {}
+        for file_name in file_names:
+            blocks = self.metadata.get_file_blocks(file_name)
+            if blocks:
+                results[file_name] = {"blocks": blocks, "attributes": self.metadata.get_file_attributes(file_name)}
+            else:
+                results[file_name] = {"error": "File not found"}
+        return results
+
+    def assign_files(self, bodies):
+        """
+        Allocates blocks for many files and saves the metadata once. Each request is
+        handled on its own: a failure is reported in its result and does not undo the
+        others. Returns one result per request body, in order.
+        """
+        results = []
+        for body in bodies:
+            try:
+                results.append({"file_name": body.get("file_name"), **self.assign_file(body, save=False)})
+            except (ValueError, KeyError, TypeError) as e:
+                results.append({"file_name": body.get("file_name"), "error": str(e)})
+        self.metadata.save_metadata()
+        log(f"📦 Batch-assigned blocks for {sum('error' not in r for r in results)} of {len(results)} files")
+        return results
+
+    def remove_files(self, file_names):
+        """Deletes many files and saves the metadata once. Returns a result per file name."""
+        results = {}
+        for file_name in file_names:
+            if file_name not in self.metadata.metadata:
+                results[file_name] = {"error": "File not found"}
+                continue
+            try:
+                self.remove_file(file_name, save=False)
+                results[file_name] = {"status": "deleted"}
+            except Exception as e:
+                log(f"❌ Error deleting '{file_name}': {e}", level="error")
+                results[file_name] = {"error": str(e)}
+        self.metadata.save_metadata()
+        return results
+
+    def transfer_block(self, block_id, source_url, target_url, target_block_id=None, report=True):
+        """
+        Asks target_url to pull block_id from source_url (DataNode-to-DataNode, no client involved).
+        Returns True if the target stored a verified copy.
+        """
+        try:
+            response = requests.post(
+                f"{target_url}/transfer_block",
+                json={
+                    "block_id": block_id,
+                    "peer": source_url,
+                    "mode": "pull",
+                    "target_block_id": target_block_id or block_id,
+                    "report": report,
+                },
+                timeout=max(Config.REQUEST_TIMEOUT, 60),
+                headers=trace_headers()
+            )
+            absorb(response.headers)
+            return response.status_code == 200
+        except Exception as e:
+            log(f"❌ Failed to request transfer of block {block_id} to {target_url}: {e}", level="error")
+            return False
+
+    def handle_transfer_report(self, block_id, datanode_url, status):
+        if status != "success":
+            log(f"⚠️ Transfer of block {block_id} to {datanode_url} failed", level="warning")
+            return
+        if self.metadata.add_block_replica(block_id, datanode_url):
+            self.metadata.save_metadata()
+
+    def handle_bad_block(self, block_id, datanode_url):
+        """
+        Drops a corrupt replica from metadata and has the reporting node re-fetch the
+        block from a healthy replica (the transfer report re-adds it on success).
+        """
+        entries = self.metadata.get_block_entries(block_id)
+        if not entries:
+            log(f"⚠️ Bad block report for unknown block {block_id}", level="warning")
+            return
+        healthy = [url for url in entries[0]["datanodes"] if url != datanode_url]
+        if not healthy:
+            log(f"❌ Only replica of block {block_id} on {datanode_url} is corrupt", level="error")
+            return
+        # The scanner and every failed read report the same replica; repair it once.
+        with self.repairs_lock:
+            if (block_id, datanode_url) in self.repairs:
+                log("🩹 Repair already in progress", level="debug", block_id=block_id, datanode=datanode_url)
+                return
+            self.repairs.add((block_id, datanode_url))
+
+        self.metadata.remove_block_replica(block_id, datanode_url)
+        self.metadata.save_metadata()
+        log(f"🩹 Replacing corrupt replica of block {block_id} on {datanode_url} from {healthy[0]}")
+
+        def repair():
+            try:
+                self.transfer_block(block_id, healthy[0], datanode_url)
+            finally:
+                with self.repairs_lock:
+                    self.repairs.discard((block_id, datanode_url))
+
+        threading.Thread(target=repair, daemon=True).start()
+
+    def set_replication(self, file_name, replication):
+        """
+        Changes a file's replication factor. Replicas are added or trimmed by a
+        background thread; the new factor is recorded immediately.
+        """
+        if not self.metadata.get_file_blocks(file_name):
+            raise FileNotFoundError(f"File '{file_name}' not found")
+        attributes = self.metadata.get_file_attributes(file_name)
+        if attributes.get("erasure_coding"):
+            raise ValueError("Erasure-coded files are protected by parity, not replicas")
+        layout = self._layout_attributes(replication)
+
+        self.metadata.set_file_attributes(file_name, {**attributes, **layout})
+        self.metadata.save_metadata()
+        log(f"🎚️ Replication of '{file_name}' set to {layout['replication']}")
+        threading.Thread(target=self.reconcile_replication, args=(file_name,), daemon=True).start()
+        return layout["replication"]
+
+    def _target_replication(self):
+        """Returns {block_id: replicas wanted}: the highest factor of any file referencing the block."""
+        with self.metadata.lock:
+            files = [(block_list, self.metadata.get_file_attributes(file_name))
+                     for file_name, block_list in self.metadata.metadata.items()]
+        targets = {}
+        for block_list, attributes in files:
+            replication = attributes.get("replication", self.replication_factor)
+            for block in block_list:
+                targets[block["block_id"]] = max(targets.get(block["block_id"], 0), replication)
+        return targets
+
+    def reconcile_replication(self, file_name):
+        """
+        Brings every block of file_name to its target replica count: missing replicas are
+        pulled DataNode-to-DataNode and surplus ones (inactive nodes first) are deleted.
+        """
+        targets = self._target_replication()
+        active = [f"http://{info['host']}:{info['port']}" for info in self.get_active_datanodes().values()]
+        seen = set()
+        for block in self.metadata.get_file_blocks(file_name):
+            block_id = block["block_id"]
+            if block_id in seen or block_id not in targets:
+                continue
+            seen.add(block_id)
+            # Active holders first, so trimming drops replicas on dead nodes before live ones.
+            holders = sorted(block["datanodes"], key=lambda url: url not in active)
+            live = [url for url in holders if url in active]
+            target = targets[block_id]
+
+            # Only live holders count toward the target; replicas on dead nodes are kept
+            # in case the node comes back, and trimmed first once there are enough.
+            if len(live) < target:
+                candidates = [url for url in active if url not in holders]
+                random.shuffle(candidates)
+                if not live:
+                    log(f"❌ No live replica of block {block_id} to copy from", level="error")
+                    continue
+                for target_url in candidates[:target - len(live)]:
+                    # The DataNode's transfer report adds the new replica to metadata.
+                    self.transfer_block(block_id, live[0], target_url)
+            elif len(holders) > target:
+                for url in holders[target:]:
+                    self.metadata.remove_block_replica(block_id, url)
+                    self._delete_block_replicas({"block_id": block_id, "datanodes": [url]})
+
+        self.metadata.save_metadata()
+        log(f"🎚️ Replication of '{file_name}' reconciled")
+
+    def copy_file(self, source_name, destination_name):
+        """
+        Duplicates a file server-side: every replica holder copies its block locally
+        under a new block ID, so no data passes through the client.
+        """
+        source_blocks = self.metadata.get_file_blocks(source_name)
+        if not source_blocks:
+            raise FileNotFoundError(f"File '{source_name}' not found")
+        if self.metadata.get_file_blocks(destination_name):
+            raise FileExistsError(f"File '{destination_name}' already exists")
+
+        new_blocks = []
+        for block in source_blocks:
+            if "offset" in block:
+                # Container blocks are never modified, so a packed file is copied by
+                # referencing the same range; the refcount keeps the container alive.
+                new_blocks.append({**block, "datanodes": list(block["datanodes"])})
+                continue
+            new_block_id = str(uuid.uuid4())
+            copied_to = [
+                datanode_url for datanode_url in block.get("datanodes", [])
+                if self.transfer_block(block["block_id"], datanode_url, datanode_url,
+                                       target_block_id=new_block_id, report=False)
+            ]
+            if not copied_to:
+                for done in new_blocks:
+                    if "offset" not in done:
+                        self._delete_block_replicas(done)
+                raise IOError(f"Could not copy block {block['block_id']} of '{source_name}'")
+            new_blocks.append({**block, "block_id": new_block_id, "datanodes": copied_to})
+
+        orphaned = self.metadata.add_file_blocks(destination_name, new_blocks)
+        self.metadata.set_file_attributes(destination_name, dict(self.metadata.get_file_attributes(source_name)))
+        self.metadata.save_metadata()
+        # The destination may have been created while the blocks were being copied.
+        for block in orphaned:
+            self._delete_block_replicas(block)
+        log(f"📑 Copied '{source_name}' to '{destination_name}' ({len(new_blocks)} blocks)")
+        return new_blocks
+
+    def _delete_block_replicas(self, block):
+        block_id = block.get("block_id")
+        for datanode_url in block.get("datanodes", []):
+            try:
+                # datanode_url is like "http://127.0.0.1:5001"
+                response = requests.delete(f"{datanode_url}/delete_block?block_id={block_id}", headers=trace_headers())
+                absorb(response.headers)
+                log("🗑️ Requested block deletion", level="debug", block_id=block_id, datanode=datanode_url)
+            except Exception as e:
+                log(f"❌ Failed to request deletion from {datanode_url}: {e}", level="error")
+
     def get_active_datanodes(self):
         self.cleanup_datanodes()
         return {
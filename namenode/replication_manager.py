@@ -1,29 +1,99 @@
 import uuid
 import random
+from core.logger import log
 
 class ReplicationManager:
     def __init__(self, metadata_store):
         self.metadata_store = metadata_store
 
-    def assign_blocks(self, file_name, num_blocks, replication_factor, datanodes):
+    def choose_replicas(self, replication_factor, datanodes):
+        # Randomly select DataNodes for better load balancing
+        available_nodes = list(datanodes.items())
+        if len(available_nodes) >= replication_factor:
+            chosen = random.sample(available_nodes, replication_factor)
+        else:
+            chosen = available_nodes
+        return [f"http://{info['host']}:{info['port']}" for node_id, info in chosen]
+
+    def assign_blocks(self, file_name, num_blocks, replication_factor, datanodes, block_lengths=None,
+                      block_ids=None, existing=None):
+        """
+        block_ids, if given, names the blocks (content-addressed uploads) instead of fresh
+        UUIDs. Blocks in existing ({block_id: datanodes}) keep their current replicas, and
+        a block ID repeated within the file is placed only once. Newly placed named
+        blocks are marked "pending" until the client confirms them. Returns (block_list,
+        orphaned), where orphaned lists the blocks of a replaced version that no file
+        references any more; the caller deletes them from the DataNodes.
+        """
         block_list = []
+        placed = dict(existing or {})
+
+        for index in range(int(num_blocks)):
+            block_id = block_ids[index] if block_ids else str(uuid.uuid4())
+            if block_id in placed:
+                block = {"block_id": block_id, "datanodes": list(placed[block_id])}
+                if block_id not in (existing or {}):
+                    block["pending"] = True
+                if block_lengths:
+                    block.update(block_lengths[index])
+                block_list.append(block)
+                continue
+
+            replicas = self.choose_replicas(replication_factor, datanodes)
+            block = {
+                "block_id": block_id,
+                "datanodes": replicas
+            }
+            if block_ids:
+                placed[block_id] = replicas
+                block["pending"] = True
+            if block_lengths:
+                # raw_length/stored_length let readers locate byte ranges in compressed files
+                block.update(block_lengths[index])
+            block_list.append(block)
 
-        for _ in range(int(num_blocks)):
-            block_id = str(uuid.uuid4())
+        orphaned = self.metadata_store.add_file_blocks(file_name, block_list)
+        return block_list, orphaned
 
-            # Randomly select DataNodes for better load balancing
-            available_nodes = list(datanodes.items())
-            if len(available_nodes) >= replication_factor:
-                chosen = random.sample(available_nodes, replication_factor)
+    def assign_erasure_coded_blocks(self, file_name, block_lengths, data_units, parity_units, datanodes):
+        """
+        Groups the file's blocks into stripes of data_units data cells plus parity_units
+        parity cells and places every cell of a stripe on a different DataNode.
+        Each cell is stored once; parity cells are sized to the largest data cell.
+        Returns (block_list, orphaned), as assign_blocks does.
+        """
+        node_urls = [f"http://{info['host']}:{info['port']}" for info in datanodes.values()]
+        if not node_urls:
+            raise ValueError("No active DataNodes available")
+
+        block_list = []
+        for stripe, start in enumerate(range(0, len(block_lengths), data_units)):
+            stripe_lengths = block_lengths[start:start + data_units]
+            width = len(stripe_lengths) + parity_units
+            if len(node_urls) >= width:
+                placement = random.sample(node_urls, width)
             else:
-                chosen = available_nodes
+                log(f"⚠️ Only {len(node_urls)} DataNodes for a {width}-cell stripe; cells will share nodes", level="warning")
+                offset = random.randrange(len(node_urls))
+                placement = [node_urls[(offset + i) % len(node_urls)] for i in range(width)]
 
-            replicas = [f"http://{info['host']}:{info['port']}" for node_id, info in chosen]
+            for cell, lengths in enumerate(stripe_lengths):
+                block_list.append({
+                    "block_id": str(uuid.uuid4()),
+                    "datanodes": [placement[cell]],
+                    "stripe": stripe,
+                    **lengths
+                })
 
-            block_list.append({
-                "block_id": block_id,
-                "datanodes": replicas
-            })
+            cell_size = max(lengths["stored_length"] for lengths in stripe_lengths)
+            for parity in range(parity_units):
+                block_list.append({
+                    "block_id": str(uuid.uuid4()),
+                    "datanodes": [placement[len(stripe_lengths) + parity]],
+                    "stripe": stripe,
+                    "parity": parity,
+                    "stored_length": cell_size
+                })
 
-        self.metadata_store.add_file_blocks(file_name, block_list)
-        return block_list
\ No newline at end of file
+        orphaned = self.metadata_store.add_file_blocks(file_name, block_list)
+        return block_list, orphaned
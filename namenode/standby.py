@@ -0,0 +1,111 @@
+import threading
+import time
+import requests
+from core.config import Config
+from core.logger import log
+from namenode.metadata_store import MetadataStore
+
+
+class StandbyNameNode:
+    """
+    Read-only mirror of an active NameNode's namespace.
+
+    Bootstraps from the active node's /snapshot, then replays its /edits every
+    poll_interval seconds (bootstrapping again if it falls behind the retained log or
+    the active node restarts). Reads are only served while the last successful poll is
+    at most max_staleness seconds old.
+    """
+
+    def __init__(self, active_url, poll_interval=None, max_staleness=None):
+        self.active_url = active_url
+        self.poll_interval = poll_interval or Config.STANDBY_POLL_INTERVAL
+        self.max_staleness = max_staleness or Config.STANDBY_MAX_STALENESS
+        self.metadata = MetadataStore(Config.METADATA_FILE, standby=True)
+        self.datanodes = {}
+        self.log_id = None
+        self.active_txid = 0
+        self.last_synced = None
+
+    def bootstrap(self):
+        response = requests.get(f"{self.active_url}/snapshot", timeout=Config.REQUEST_TIMEOUT)
+        response.raise_for_status()
+        snapshot = response.json()
+        self.metadata.load_snapshot(snapshot)
+        self.log_id = snapshot["log_id"]
+        self.active_txid = snapshot["txid"]
+        self.last_synced = time.time()
+        log(f"📸 Standby bootstrapped from {self.active_url} at txid {snapshot['txid']} "
+            f"({len(snapshot['metadata'])} files)")
+
+    def poll_once(self):
+        if self.log_id is None:
+            self.bootstrap()
+            return
+
+        response = requests.get(f"{self.active_url}/edits", timeout=Config.REQUEST_TIMEOUT,
+                                params={"since": self.metadata.txid, "log_id": self.log_id})
+        if response.status_code == 410:
+            log("⚠️ Standby fell behind the active NameNode's edit log; bootstrapping again.", level="warning")
+            self.bootstrap()
+            return
+        response.raise_for_status()
+
+        body = response.json()
+        for edit in body["edits"]:
+            self.metadata.apply_edit(edit)
+        self.datanodes = body["datanodes"]
+        self.active_txid = body["txid"]
+        self.last_synced = time.time()
+
+    def run(self):
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                log(f"❌ Standby could not sync from {self.active_url}: {e}", level="error")
+            time.sleep(self.poll_interval)
+
+    def start(self):
+        threading.Thread(target=self.run, daemon=True).start()
+        log(f"🪞 Standby NameNode tailing {self.active_url}")
+
+    def staleness(self):
+        """Seconds since the namespace was last known to match the active NameNode."""
+        return float("inf") if self.last_synced is None else time.time() - self.last_synced
+
+    def is_fresh(self):
+        return self.staleness() <= self.max_staleness
+
+    def get_status(self):
+        return {
+            "active_url": self.active_url,
+            "txid": self.metadata.txid,
+            "active_txid": self.active_txid,
+            "staleness": None if self.last_synced is None else round(self.staleness(), 3),
+            "max_staleness": self.max_staleness,
+            "fresh": self.is_fresh(),
+        }
+
+    def get_file_blocks(self, file_name):
+        return self.metadata.get_file_blocks(file_name)
+
+    def get_file_attributes(self, file_name):
+        return self.metadata.get_file_attributes(file_name)
+
+    def list_files(self):
+        return self.metadata.list_all_files()
+
+    def get_namespace(self):
+        """{file_name: blocks} for every file, copied so edits applied meanwhile don't disturb callers."""
+        with self.metadata.lock:
+            return dict(self.metadata.metadata)
+
+    def get_files_blocks(self, file_names):
+        results = {}
+        for file_name in file_names:
+            blocks = self.metadata.get_file_blocks(file_name)
+            if blocks:
+                results[file_name] = {"blocks": blocks, "attributes": self.metadata.get_file_attributes(file_name)}
+            else:
+                results[file_name] = {"error": "File not found"}
+        return results
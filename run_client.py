@@ -1,11 +1,21 @@
 from client.client import HDFSClient
-from core.logger import log
+from core.logger import flush as flush_logs, log
 from core.config import Config
+from core.tracing import span, start_trace
+import json
 import sys
 
+
+def option_value(options, name):
+    """Returns the integer N from a `--name=N` option, or None if it is absent."""
+    for option in options:
+        if option.startswith(f"--{name}="):
+            return int(option.split("=", 1)[1])
+    return None
+
 def main():
     if len(sys.argv) < 2:
-        log("Usage: python run_client.py <upload/download/list/delete> <file_path (if required)>", level="error")
+        log("Usage: python run_client.py <upload/upload-many/stream/pack/sync/download/download-many/list/delete/copy/setrep/dedup-stats/job> <file_path (if required)>", level="error")
         return
 
     action = sys.argv[1].lower()
@@ -17,25 +27,110 @@ def main():
 
     client = HDFSClient(namenode_url, block_size)
     if action == "upload":
+        options = sys.argv[3:]
+        erasure_coding = "--ec" in options
+        chunking = "cdc" if "--cdc" in options else None
+        dedup = True if "--dedup" in options else None
+        codecs = [option for option in options if not option.startswith("--")]
+        codec = codecs[0] if codecs else None
         if file_path:
-            client.upload_file(file_path)
+            client.upload_file(file_path, codec=codec, erasure_coding=erasure_coding,
+                               chunking=chunking, dedup=dedup,
+                               block_size=option_value(options, "block-size"),
+                               replication=option_value(options, "replication"))
         else:
             log("❌ Please provide file path for upload", level="error")
+    elif action == "upload-many":
+        # Files first, then options that apply to all of them, e.g. `upload-many a b c --dedup`
+        options = [arg for arg in sys.argv[2:] if arg.startswith("--")]
+        file_paths = [arg for arg in sys.argv[2:] if not arg.startswith("--")]
+        if file_paths:
+            client.upload_files(file_paths, erasure_coding="--ec" in options,
+                                chunking="cdc" if "--cdc" in options else None,
+                                dedup=True if "--dedup" in options else None,
+                                block_size=option_value(options, "block-size"),
+                                replication=option_value(options, "replication"))
+        else:
+            log("❌ Please provide the files to upload", level="error")
+    elif action == "stream":
+        # Reads the file's contents from stdin, e.g. `tar c dir | python3 run_client.py stream dir.tar`
+        if file_path:
+            client.upload_stream(sys.stdin.buffer, file_path)
+        else:
+            log("❌ Please provide the name to store the stream under", level="error")
+    elif action == "pack":
+        if file_path:
+            client.pack_files(sys.argv[2:])
+        else:
+            log("❌ Please provide the files to pack", level="error")
+    elif action == "sync":
+        if file_path:
+            client.sync_file(file_path)
+        else:
+            log("❌ Please provide file path to sync", level="error")
     elif action == "download":
         if file_path:
             output_path = input("Enter output path to save the file: ")
             client.download_file(file_path, output_path)
         else:
             log("❌ Please provide file name for download", level="error")
+    elif action == "download-many":
+        # download-many <output_dir> <file names...>
+        if file_path and len(sys.argv) > 3:
+            client.download_files(sys.argv[3:], file_path)
+        else:
+            log("❌ Please provide an output directory and file names to download", level="error")
     elif action == "list":
         client.list_files()
+    elif action == "setrep":
+        replication = sys.argv[3] if len(sys.argv) > 3 else None
+        if file_path and replication:
+            client.set_replication(file_path, int(replication))
+        else:
+            log("❌ Please provide a file name and replication factor", level="error")
+    elif action == "dedup-stats":
+        stats = client.get_dedup_stats()
+        flush_logs()
+        if stats:
+            for key, value in stats.items():
+                print(f" - {key}: {value}")
+    elif action == "job":
+        # job <file> <module:map> [module:reduce] [--name=value ...], options become map params,
+        # e.g. `job app.log jobs.examples:count_occurrences jobs.examples:total --pattern=ERROR`
+        functions = [arg for arg in sys.argv[3:] if not arg.startswith("--")]
+        params = dict(arg[2:].split("=", 1) for arg in sys.argv[3:] if arg.startswith("--") and "=" in arg)
+        if file_path and functions:
+            result = client.run_job(file_path, functions[0], functions[1] if len(functions) > 1 else None, params)
+            flush_logs()
+            if result is not None:
+                print(json.dumps(result, indent=2))
+        else:
+            log("❌ Please provide a file name and a map function (module:function)", level="error")
+    elif action == "copy":
+        destination = sys.argv[3] if len(sys.argv) > 3 else None
+        if file_path and destination:
+            client.copy_file(file_path, destination)
+        else:
+            log("❌ Please provide source and destination file names to copy", level="error")
     elif action == "delete":
-        if file_path:
+        if len(sys.argv) > 3:
+            client.delete_files(sys.argv[2:])
+        elif file_path:
             client.delete_file(file_path)
         else:
             log("❌ Please provide file name to delete", level="error")
     else:
-        log("❌ Unknown action. Use 'upload', 'download', 'list', or 'delete'.", level="error")
+        log("❌ Unknown action. Use 'upload', 'upload-many', 'stream', 'pack', 'sync', 'download', 'download-many', 'list', 'copy', 'delete', 'setrep', 'dedup-stats' or 'job'.", level="error")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--trace" in sys.argv:
+        # Print a timeline of the command: client phases plus the spans each NameNode
+        # and DataNode request reported back.
+        sys.argv.remove("--trace")
+        with start_trace() as trace:
+            with span("client", command=" ".join(sys.argv[1:])):
+                main()
+        flush_logs()
+        print(trace.format())
+    else:
+        main()
\ No newline at end of file
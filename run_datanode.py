@@ -1,10 +1,22 @@
 import argparse
 import threading
-from flask import Flask, request, jsonify
+import zlib
+from flask import Flask, Response, request, jsonify
 from datanode.datanode import DataNode
+from datanode.io_scheduler import TRAFFIC_CLASSES
+from datanode.metrics import STORED_BLOCKS
+from datanode.short_circuit import is_loopback
+from datanode.task_runner import TaskError
+from core.checksum import ChecksumError, read_with_checksums
 from core.logger import log
+from core.config import Config
+from core.metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY, instrument_app
+from core.tracing import span, trace_app
+from core.profiling import ProfilerBusy, profile
 
 app = Flask(__name__)
+instrument_app(app, "datanode")
+trace_app(app, "datanode")
 data_node = None  # Global instance
 
 
@@ -16,8 +28,19 @@ def store_block():
     if not block_id or not file:
         return jsonify({"error": "Missing 'block_id' or 'data'"}), 400
 
-    data = file.read()
-    data_node.store_block(block_id, data)
+    traffic_class = request.form.get('traffic_class', 'write')
+    if traffic_class not in TRAFFIC_CLASSES:
+        return jsonify({"error": f"Unknown traffic class '{traffic_class}'"}), 400
+
+    # Checksum each chunk in the same pass that reads the upload.
+    with span("datanode.receive"):
+        data, checksums = read_with_checksums(file.stream)
+    checksum = request.form.get('checksum')
+    if checksum is not None and checksum != str(zlib.crc32(data)):
+        log(f"❌ Checksum mismatch for incoming block {block_id}", level="error")
+        return jsonify({"error": "Checksum mismatch"}), 409
+
+    data_node.store_block(block_id, data, traffic_class=traffic_class, checksums=checksums)
     return jsonify({"status": "success"}), 200
 
 
@@ -27,9 +50,24 @@ def read_block():
     if not block_id:
         return jsonify({"error": "Missing 'block_id'"}), 400
 
-    data = data_node.read_block(block_id)
-    if data:
-        return data, 200
+    traffic_class = request.args.get('traffic_class', 'read')
+    if traffic_class not in TRAFFIC_CLASSES:
+        return jsonify({"error": f"Unknown traffic class '{traffic_class}'"}), 400
+
+    offset = request.args.get("offset", type=int)
+    length = request.args.get("length", type=int)
+    if (offset is None) != (length is None) or (offset is not None and (offset < 0 or length < 0)):
+        return jsonify({"error": "'offset' and 'length' must be given together and be non-negative"}), 400
+
+    try:
+        if offset is not None:
+            data = data_node.read_block_range(block_id, offset, length, traffic_class=traffic_class)
+        else:
+            data = data_node.read_block(block_id, traffic_class=traffic_class)
+    except ChecksumError:
+        return jsonify({"error": "Checksum mismatch"}), 500
+    if data is not None:
+        return data, 200, {"X-Block-CRC32": str(zlib.crc32(data))}
     else:
         return jsonify({"error": "Block not found"}), 404
 
@@ -39,10 +77,128 @@ def delete_block():
     if not block_id:
         return jsonify({"error": "Missing 'block_id'"}), 400
 
-    data_node.delete_block(block_id)
+    traffic_class = request.args.get('traffic_class', 'maintenance')
+    if traffic_class not in TRAFFIC_CLASSES:
+        return jsonify({"error": f"Unknown traffic class '{traffic_class}'"}), 400
+
+    data_node.delete_block(block_id, traffic_class=traffic_class)
     return jsonify({"status": f"Block {block_id} deleted."}), 200
 
 
+@app.route('/short_circuit_read', methods=['GET'])
+def short_circuit_read():
+    block_id = request.args.get("block_id")
+    if not block_id:
+        return jsonify({"error": "Missing 'block_id'"}), 400
+
+    # Only clients on this host may read block files directly.
+    if not Config.SHORT_CIRCUIT_READS or not is_loopback(request.remote_addr or ""):
+        return jsonify({"error": "Short-circuit reads not permitted"}), 403
+
+    info = data_node.get_short_circuit_info(block_id)
+    if not info:
+        return jsonify({"error": "Block not found"}), 404
+    return jsonify(info), 200
+
+
+@app.route('/transfer_block', methods=['POST'])
+def transfer_block():
+    data = request.get_json() or {}
+    block_id = data.get("block_id")
+    peer = data.get("peer")
+    mode = data.get("mode", "pull")
+
+    if not block_id or not peer:
+        return jsonify({"error": "Missing 'block_id' or 'peer'"}), 400
+    if mode not in ("pull", "push"):
+        return jsonify({"error": "'mode' must be 'pull' or 'push'"}), 400
+
+    result = data_node.transfer_block(
+        block_id, mode, peer,
+        target_block_id=data.get("target_block_id"),
+        report=data.get("report", True),
+    )
+    status_code = 200 if result["status"] == "success" else 502
+    return jsonify(result), status_code
+
+
+@app.route('/run_task', methods=['POST'])
+def run_task():
+    data = request.get_json() or {}
+    block_id = data.get("block_id")
+    function = data.get("function")
+    if not block_id or not function:
+        return jsonify({"error": "Missing 'block_id' or 'function'"}), 400
+
+    try:
+        result = data_node.run_task(block_id, function, params=data.get("params"), codec=data.get("codec", "none"),
+                                    offset=data.get("offset"), length=data.get("length"))
+        return jsonify({"result": result}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except ChecksumError:
+        return jsonify({"error": "Checksum mismatch"}), 500
+    except TimeoutError as e:
+        return jsonify({"error": str(e)}), 504
+    except TaskError as e:
+        # The function failed; `task_error` tells the NameNode not to retry it elsewhere.
+        return jsonify({"error": str(e), "task_error": True}), 500
+    except TypeError as e:
+        return jsonify({"error": f"Result is not JSON-serializable: {e}", "task_error": True}), 500
+
+
+@app.route('/admin/io_limits', methods=['GET', 'POST'])
+def io_limits():
+    if request.method == 'GET':
+        return jsonify(data_node.io_scheduler.get_limits()), 200
+
+    data = request.get_json() or {}
+    traffic_class = data.get("traffic_class")
+    if traffic_class not in TRAFFIC_CLASSES:
+        return jsonify({"error": f"'traffic_class' must be one of {TRAFFIC_CLASSES}"}), 400
+
+    try:
+        data_node.io_scheduler.set_limits(
+            traffic_class,
+            rate=data.get("rate"),
+            burst=data.get("burst"),
+            max_concurrency=data.get("max_concurrency"),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(data_node.io_scheduler.get_limits()), 200
+
+
+@app.route('/io_stats', methods=['GET'])
+def io_stats():
+    return jsonify(data_node.io_scheduler.get_stats()), 200
+
+
+@app.route('/scanner_status', methods=['GET'])
+def scanner_status():
+    return jsonify(data_node.block_scanner.last_scan), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    STORED_BLOCKS.set(len(data_node.storage.list_blocks()))
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.route('/admin/profile', methods=['GET'])
+def admin_profile():
+    # e.g. /admin/profile?mode=cpu&seconds=10&top=20; blocks for the whole window
+    try:
+        return jsonify(profile(request.args.get("mode", "cpu"), request.args.get("seconds", 5),
+                               request.args.get("top", 25))), 200
+    except ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
 def run_flask(ip, port):
     log(f"🚀 Starting DataNode API at http://{ip}:{port}")
     app.run(host=ip, port=port)
@@ -55,14 +211,26 @@ def main():
     parser.add_argument('--id', required=True, help="DataNode ID (e.g., 127.0.0.1:5001)")
     parser.add_argument('--port', type=int, default=5001, help="Port to run DataNode on")
     parser.add_argument('--storage', required=True, help="Path to storage directory")
+    parser.add_argument('--storage-backend', choices=["file", "segment"], default=None,
+                        help="Block storage layout (defaults to Config.STORAGE_BACKEND)")
+    parser.add_argument('--rpc', action='store_true', default=Config.RPC_TRANSPORT,
+                        help="Serve blocks and send heartbeats over the binary RPC transport too")
+    parser.add_argument('--namenode', default=Config.NAMENODE_URL, help="URL of the NameNode to register with")
     args = parser.parse_args()
 
     node_id = args.id
     port = args.port
     storage_path = args.storage
-    namenode_url = "http://127.0.0.1:8000"  # Make sure this matches NameNode's actual URL
+    namenode_url = args.namenode
+
+    data_node = DataNode(node_id, namenode_url, storage_path, ip="127.0.0.1", port=port,
+                         storage_backend=args.storage_backend, rpc=args.rpc)
 
-    data_node = DataNode(node_id, namenode_url, storage_path, ip="127.0.0.1", port=port)
+    if Config.SHORT_CIRCUIT_READS:
+        data_node.start_short_circuit_server()
+    data_node.start_block_scanner()
+    if args.rpc:
+        data_node.start_rpc_server()
 
     # Start heartbeat in a background thread
     heartbeat_thread = threading.Thread(target=data_node.start_heartbeat)
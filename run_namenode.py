@@ -1,26 +1,34 @@
-from flask import Flask, request, jsonify
-from namenode.namenode import NameNode
+import argparse
+from flask import Flask, Response, request, jsonify
+from namenode import dashboard
+from namenode.namenode import LeaseError, NameNode, SyncConflictError
 from core.logger import log
 from core.config import Config
+from core.metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY, gauge, instrument_app
+from core.tracing import trace_app
+from core.profiling import ProfilerBusy, profile
 import time
 
 app = Flask(__name__)
 namenode = NameNode()
+instrument_app(app, "namenode")
+trace_app(app, "namenode")
+
+FILES = gauge("hdfs_namenode_files", "Files in the namespace")
+UNIQUE_BLOCKS = gauge("hdfs_namenode_blocks", "Distinct block IDs referenced by the namespace")
+DATANODES = gauge("hdfs_namenode_datanodes", "Registered DataNodes by status", ("status",))
+HEARTBEAT_AGE = gauge("hdfs_namenode_heartbeat_age_seconds", "Seconds since each DataNode's last heartbeat", ("node_id",))
 
 @app.route("/heartbeat_status", methods=["GET"])
 def heartbeat_status():
-    now = time.time()
-    status_dict = {}
-    for node_id, info in namenode.datanodes.items():
-        last_heartbeat = info.get("last_heartbeat", 0)
-        status = "active" if now - last_heartbeat < Config.HEARTBEAT_TIMEOUT else "inactive"
-
-        status_dict[node_id] = {
-            "status": status,
-            "last_heartbeat": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_heartbeat)) if last_heartbeat else "N/A"
-        }
+    return jsonify(dashboard.heartbeat_status(namenode.datanodes))
+
 
-    return jsonify(status_dict)
+@app.route("/events", methods=["GET"])
+def events():
+    # Server-sent events: DataNode status and namespace changes for dashboards
+    return Response(dashboard.event_stream(lambda: namenode.datanodes, namenode.metadata),
+                    mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 @app.route("/register", methods=["POST"])
@@ -49,9 +57,7 @@ def heartbeat():
 
     if node_id:
         if node_id in namenode.datanodes:
-            namenode.datanodes[node_id]["status"] = "active"
-            namenode.datanodes[node_id]["last_heartbeat"] = time.time()
-            log(f"💓 Heartbeat received from DataNode {node_id}")
+            namenode.receive_heartbeat(node_id)
             return jsonify({"status": "alive"}), 200
         else:
             log(f"⚠️ Unknown DataNode {node_id} tried to send heartbeat", level="warning")
@@ -62,33 +68,47 @@ def heartbeat():
 @app.route("/assign_blocks", methods=["POST"])
 def assign_blocks():
     data = request.get_json()
-    file_name = data.get("file_name")
-    num_blocks = data.get("num_blocks")
-
-    if not file_name or not num_blocks:
+    if not data.get("file_name") or not data.get("num_blocks"):
         return jsonify({"error": "Missing file_name or num_blocks"}), 400
 
-    log(f"📦 Assigning {num_blocks} blocks for '{file_name}'")
+    log(f"📦 Assigning {data['num_blocks']} blocks for '{data['file_name']}'")
 
     try:
-        active_datanodes = namenode.get_active_datanodes()
+        return jsonify(namenode.assign_file(data)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log(f"❌ Error assigning blocks: {e}", level="error")
+        return jsonify({"error": str(e)}), 500
 
-        for node_id, info in active_datanodes.items():
-            info["host"] = info["ip"]
 
-        block_info = namenode.replication_manager.assign_blocks(
-            file_name=file_name,
-            num_blocks=num_blocks,
-            replication_factor=namenode.replication_factor,
-            datanodes=active_datanodes
-        )
-        namenode.metadata.save_metadata()
-        return jsonify({"blocks": block_info}), 200
+@app.route("/batch/assign_blocks", methods=["POST"])
+def batch_assign_blocks():
+    files = (request.get_json() or {}).get("files")
+    if not isinstance(files, list):
+        return jsonify({"error": "Missing files"}), 400
+
+    try:
+        return jsonify({"results": namenode.assign_files(files)}), 200
     except Exception as e:
-        log(f"❌ Error assigning blocks: {e}", level="error")
+        log(f"❌ Error in batch block assignment: {e}", level="error")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/confirm_blocks", methods=["POST"])
+def confirm_blocks():
+    stored = (request.get_json() or {}).get("blocks")
+    if not isinstance(stored, dict):
+        return jsonify({"error": "Missing blocks"}), 400
+
+    try:
+        return jsonify({"confirmed": namenode.confirm_blocks(stored)}), 200
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
 @app.route("/get_file_blocks", methods=["GET"])
 def get_file_blocks():
     file_name = request.args.get("file_name")
@@ -99,7 +119,16 @@ def get_file_blocks():
     if not blocks:
         return jsonify({"error": "File not found"}), 404
 
-    return jsonify({"blocks": blocks}), 200
+    return jsonify({"blocks": blocks, "attributes": namenode.get_file_attributes(file_name)}), 200
+
+
+@app.route("/batch/get_file_blocks", methods=["POST"])
+def batch_get_file_blocks():
+    file_names = (request.get_json() or {}).get("file_names")
+    if not isinstance(file_names, list):
+        return jsonify({"error": "Missing file_names"}), 400
+
+    return jsonify({"results": namenode.get_files_blocks(file_names)}), 200
 
 
 @app.route("/files", methods=["GET"])
@@ -117,6 +146,15 @@ def list_files():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/summary", methods=["GET"])
+def summary():
+    # e.g. /summary?offset=100&limit=50; pages are cut from a list cached per txid
+    try:
+        return jsonify(dashboard.summary_page(namenode.metadata, request.args)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
 @app.route("/delete_file", methods=["POST"])
 def delete_file():
     data = request.get_json()
@@ -132,6 +170,241 @@ def delete_file():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/batch/delete_files", methods=["POST"])
+def batch_delete_files():
+    file_names = (request.get_json() or {}).get("file_names")
+    if not isinstance(file_names, list):
+        return jsonify({"error": "Missing file_names"}), 400
+
+    try:
+        return jsonify({"results": namenode.remove_files(file_names)}), 200
+    except Exception as e:
+        log(f"❌ Error in batch delete: {e}", level="error")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/copy_file", methods=["POST"])
+def copy_file():
+    data = request.get_json()
+    source = data.get("source")
+    destination = data.get("destination")
+    if not source or not destination:
+        return jsonify({"error": "Missing source or destination"}), 400
+
+    try:
+        blocks = namenode.copy_file(source, destination)
+        return jsonify({"message": f"File '{source}' copied to '{destination}'", "blocks": blocks}), 200
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except FileExistsError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        log(f"❌ Error copying file: {e}", level="error")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/create_file", methods=["POST"])
+def create_file():
+    data = request.get_json()
+    file_name = data.get("file_name")
+    if not file_name:
+        return jsonify({"error": "Missing file_name"}), 400
+
+    try:
+        lease_id = namenode.create_file(
+            file_name,
+            codec=data.get("codec", "none"),
+            replication=data.get("replication"),
+            block_size=data.get("block_size")
+        )
+        return jsonify({"lease_id": lease_id, "lease_timeout": Config.LEASE_TIMEOUT}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except LeaseError as e:
+        return jsonify({"error": str(e)}), 409
+
+
+@app.route("/add_block", methods=["POST"])
+def add_block():
+    data = request.get_json()
+    file_name = data.get("file_name")
+    lease_id = data.get("lease_id")
+    if not file_name or not lease_id:
+        return jsonify({"error": "Missing file_name or lease_id"}), 400
+
+    try:
+        blocks = namenode.add_block(file_name, lease_id, count=data.get("count", 1))
+        return jsonify({"blocks": blocks}), 200
+    except LeaseError as e:
+        return jsonify({"error": str(e)}), 409
+
+
+@app.route("/complete_file", methods=["POST"])
+def complete_file():
+    data = request.get_json()
+    file_name = data.get("file_name")
+    lease_id = data.get("lease_id")
+    blocks = data.get("blocks")
+    if not file_name or not lease_id or blocks is None:
+        return jsonify({"error": "Missing file_name, lease_id or blocks"}), 400
+
+    try:
+        blocks = namenode.complete_file(file_name, lease_id, blocks)
+        return jsonify({"message": f"File '{file_name}' completed", "blocks": blocks}), 200
+    except (ValueError, KeyError) as e:
+        return jsonify({"error": f"Invalid block list: {e}"}), 400
+    except LeaseError as e:
+        return jsonify({"error": str(e)}), 409
+
+
+@app.route("/renew_lease", methods=["POST"])
+def renew_lease():
+    data = request.get_json()
+    file_name = data.get("file_name")
+    lease_id = data.get("lease_id")
+    if not file_name or not lease_id:
+        return jsonify({"error": "Missing file_name or lease_id"}), 400
+
+    try:
+        namenode.renew_lease(file_name, lease_id)
+        return jsonify({"status": "renewed"}), 200
+    except LeaseError as e:
+        return jsonify({"error": str(e)}), 409
+
+
+@app.route("/pack_files", methods=["POST"])
+def pack_files():
+    data = request.get_json()
+    containers = data.get("containers")
+    files = data.get("files")
+    if not containers or not files:
+        return jsonify({"error": "Missing containers or files"}), 400
+
+    try:
+        placed = namenode.pack_files(containers, files, replication=data.get("replication"))
+        return jsonify({"containers": placed}), 200
+    except (ValueError, KeyError, IndexError) as e:
+        return jsonify({"error": f"Invalid pack request: {e}"}), 400
+    except Exception as e:
+        log(f"❌ Error packing files: {e}", level="error")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/sync_file", methods=["POST"])
+def sync_file():
+    data = request.get_json()
+    file_name = data.get("file_name")
+    blocks = data.get("blocks")
+    if not file_name or blocks is None:
+        return jsonify({"error": "Missing file_name or blocks"}), 400
+
+    try:
+        sync_id, block_info = namenode.plan_sync(
+            file_name,
+            blocks,
+            codec=data.get("codec", "none"),
+            chunking=data.get("chunking", "fixed")
+        )
+        return jsonify({"sync_id": sync_id, "blocks": block_info}), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log(f"❌ Error planning sync: {e}", level="error")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/commit_sync", methods=["POST"])
+def commit_sync():
+    data = request.get_json()
+    sync_id = data.get("sync_id")
+    if not sync_id:
+        return jsonify({"error": "Missing sync_id"}), 400
+
+    try:
+        blocks = namenode.commit_sync(sync_id, data.get("blocks"))
+        return jsonify({"message": "Sync committed", "blocks": blocks}), 200
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except SyncConflictError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        log(f"❌ Error committing sync: {e}", level="error")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/set_replication", methods=["POST"])
+def set_replication():
+    data = request.get_json()
+    file_name = data.get("file_name")
+    replication = data.get("replication")
+    if not file_name or replication is None:
+        return jsonify({"error": "Missing file_name or replication"}), 400
+
+    try:
+        replication = namenode.set_replication(file_name, replication)
+        return jsonify({"message": f"Replication of '{file_name}' set to {replication}",
+                        "replication": replication}), 200
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route("/block_transfer_report", methods=["POST"])
+def block_transfer_report():
+    data = request.get_json()
+    block_id = data.get("block_id")
+    datanode_url = data.get("datanode")
+    if not block_id or not datanode_url:
+        return jsonify({"error": "Missing block_id or datanode"}), 400
+
+    namenode.handle_transfer_report(block_id, datanode_url, data.get("status"))
+    return jsonify({"status": "recorded"}), 200
+
+
+@app.route("/report_bad_block", methods=["POST"])
+def report_bad_block():
+    data = request.get_json()
+    block_id = data.get("block_id")
+    datanode_url = data.get("datanode")
+    if not block_id or not datanode_url:
+        return jsonify({"error": "Missing block_id or datanode"}), 400
+
+    namenode.handle_bad_block(block_id, datanode_url)
+    return jsonify({"status": "recorded"}), 200
+
+
+@app.route("/dedup_stats", methods=["GET"])
+def dedup_stats():
+    return jsonify(namenode.get_dedup_stats()), 200
+
+
+@app.route("/snapshot", methods=["GET"])
+def snapshot():
+    """Full namespace at a txid; standby NameNodes bootstrap from it."""
+    return jsonify(namenode.metadata.get_snapshot()), 200
+
+
+@app.route("/edits", methods=["GET"])
+def edits():
+    """Edits after `since` for standby NameNodes, plus the current DataNode table."""
+    since = request.args.get("since", type=int)
+    if since is None:
+        return jsonify({"error": "Missing since"}), 400
+
+    edit_list = namenode.metadata.get_edits(since)
+    if edit_list is None or request.args.get("log_id", namenode.metadata.log_id) != namenode.metadata.log_id:
+        return jsonify({"error": "Edits no longer retained; bootstrap from /snapshot"}), 410
+    return jsonify({
+        "log_id": namenode.metadata.log_id,
+        "txid": namenode.metadata.txid,
+        "edits": edit_list,
+        "datanodes": namenode.datanodes,
+    }), 200
+
+
 @app.route("/metadata", methods=["GET"])
 def get_metadata():
     try:
@@ -164,6 +437,68 @@ def get_file_blocks_api():
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/submit_job", methods=["POST"])
+def submit_job():
+    data = request.get_json() or {}
+    if not data.get("file_name") or not data.get("function"):
+        return jsonify({"error": "Missing 'file_name' or 'function'"}), 400
+    try:
+        return jsonify(namenode.job_scheduler.submit(data["file_name"], data["function"], data.get("params"))), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+
+
+@app.route("/job_status", methods=["GET"])
+def job_status():
+    status = namenode.job_scheduler.get_status(request.args.get("job_id"))
+    if status is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(status), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    # Namespace and cluster gauges are read at scrape time rather than kept up to date.
+    now = time.time()
+    FILES.set(len(namenode.metadata.metadata))
+    UNIQUE_BLOCKS.set(len(namenode.metadata.block_index))
+    statuses = {"active": 0, "inactive": 0}
+    ages = {}
+    for node_id, info in list(namenode.datanodes.items()):
+        alive = now - info.get("last_heartbeat", 0) < Config.HEARTBEAT_TIMEOUT
+        statuses["active" if alive else "inactive"] += 1
+        ages[node_id] = round(now - info.get("last_heartbeat", 0), 3)
+    DATANODES.replace(statuses)
+    HEARTBEAT_AGE.replace(ages)
+    return Response(REGISTRY.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.route("/admin/profile", methods=["GET"])
+def admin_profile():
+    # e.g. /admin/profile?mode=cpu&seconds=10&top=20; blocks for the whole window
+    try:
+        return jsonify(profile(request.args.get("mode", "cpu"), request.args.get("seconds", 5),
+                               request.args.get("top", 25))), 200
+    except ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rpc", action="store_true", default=Config.RPC_TRANSPORT,
+                        help="Also serve metadata calls over the binary RPC transport")
+    parser.add_argument("--port", type=int, default=Config.NAMENODE_PORT, help="Port to run the NameNode on")
+    args = parser.parse_args()
+
+    namenode.port = args.port
+
+    namenode.start_lease_monitor()
+    namenode.job_scheduler.start()
+    if args.rpc:
+        namenode.start_rpc_server()
     log("✅ NameNode is live and running.")
-    app.run(host="0.0.0.0", port=Config.NAMENODE_PORT)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=args.port)
\ No newline at end of file
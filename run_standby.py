@@ -0,0 +1,113 @@
+import argparse
+from flask import Flask, Response, request, jsonify
+from namenode import dashboard
+from namenode.standby import StandbyNameNode
+from core.logger import log
+from core.config import Config
+from core.tracing import trace_app
+
+app = Flask(__name__)
+trace_app(app, "standby")
+standby = None  # Global instance
+
+
+@app.before_request
+def refuse_stale_reads():
+    # Past the staleness bound, send clients to the active NameNode instead.
+    if request.path != "/standby_status" and not standby.is_fresh():
+        return jsonify({"error": "Standby is too far behind the active NameNode",
+                        "staleness": standby.get_status()["staleness"]}), 503
+
+
+@app.after_request
+def add_txid(response):
+    response.headers["X-Metadata-Txid"] = str(standby.metadata.txid)
+    return response
+
+
+@app.route("/standby_status", methods=["GET"])
+def standby_status():
+    return jsonify(standby.get_status()), 200
+
+
+@app.route("/files", methods=["GET"])
+def list_files():
+    return jsonify(standby.list_files()), 200
+
+
+@app.route("/get_file_blocks", methods=["GET"])
+def get_file_blocks():
+    file_name = request.args.get("file_name")
+    if not file_name:
+        return jsonify({"error": "Missing file_name"}), 400
+
+    blocks = standby.get_file_blocks(file_name)
+    if not blocks:
+        return jsonify({"error": "File not found"}), 404
+
+    return jsonify({"blocks": blocks, "attributes": standby.get_file_attributes(file_name)}), 200
+
+
+@app.route("/batch/get_file_blocks", methods=["POST"])
+def batch_get_file_blocks():
+    file_names = (request.get_json() or {}).get("file_names")
+    if not isinstance(file_names, list):
+        return jsonify({"error": "Missing file_names"}), 400
+
+    return jsonify({"results": standby.get_files_blocks(file_names)}), 200
+
+
+@app.route("/file_blocks", methods=["GET"])
+def get_file_blocks_api():
+    file_name = request.args.get("file_name")
+    if not file_name:
+        return jsonify({"error": "Missing file_name"}), 400
+    return jsonify(standby.get_file_blocks(file_name)), 200
+
+
+@app.route("/metadata", methods=["GET"])
+def get_metadata():
+    return jsonify(standby.get_namespace()), 200
+
+
+@app.route("/datanodes", methods=["GET"])
+def get_datanodes():
+    return jsonify(standby.datanodes), 200
+
+
+@app.route("/heartbeat_status", methods=["GET"])
+def heartbeat_status():
+    return jsonify(dashboard.heartbeat_status(standby.datanodes))
+
+
+@app.route("/summary", methods=["GET"])
+def summary():
+    try:
+        return jsonify(dashboard.summary_page(standby.metadata, request.args)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route("/events", methods=["GET"])
+def events():
+    return Response(dashboard.event_stream(lambda: standby.datanodes, standby.metadata),
+                    mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+def main():
+    global standby
+
+    parser = argparse.ArgumentParser(description="Read-only standby NameNode")
+    parser.add_argument("--active", default=Config.NAMENODE_URL, help="URL of the active NameNode")
+    parser.add_argument("--port", type=int, default=Config.NAMENODE_PORT + 1, help="Port to serve reads on")
+    args = parser.parse_args()
+
+    standby = StandbyNameNode(args.active)
+    standby.start()
+
+    log(f"✅ Standby NameNode serving reads on port {args.port}.")
+    app.run(host="0.0.0.0", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 import os
 import sys
-import shutil
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify
+from flask import Flask, Response, render_template, request, redirect, url_for, flash, jsonify
 from werkzeug.utils import secure_filename
 import requests
 
@@ -15,108 +14,88 @@ from core.logger import log
 app = Flask(__name__)
 app.secret_key = 'supersecretkey'  # Required for flashing messages
 
-# Use absolute paths for upload/download folders to avoid CWD/root_path mismatch issues
-BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-app.config['UPLOAD_FOLDER'] = os.path.join(BASE_DIR, 'webui_uploads')
-app.config['DOWNLOAD_FOLDER'] = os.path.join(BASE_DIR, 'webui_downloads')
-
-# Ensure temp directories exist
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-os.makedirs(app.config['DOWNLOAD_FOLDER'], exist_ok=True)
-
 # Initialize HDFS Client
 hdfs_client = HDFSClient(Config.NAMENODE_URL, Config.BLOCK_SIZE)
 
+# Dashboard reads go to the standby NameNode when one is configured
+READ_URL = Config.NAMENODE_READ_URL or Config.NAMENODE_URL
+
 @app.route('/')
 def index():
-    files = []
+    page = max(request.args.get('page', 1, type=int), 1)
+    summary = {"files": [], "total_files": 0, "total_bytes": 0, "txid": None}
     try:
-        # Fetch file list directly from NameNode API
-        response = requests.get(f"{Config.NAMENODE_URL}/files")
+        # One page of the NameNode's cached summary instead of the whole namespace
+        response = requests.get(f"{READ_URL}/summary", params={
+            "offset": (page - 1) * Config.SUMMARY_PAGE_SIZE,
+            "limit": Config.SUMMARY_PAGE_SIZE,
+        })
         if response.status_code == 200:
-            file_list = response.json()
-            # Transform list of strings to objects if necessary, or just pass them
-            # The NameNode returns a list of filenames or objects? 
-            # Let's check namenode.py: return jsonify(files) -> files = namenode.list_files()
-            # namenode.list_files() returns list of filenames (strings) or dicts?
-            # Let's assume it returns a list of filenames for now, but better to check.
-            # Actually, let's fetch metadata to get size and block count.
-            
-            meta_response = requests.get(f"{Config.NAMENODE_URL}/metadata")
-            if meta_response.status_code == 200:
-                metadata = meta_response.json()
-                # Convert metadata dict to list for template
-                for fname, blocks in metadata.items():
-                    # Metadata structure is {filename: [block_list]}
-                    # We don't have file size in metadata, so we'll just show block count
-                    files.append({
-                        "name": fname,
-                        "size": f"{len(blocks) * Config.BLOCK_SIZE} (approx)",
-                        "blocks": blocks
-                    })
-            else:
-                flash("Could not fetch metadata from NameNode", "warning")
+            summary = response.json()
         else:
-            flash("Could not connect to NameNode", "danger")
+            flash("Could not fetch file summary from NameNode", "warning")
     except Exception as e:
         flash(f"Error connecting to HDFS: {e}", "danger")
 
-    return render_template('index.html', files=files)
+    pages = max((summary["total_files"] + Config.SUMMARY_PAGE_SIZE - 1) // Config.SUMMARY_PAGE_SIZE, 1)
+    return render_template('index.html', files=summary["files"], summary=summary, page=page, pages=pages)
+
+def _upload_stream(source, filename):
+    """Streams source into HDFS as filename; flashes the outcome and returns whether it worked."""
+    filename = secure_filename(filename or "")
+    if not filename:
+        flash('No selected file', 'danger')
+        return False
+    if hdfs_client.upload_stream(source, filename):
+        flash(f"Successfully uploaded '{filename}'", "success")
+        return True
+    flash(f"Upload of '{filename}' failed", "danger")
+    return False
+
+@app.route('/upload/<filename>', methods=['PUT'])
+def upload_raw(filename):
+    # The dashboard sends the file as the raw request body, which goes straight from
+    # the socket into the block pipeline one block at a time.
+    if _upload_stream(request.stream, filename):
+        return jsonify({"uploaded": secure_filename(filename)}), 200
+    return jsonify({"error": "Upload failed"}), 500
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    if 'file' not in request.files:
+    # Form fallback for browsers without JavaScript; Werkzeug has already parsed the
+    # multipart body, so this streams from its buffer rather than a copy of our own.
+    file = request.files.get('file')
+    if file is None:
         flash('No file part', 'danger')
-        return redirect(url_for('index'))
-    
-    file = request.files['file']
-    if file.filename == '':
-        flash('No selected file', 'danger')
-        return redirect(url_for('index'))
-
-    if file:
-        filename = secure_filename(file.filename)
-        temp_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(temp_path)
-
-        try:
-            # Use HDFS Client to upload
-            hdfs_client.upload_file(temp_path)
-            flash(f"Successfully uploaded '{filename}'", "success")
-        except Exception as e:
-            flash(f"Upload failed: {e}", "danger")
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-
+    else:
+        _upload_stream(file.stream, file.filename)
     return redirect(url_for('index'))
 
 @app.route('/download/<filename>')
 def download_file(filename):
-    temp_path = os.path.join(app.config['DOWNLOAD_FOLDER'], filename)
-    
+    chunks = hdfs_client.iter_file(filename)
     try:
-        # Use HDFS Client to download to temp folder
-        # We need to modify client or just use it. 
-        # client.download_file(filename, output_path)
-        
-        # Check if file exists in HDFS first (optional, client handles it)
-        
-        hdfs_client.download_file(filename, temp_path)
-        
-        if os.path.exists(temp_path):
-            return send_file(temp_path, as_attachment=True)
-        else:
-            flash("Download failed: File not created", "danger")
-            return redirect(url_for('index'))
-            
+        # Resolve the file and fetch its first block before committing to a 200.
+        first = next(chunks, b"")
+    except FileNotFoundError:
+        flash(f"'{filename}' not found", "danger")
+        return redirect(url_for('index'))
     except Exception as e:
         flash(f"Download error: {e}", "danger")
         return redirect(url_for('index'))
-    # Note: Temp download files are not automatically cleaned up here immediately after send_file
-    # In a production app, use a background task or stream the response. 
-    # For this demo, we'll leave it or try to cleanup.
+
+    def stream():
+        yield first
+        try:
+            yield from chunks
+        except Exception as e:
+            # Re-raised so the connection is cut instead of ending like a complete file
+            log(f"❌ Download of '{filename}' failed mid-stream: {e}", level="error")
+            raise
+
+    return Response(stream(), mimetype="application/octet-stream", headers={
+        "Content-Disposition": f'attachment; filename="{secure_filename(filename)}"',
+    })
 
 @app.route('/delete/<filename>', methods=['POST'])
 def delete_file(filename):
@@ -125,13 +104,30 @@ def delete_file(filename):
         flash(f"Deleted '{filename}'", "success")
     except Exception as e:
         flash(f"Delete failed: {e}", "danger")
-    
+
     return redirect(url_for('index'))
 
+@app.route('/events')
+def events():
+    # Relays the NameNode's server-sent events; one upstream stream per open dashboard
+    try:
+        upstream = requests.get(f"{READ_URL}/events", stream=True, timeout=(5, None))
+    except requests.RequestException as e:
+        return jsonify({"error": str(e)}), 502
+
+    def relay():
+        try:
+            for chunk in upstream.iter_content(chunk_size=None):
+                yield chunk
+        finally:
+            upstream.close()
+
+    return Response(relay(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.route('/status')
 def status():
     try:
-        response = requests.get(f"{Config.NAMENODE_URL}/heartbeat_status")
+        response = requests.get(f"{READ_URL}/heartbeat_status")
         return jsonify(response.json())
     except:
         return jsonify({})